@@ -0,0 +1,271 @@
+"""
+Playlist import throughput, measured offline against local stand-in services.
+
+Drives the same pipeline as an import from the app: the playlist is fetched
+through spotipy, then ImportEngine hands tracks to DownloadEngine's worker
+processes and adds the results to a LibraryModel. The network is replaced by:
+  - a local HTTP stub serving the Spotify playlist API, cover images and lrclib;
+  - a fake YoutubeDL in the worker processes that waits --latency ms and
+    writes a --size-mb file for every download.
+
+For each import size it reports tracks per minute, p50/p95 per-track latency
+(from dispatch to the song landing in the library) and how long the Qt event
+loop was stalled (total, and the longest single stall). By default the
+per-host rate limits are lifted so the numbers show the pipeline's own cost;
+pass --rate-limits to keep them.
+
+Usage:
+    python benchmarks/import_benchmark.py [--sizes 10 100 1000] [--workers 3] [--latency 200] [--size-mb 4]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frames.frame_functions import lrclib, ytdl_pool  # noqa: E402
+from frames.frame_functions.net_scheduler import scheduler  # noqa: E402
+
+# Worker processes are spawned and re-import this file, so the stand-ins are
+# configured through the environment and installed at import time.
+CONFIG_ENV = "VIBEFLOW_IMPORT_BENCHMARK"
+PAGE_SIZE = 100
+COVER_BYTES = os.urandom(40 * 1024)
+LYRICS = "\n".join(f"[00:{i:02d}.00]line {i}" for i in range(40))
+STALL_TICK_MS = 5
+
+
+class FakeYoutubeDL:
+    """Stands in for yt_dlp.YoutubeDL: no network, a fixed wait, then a file of the configured size."""
+
+    def __init__(self, params, latency=0.2, size=4 * 1024 * 1024):
+        self.params = {**params, 'outtmpl': {}}
+        self.format_selector = None
+        self.latency = latency
+        self.size = size
+        self.progress_hooks = []
+
+    def add_progress_hook(self, hook):
+        self.progress_hooks.append(hook)
+
+    def build_format_selector(self, format_spec):
+        return format_spec
+
+    def extract_info(self, target, download=True):
+        time.sleep(self.latency)
+        video_id = f"v{abs(hash(target)) % 10 ** 9}"
+        path = self.params['outtmpl']['default'].replace("%(ext)s", "webm")
+        part_path = path + ".part"
+        chunk = b"\0" * (1024 * 1024)
+        with open(part_path, "wb") as f:
+            for offset in range(0, self.size, len(chunk)):
+                f.write(chunk[:self.size - offset])
+                f.flush()
+                self.report({'status': 'downloading', 'filename': path, 'tmpfilename': part_path,
+                             'downloaded_bytes': min(self.size, offset + len(chunk)), 'total_bytes': self.size})
+        os.replace(part_path, path)
+        self.report({'status': 'finished', 'filename': path, 'total_bytes': self.size})
+        entry = {'id': video_id, 'format_id': '251', 'ext': 'webm', 'requested_downloads': [{'filepath': path}]}
+        return {'entries': [entry]} if not target.startswith("http") else entry
+
+    def report(self, status):
+        for hook in self.progress_hooks:
+            hook(status)
+
+    def close(self):
+        pass
+
+
+def install_stand_ins(config):
+    lrclib.LRCLIB_GET = config["stub"] + "/api/get"
+    lrclib.LRCLIB_SEARCH = config["stub"] + "/api/search"
+    ytdl_pool.YoutubeDL = lambda params: FakeYoutubeDL(params, config["latency"], config["size"])
+    if not config["rate_limits"]:
+        scheduler.buckets.clear()
+
+
+if os.environ.get(CONFIG_ENV):
+    install_stand_ins(json.loads(os.environ[CONFIG_ENV]))
+
+
+def make_track(playlist_size, i, stub):
+    return {
+        "name": f"Track {playlist_size}-{i}",
+        "artists": [{"name": f"Artist {i % 97}", "id": f"{i % 97:022d}"}],
+        "album": {"name": f"Album {i % 53}", "images": [{"url": f"{stub}/cover/{playlist_size}-{i}.jpg"}]},
+        "duration_ms": 180000 + i,
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        parts = url.path.strip("/").split("/")
+        if parts[:2] == ["v1", "playlists"] and parts[3:] == ["tracks"]:
+            self.send_json(self.playlist_page(int(parts[2]), int(query.get("offset", 0)),
+                                              int(query.get("limit", PAGE_SIZE))))
+        elif parts[0] == "cover":
+            self.send_body(COVER_BYTES, "image/jpeg")
+        elif url.path == "/api/get":
+            self.send_json({"trackName": query.get("track_name"), "syncedLyrics": LYRICS,
+                            "duration": float(query.get("duration", 0))})
+        elif url.path == "/api/search":
+            self.send_json([{"trackName": query.get("track_name"), "syncedLyrics": LYRICS}])
+        else:
+            self.send_error(404)
+
+    def playlist_page(self, size, offset, limit):
+        stub = f"http://{self.headers['Host']}"
+        end = min(size, offset + limit)
+        return {
+            "items": [{"track": make_track(size, i, stub)} for i in range(offset, end)],
+            "next": f"{stub}/v1/playlists/{size:022d}/tracks?offset={end}&limit={limit}" if end < size else None,
+        }
+
+    def send_json(self, data):
+        self.send_body(json.dumps(data).encode(), "application/json")
+
+    def send_body(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def fetch_playlist(sp, playlist_id):
+    """Fetches the tracks the way ImportPlaylistsDialog does, fallback ids included."""
+    tracks = []
+    response = sp.playlist_items(playlist_id, fields='items.track(name,artists,album(images,name),duration_ms),next')
+    tracks.extend(item['track'] for item in response['items'])
+    while response['next']:
+        response = sp.next(response)
+        tracks.extend(item['track'] for item in response['items'])
+    for track in tracks:
+        track['id'] = f"fallback_{track['name']}_{track['artists'][0]['name']}"
+    return tracks
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--workers", type=int, default=3, help="parallel downloads (the import_workers setting)")
+    parser.add_argument("--latency", type=float, default=200, help="fake YouTube wait per download, in ms")
+    parser.add_argument("--size-mb", type=float, default=4, help="size of each fake download, in MB")
+    parser.add_argument("--rate-limits", action="store_true", help="keep the per-host rate limits")
+    args = parser.parse_args()
+
+    from PySide6.QtCore import QCoreApplication, QEventLoop, Qt, QTimer
+    import spotipy
+
+    from frames.frame_functions import http_client
+    from frames.frame_functions.download_engine import DownloadEngine
+    from frames.frame_functions.import_engine import ImportEngine
+    from frames.frame_functions.library_model import LibraryModel
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stub = f"http://127.0.0.1:{server.server_port}"
+    config = {"stub": stub, "latency": args.latency / 1000, "size": int(args.size_mb * 1024 * 1024),
+              "rate_limits": args.rate_limits}
+    os.environ[CONFIG_ENV] = json.dumps(config)
+    install_stand_ins(config)
+
+    app = QCoreApplication(sys.argv)
+    sp = spotipy.Spotify(auth="benchmark", requests_session=http_client.session)
+    sp.prefix = stub + "/v1/"
+    work_dir = tempfile.mkdtemp(prefix="vibeflow_import_bench_")
+    download_engine = DownloadEngine(args.workers, os.path.join(work_dir, "resolve_cache.db"))
+
+    def run_import(size):
+        run_dir = os.path.join(work_dir, str(size))
+        os.makedirs(run_dir)
+        library = LibraryModel(os.path.join(run_dir, "library.db"))
+
+        def find_existing_song_id(track):
+            if track.get('id') in library.songs_by_id:
+                return track['id']
+            song = library.find_song(track['name'], track['artists'][0]['name'])
+            return song['id'] if song is not None else None
+
+        loop = QEventLoop()
+        dispatched, latencies, result = {}, [], {}
+
+        def on_status(track_id, status):
+            if status == "Downloading...":
+                dispatched[track_id] = time.perf_counter()
+            elif status == "Downloaded" and track_id in dispatched:
+                latencies.append(time.perf_counter() - dispatched.pop(track_id))
+
+        def on_finished(song_ids, failed):
+            library.create_playlist(f"Benchmark {size}", song_ids)
+            result.update(imported=len(song_ids), failed=len(failed))
+            loop.quit()
+
+        stalls = []
+        last_tick = [time.perf_counter()]
+
+        def on_tick():
+            now = time.perf_counter()
+            stalls.append(max(0.0, now - last_tick[0] - STALL_TICK_MS / 1000))
+            last_tick[0] = now
+
+        ticker = QTimer()
+        ticker.setTimerType(Qt.PreciseTimer)
+        ticker.setInterval(STALL_TICK_MS)
+        ticker.timeout.connect(on_tick)
+        ticker.start()
+
+        start = time.perf_counter()
+        tracks = fetch_playlist(sp, f"{size:022d}")
+        engine = ImportEngine(tracks, run_dir, download_engine, find_existing_song_id, library.add_song,
+                              args.workers, playlist_name=f"Benchmark {size}",
+                              queue_path=os.path.join(run_dir, "import_queue.json"))
+        engine.trackStatus.connect(on_status)
+        engine.finished.connect(on_finished)
+        QTimer.singleShot(0, engine.start)
+        loop.exec()
+        elapsed = time.perf_counter() - start
+        ticker.stop()
+        library.close()
+        return elapsed, latencies, stalls, result
+
+    try:
+        # Spawns the worker processes and loads yt_dlp in them, as the first download after startup does
+        run_import(args.workers)
+
+        print(f"{'tracks':>7} {'tracks/min':>11} {'p50':>9} {'p95':>9} {'stall total':>12} {'max stall':>10}"
+              f" {'failed':>7}")
+        for size in args.sizes:
+            elapsed, latencies, stalls, result = run_import(size)
+            print(f"{size:>7} {result['imported'] / elapsed * 60:>11.1f}"
+                  f" {statistics.median(latencies) * 1000:>7.0f}ms {percentile(latencies, 0.95) * 1000:>7.0f}ms"
+                  f" {sum(stalls) * 1000:>10.0f}ms {max(stalls, default=0) * 1000:>8.1f}ms {result['failed']:>7}")
+    finally:
+        download_engine.shutdown()
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+        app.quit()
+
+
+if __name__ == "__main__":
+    main()
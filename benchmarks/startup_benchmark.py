@@ -0,0 +1,105 @@
+"""
+Startup benchmark for the library store.
+
+Compares, for synthetic libraries of different sizes:
+  - legacy:  parsing a data.json the way the app used to on every start
+  - cold:    LibraryStore loading from SQLite (no usable snapshot)
+  - warm:    LibraryStore loading the pickled snapshot written on the last clean close
+
+Usage:
+    python benchmarks/startup_benchmark.py [--sizes 1000 10000 50000] [--repeat 3]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frames.frame_functions.library_store import LibraryStore  # noqa: E402
+
+
+def make_legacy_library(path, size, root):
+    songs = []
+    for i in range(size):
+        name = f"Track {i}"
+        songs.append({
+            "song_name": name,
+            "artist": f"Artist {i % 700}",
+            "mp3_location": os.path.join(root, f"{name}.mp3"),
+            "cover_location": os.path.join(root, "covers", f"{name}.jpg"),
+            "lyrics_location": os.path.join(root, "lyrics", f"{name}.lrc"),
+            "id": f"{i:022d}",
+            "artist_id": f"{i % 700:022d}",
+        })
+    playlists = {"All songs": {"songs": list(range(size)), "playlist_cover": "auto"}}
+    for p in range(20):
+        playlists[f"Playlist {p}"] = {"songs": list(range(p, size, 37)), "playlist_cover": "auto"}
+    data = {"All Songs": songs, "Playlists": playlists, "Settings": {"download_path": root}}
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def load_legacy(path):
+    with open(path) as f:
+        data = json.load(f)
+    songs = data["All Songs"]
+    valid_indices = set(range(len(songs)))
+    for info in data["Playlists"].values():
+        info["songs"] = [idx for idx in info["songs"] if idx in valid_indices]
+    return {song["id"]: i for i, song in enumerate(songs)}
+
+
+def open_store(db_path, drop_snapshot):
+    """Returns the time taken to construct the store; closing it (which rewrites the snapshot) is not timed."""
+    if drop_snapshot:
+        os.remove(os.path.splitext(db_path)[0] + ".snapshot.pickle")
+    start = time.perf_counter()
+    store = LibraryStore(db_path)
+    elapsed = time.perf_counter() - start
+    store.close()
+    return elapsed
+
+
+def bench_size(size, repeat):
+    work_dir = tempfile.mkdtemp(prefix="vibeflow-bench-")
+    try:
+        json_path = os.path.join(work_dir, "data.json")
+        db_path = os.path.join(work_dir, "library.db")
+        make_legacy_library(json_path, size, os.path.join(work_dir, "music"))
+
+        # One-time migration into SQLite; closing writes the first snapshot. Its report would split the table.
+        with contextlib.redirect_stdout(io.StringIO()):
+            LibraryStore(db_path, json_path).close()
+
+        legacy = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            load_legacy(json_path)
+            legacy.append(time.perf_counter() - start)
+        cold = [open_store(db_path, drop_snapshot=True) for _ in range(repeat)]
+        warm = [open_store(db_path, drop_snapshot=False) for _ in range(repeat)]
+        return min(legacy) * 1000, min(cold) * 1000, min(warm) * 1000
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'songs':>8} {'legacy json':>12} {'cold sqlite':>12} {'warm snapshot':>14}")
+    for size in args.sizes:
+        legacy_ms, cold_ms, warm_ms = bench_size(size, args.repeat)
+        print(f"{size:>8} {legacy_ms:>10.1f}ms {cold_ms:>10.1f}ms {warm_ms:>12.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Per-track yt_dlp overhead: a new YoutubeDL per song versus the warm YoutubeDLPool.
+
+Offline (default), each "track" constructs or borrows a YoutubeDL and resolves
+the extractors a ytsearch1 download goes through, which is the setup paid
+before any network traffic.
+
+With --online, each track also runs the ytsearch1 search and resolves the
+first result's formats (no media is downloaded), so connection reuse and the
+cached YouTube player code show up in the numbers too.
+
+Usage:
+    python benchmarks/ytdl_benchmark.py [--tracks 20] [--online]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from yt_dlp import YoutubeDL  # noqa: E402
+
+from frames.frame_functions.ytdl_pool import AUDIO_OPTS, YoutubeDLPool  # noqa: E402
+
+QUERIES = ["Daft Punk Around the World audio", "Radiohead Reckoner audio", "Massive Attack Teardrop audio",
+           "Portishead Roads audio", "Bonobo Kerala audio"]
+
+
+def run_track(ydl, query, online):
+    if online:
+        ydl.extract_info(query, download=False)
+    else:
+        ydl.get_info_extractor("YoutubeSearch")
+        ydl.get_info_extractor("Youtube")
+
+
+def bench_cold(tracks, online):
+    start = time.perf_counter()
+    for i in range(tracks):
+        with YoutubeDL(dict(AUDIO_OPTS)) as ydl:
+            run_track(ydl, QUERIES[i % len(QUERIES)], online)
+    return (time.perf_counter() - start) / tracks
+
+
+def bench_warm(tracks, online):
+    pool = YoutubeDLPool()
+    # The first borrow builds the instance, as the first download after startup does
+    start = time.perf_counter()
+    for i in range(tracks):
+        ydl = pool.acquire()
+        run_track(ydl, QUERIES[i % len(QUERIES)], online)
+        pool.release(ydl)
+    elapsed = time.perf_counter() - start
+    pool.close()
+    return elapsed / tracks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, default=20)
+    parser.add_argument("--online", action="store_true", help="search YouTube for real (needs network)")
+    args = parser.parse_args()
+
+    # Pay yt_dlp's one-time extractor import outside both measurements
+    YoutubeDL(dict(AUDIO_OPTS)).close()
+
+    cold = bench_cold(args.tracks, args.online)
+    warm = bench_warm(args.tracks, args.online)
+    print(f"{'mode':>8} {'per track':>12}")
+    print(f"{'new':>8} {cold * 1000:>10.1f}ms")
+    print(f"{'pooled':>8} {warm * 1000:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
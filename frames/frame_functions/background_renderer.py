@@ -0,0 +1,111 @@
+from collections import OrderedDict
+
+import numpy as np
+from PySide6.QtCore import QObject, QRunnable, QSize, QThreadPool, Qt, Signal
+from PySide6.QtGui import QImage, QPixmap
+
+BLUR_RADIUS = 20  # at full window size, matching the old QGraphicsBlurEffect
+DOWNSCALE = 8  # the blur runs on a copy this many times smaller, then is scaled back up
+BLUR_PASSES = 3  # three box blurs are close to a gaussian
+CACHE_SIZE = 6
+
+
+def box_blur(pixels, radius, passes=BLUR_PASSES):
+    """Separable box blur of an (h, w, channels) array; edges are extended rather than faded to black."""
+    result = pixels.astype(np.float32)
+    width = 2 * radius + 1
+    for _ in range(passes):
+        for axis in (0, 1):
+            pad = [(0, 0)] * result.ndim
+            pad[axis] = (radius + 1, radius)
+            sums = np.cumsum(np.pad(result, pad, mode="edge"), axis=axis)
+            n = result.shape[axis]
+            if axis == 0:
+                result = (sums[width:width + n] - sums[:n]) / width
+            else:
+                result = (sums[:, width:width + n] - sums[:, :n]) / width
+    return result
+
+
+def render_background(image, size):
+    """Returns `image` blurred and cropped to fill `size` (a QImage; safe to call off the GUI thread)."""
+    small = QSize(max(1, size.width() // DOWNSCALE), max(1, size.height() // DOWNSCALE))
+    scaled = image.scaled(small, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+    x = (scaled.width() - small.width()) // 2
+    y = (scaled.height() - small.height()) // 2
+    cropped = scaled.copy(x, y, small.width(), small.height()).convertToFormat(QImage.Format_RGB32)
+
+    w, h = cropped.width(), cropped.height()
+    pixels = np.frombuffer(cropped.constBits(), np.uint8).reshape(h, cropped.bytesPerLine())[:, :w * 4]
+    blurred = box_blur(pixels.reshape(h, w, 4), max(1, round(BLUR_RADIUS / DOWNSCALE)))
+    blurred = np.ascontiguousarray(np.clip(blurred + 0.5, 0, 255).astype(np.uint8))
+    result = QImage(blurred.data, w, h, w * 4, QImage.Format_RGB32).copy()
+    return result.scaled(size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+
+
+class BackgroundJob(QRunnable):
+    class Signals(QObject):
+        finished = Signal(object, QImage)  # cache key, blurred image
+
+    def __init__(self, key, image, size):
+        super().__init__()
+        self.key = key
+        self.image = image
+        self.size = size
+        self.signals = self.Signals()
+
+    def run(self):
+        self.signals.finished.emit(self.key, render_background(self.image, self.size))
+
+
+class BackgroundRenderer(QObject):
+    """
+    Blurred window backgrounds, cached per (cover, size) and rendered on a worker thread.
+
+    pixmap() never blurs on the caller's thread: a size that isn't cached yet
+    is queued and, until `ready` fires, the nearest cached background for the
+    same cover is returned for the caller to stretch. While a window is being
+    resized only the latest size waits behind the job in progress.
+    """
+
+    ready = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.cache = OrderedDict()  # (cover key, width, height) -> QPixmap
+        self.threadpool = QThreadPool(self)
+        self.threadpool.setMaxThreadCount(1)
+        self.running = None
+        self.pending = None
+
+    def pixmap(self, cover, size):
+        """Returns the blurred background for `cover` at `size`, a stand-in for it, or None."""
+        if cover.isNull() or size.isEmpty():
+            return None
+        key = (cover.cacheKey(), size.width(), size.height())
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        if key not in (self.running, self.pending and self.pending[0]):
+            self.pending = (key, cover.toImage(), QSize(size))
+            self.start_pending()
+        same_cover = [cached for (cover_key, _, _), cached in self.cache.items() if cover_key == key[0]]
+        return same_cover[-1] if same_cover else None
+
+    def start_pending(self):
+        if self.running is not None or self.pending is None:
+            return
+        key, image, size = self.pending
+        self.pending = None
+        self.running = key
+        job = BackgroundJob(key, image, size)
+        job.signals.finished.connect(self.on_rendered)
+        self.threadpool.start(job)
+
+    def on_rendered(self, key, image):
+        self.running = None
+        self.cache[key] = QPixmap.fromImage(image)
+        while len(self.cache) > CACHE_SIZE:
+            self.cache.popitem(last=False)
+        self.start_pending()
+        self.ready.emit()
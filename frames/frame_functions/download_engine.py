@@ -0,0 +1,145 @@
+import heapq
+import itertools
+import multiprocessing
+import threading
+
+from PySide6.QtCore import QObject, Signal
+
+from frames.frame_functions import song_download
+from frames.frame_functions.net_scheduler import INTERACTIVE, scheduler
+
+DEFAULT_PROCESSES = 3
+
+
+class SongDownloader:
+    """A single song download; start it with DownloadEngine.start() and listen on `signals`."""
+
+    class Signals(QObject):
+        finished = Signal(dict, int)
+        error = Signal(str, int)
+        progress = Signal(str, int)
+        buffered = Signal(dict, int)  # {"part_path", "final_path", "total_bytes"}; only with stream=True
+
+    def __init__(self, track_info, ui_index, download_path, priority=INTERACTIVE, stream=False):
+        self.track_info = track_info
+        self.ui_index = ui_index
+        self.download_path = download_path
+        self.priority = priority
+        self.stream = stream
+        self.signals = self.Signals()
+
+
+class DownloadEngine:
+    """
+    Runs song downloads in a pool of worker processes.
+
+    yt_dlp's extraction and post-processing are CPU-heavy Python, so running
+    them in the GUI process starves the Qt event loop of the GIL. Workers are
+    spawned on the first download. The IPC is deliberately small:
+
+      - progress: workers put (job_id, kind, payload) on a shared queue, read
+        by a listener thread here; besides text updates this carries the
+        "enough audio to start playing" notice for streaming downloads;
+      - completion and errors: the pool's async result callbacks, carrying
+        the song dict or the exception.
+
+    Each is re-emitted on the downloader's Qt signals, which deliver to the
+    GUI thread.
+
+    Jobs are handed to the pool only when a worker is free, most urgent
+    priority first, so a download the user clicked runs next instead of
+    queuing behind a playlist import.
+    """
+
+    def __init__(self, processes=DEFAULT_PROCESSES, resolve_cache_path=None):
+        self.processes = processes
+        self.resolve_cache_path = resolve_cache_path
+        self._pool = None
+        self._pool_size = 0
+        self._progress_queue = None
+        self._listener = None
+        self._jobs = {}
+        self._waiting = []  # heap of (priority, job_id) not yet handed to the pool
+        self._running = 0
+        self._job_ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def set_processes(self, processes):
+        """Takes effect the next time the engine is idle."""
+        self.processes = max(1, int(processes))
+
+    def start(self, downloader):
+        with self._lock:
+            if self._pool is not None and not self._jobs and self._pool_size != self.processes:
+                self._pool.close()
+                self._pool = None
+            if self._pool is None:
+                self._start_pool()
+            job_id = next(self._job_ids)
+            self._jobs[job_id] = downloader
+            heapq.heappush(self._waiting, (downloader.priority, job_id))
+            self._submit_waiting()
+
+    def _submit_waiting(self):
+        while self._waiting and self._running < self._pool_size:
+            _, job_id = heapq.heappop(self._waiting)
+            downloader = self._jobs[job_id]
+            self._running += 1
+            self._pool.apply_async(song_download.run_job,
+                                   (job_id, downloader.track_info, downloader.download_path, downloader.priority,
+                                    downloader.stream),
+                                   callback=lambda song, j=job_id: self._on_finished(j, song),
+                                   error_callback=lambda e, j=job_id: self._on_error(j, e))
+
+    def _start_pool(self):
+        # spawn everywhere: forking a process that runs Qt threads is unsafe
+        context = multiprocessing.get_context("spawn")
+        if self._progress_queue is None:
+            self._progress_queue = context.Queue()
+            self._listener = threading.Thread(target=self._listen, name="DownloadProgress", daemon=True)
+            self._listener.start()
+        self._pool = context.Pool(self.processes, initializer=song_download.init_worker,
+                                  initargs=(self._progress_queue, self.resolve_cache_path,
+                                            scheduler.share(context)))
+        self._pool_size = self.processes
+
+    def _listen(self):
+        while True:
+            message = self._progress_queue.get()
+            if message is None:
+                return
+            job_id, kind, payload = message
+            downloader = self._jobs.get(job_id)
+            if downloader is None:
+                continue
+            if kind == song_download.BUFFERED:
+                downloader.signals.buffered.emit(payload, downloader.ui_index)
+            else:
+                downloader.signals.progress.emit(payload, downloader.ui_index)
+
+    def _on_finished(self, job_id, song):
+        with self._lock:
+            downloader = self._jobs.pop(job_id)
+            self._running -= 1
+            self._submit_waiting()
+        downloader.signals.finished.emit(song, downloader.ui_index)
+
+    def _on_error(self, job_id, error):
+        with self._lock:
+            downloader = self._jobs.pop(job_id)
+            self._running -= 1
+            self._submit_waiting()
+        downloader.signals.error.emit(str(error), downloader.ui_index)
+
+    def shutdown(self):
+        """Stops the workers, abandoning downloads still in progress."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool = None
+            self._jobs.clear()
+            self._waiting.clear()
+            self._running = 0
+        if self._progress_queue is not None:
+            self._progress_queue.put(None)
+            self._progress_queue = None
@@ -0,0 +1,57 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from frames.frame_functions.net_scheduler import VISIBLE, scheduler
+
+DEFAULT_TIMEOUT = (5, 15)  # (connect, read) seconds, used when a call doesn't pass its own
+POOL_SIZE = 16  # keep-alive connections kept per host
+CHUNK_SIZE = 64 * 1024
+
+RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=("GET", "HEAD"),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+
+def make_session():
+    new_session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=RETRY)
+    new_session.mount("https://", adapter)
+    new_session.mount("http://", adapter)
+    return new_session
+
+
+# One per process. urllib3's connection pools are thread-safe and nothing
+# changes the session after this point, so every thread shares it and reuses
+# its kept-alive connections instead of paying a new TCP/TLS handshake per call.
+session = make_session()
+
+
+def get(url, timeout=DEFAULT_TIMEOUT, gzip=True, priority=VISIBLE, **kwargs):
+    """
+    GET through the shared session; failed connections and 429/5xx responses are retried with backoff.
+
+    Waits for the host's rate limit first, queued by `priority` (see net_scheduler).
+
+    Responses are gzip-compressed when the server supports it. Pass
+    gzip=False for bodies that are already compressed (images, audio), where
+    it only costs CPU on both ends.
+    """
+    if not gzip:
+        kwargs["headers"] = {**(kwargs.get("headers") or {}), "Accept-Encoding": "identity"}
+    scheduler.acquire(url, priority)
+    return session.get(url, timeout=timeout, **kwargs)
+
+
+def download(url, path, timeout=DEFAULT_TIMEOUT, priority=VISIBLE):
+    """Streams `url` to the file at `path`; raises on an HTTP error status."""
+    with get(url, timeout=timeout, gzip=False, priority=priority, stream=True) as response:
+        response.raise_for_status()
+        with open(path, "wb") as f:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                f.write(chunk)
@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+from PySide6.QtGui import QImage
+
+from frames.frame_functions import http_client
+from frames.frame_functions.net_scheduler import VISIBLE, thread_priority
+from frames.frame_functions.thumbnail_cache import fit_image
+
+FETCH_WORKERS = 5
+CACHE_BYTES = 32 * 1024 * 1024  # fitted images kept in memory
+
+
+class ImageFetchJob(QRunnable):
+    class Signals(QObject):
+        finished = Signal(str, list)  # url, [((width, height, radius), QImage)]
+        error = Signal(str, str)
+
+    def __init__(self, url, shape, priority=VISIBLE):
+        super().__init__()
+        self.url = url
+        self.shapes = {shape}
+        self.priority = priority
+        self.lock = threading.Lock()
+        self.accepting = True
+        self.signals = self.Signals()
+
+    def add_shape(self, shape):
+        """Asks for one more fitting of this image; False once the job is past the download and it's too late."""
+        with self.lock:
+            if self.accepting:
+                self.shapes.add(shape)
+            return self.accepting
+
+    def run(self):
+        content, error = b"", None
+        try:
+            response = http_client.get(self.url, timeout=10, gzip=False, priority=self.priority)
+            response.raise_for_status()
+            content = response.content
+        except Exception as e:
+            error = str(e)
+        with self.lock:
+            self.accepting = False
+            shapes = list(self.shapes)
+        image = QImage.fromData(content) if content else QImage()
+        if image.isNull():
+            self.signals.error.emit(self.url, error or f"Failed to load image data for {self.url}")
+            return
+        self.signals.finished.emit(self.url, [(shape, fit_image(image, *shape)) for shape in shapes])
+
+
+class ImagePipeline(QObject):
+    """
+    Downloads, decodes and fits remote images (album art) off the GUI thread.
+
+    request() returns a cached image straight away or None, in which case the
+    image arrives through `imageReady` as a QImage of exactly the requested
+    size, cropped to fill it and with rounded corners if asked for. Requests
+    for a URL that is already being fetched join that fetch, at whatever
+    size they need, so many cards showing one cover cost one download.
+    """
+
+    imageReady = Signal(str, object, QImage)  # url, (width, height, radius), image
+    imageFailed = Signal(str, str)  # url, message
+
+    def __init__(self, workers=FETCH_WORKERS, parent=None):
+        super().__init__(parent)
+        self.threadpool = QThreadPool(self)
+        self.threadpool.setMaxThreadCount(workers)
+        self.cache = OrderedDict()  # (url, width, height, radius) -> QImage
+        self.cache_bytes = 0
+        self.jobs = {}  # url -> ImageFetchJob in flight
+
+    def request(self, url, size, radius=0, priority=VISIBLE):
+        """Returns the image at `url` fitted to `size` if it is cached, otherwise None and it is fetched."""
+        shape = (size.width(), size.height(), radius)
+        key = (url,) + shape
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        job = self.jobs.get(url)
+        if job is not None and job.add_shape(shape):
+            return None
+        job = ImageFetchJob(url, shape, priority)
+        job.signals.finished.connect(lambda url, results, job=job: self.on_finished(job, results))
+        job.signals.error.connect(lambda url, message, job=job: self.on_error(job, message))
+        self.jobs[url] = job
+        self.threadpool.start(job, thread_priority(priority))
+        return None
+
+    def on_finished(self, job, results):
+        if self.jobs.get(job.url) is job:
+            del self.jobs[job.url]
+        for shape, image in results:
+            key = (job.url,) + shape
+            self.cache_bytes += image.sizeInBytes()
+            if key in self.cache:
+                self.cache_bytes -= self.cache.pop(key).sizeInBytes()
+            self.cache[key] = image
+        while self.cache_bytes > CACHE_BYTES and len(self.cache) > 1:
+            self.cache_bytes -= self.cache.popitem(last=False)[1].sizeInBytes()
+        for shape, image in results:
+            self.imageReady.emit(job.url, shape, image)
+
+    def on_error(self, job, message):
+        if self.jobs.get(job.url) is job:
+            del self.jobs[job.url]
+        print(f"Image download error for {job.url}: {message}")
+        self.imageFailed.emit(job.url, message)
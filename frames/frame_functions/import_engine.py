@@ -0,0 +1,219 @@
+import json
+import os
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from frames.frame_functions.download_engine import SongDownloader
+from frames.frame_functions.library_store import song_key
+from frames.frame_functions.net_scheduler import BULK
+
+DEFAULT_WORKERS = 3
+MAX_WORKERS = 8
+SAVE_DELAY_MS = 1000  # state changes within this window share one queue file write
+
+STATUS_COLORS = {
+    "In Library": "#a9b1d6",
+    "Downloading...": "#e0e0e0",
+    "Downloaded": "#4ecdc4",
+    "Failed": "#ff6b6b",
+}
+
+# Per-track states kept in the queue file
+PENDING = "pending"
+FETCHING = "fetching"
+DONE = "done"
+FAILED = "failed"
+
+
+def compact_track(track):
+    """Keeps only the Spotify track fields the downloader uses, so the queue file stays small."""
+    images = (track.get('album') or {}).get('images') or []
+    return {
+        'id': track.get('id'),
+        'name': track.get('name'),
+        'artists': [{'name': artist.get('name'), 'id': artist.get('id')} for artist in track.get('artists', [])],
+        'album': {'images': images[:1]},
+        'duration_ms': track.get('duration_ms'),
+    }
+
+
+class ImportEngine(QObject):
+    """
+    Imports a list of Spotify tracks with at most `workers` downloads in flight.
+
+    Tracks already in the library (checked when a track is dispatched, so songs
+    finished by earlier workers count too) are not downloaded again, and a
+    track listed twice is downloaded once. `finished` reports the library ids
+    in the original track order, whatever order the downloads completed in.
+
+    When `queue_path` is given, the tracks and each one's state (pending,
+    fetching, done, failed) are written there shortly after every change, so
+    an import interrupted by closing the app can be picked up again with
+    resume(). Downloads that were fetching restart from yt_dlp's .part file.
+    """
+
+    trackStatus = Signal(str, str)  # spotify track id, "In Library" / "Downloading..." / "Downloaded" / "Failed"
+    finished = Signal(list, list)  # song ids in playlist order, failed tracks
+
+    def __init__(self, tracks, download_path, download_engine, find_existing_song_id, add_song, workers=None,
+                 parent=None, playlist_name=None, queue_path=None):
+        super().__init__(parent)
+        self.tracks = [compact_track(track) for track in tracks]
+        self.download_path = download_path
+        self.download_engine = download_engine
+        self.find_existing_song_id = find_existing_song_id
+        self.add_song = add_song
+        self.workers = max(1, min(int(workers or DEFAULT_WORKERS), MAX_WORKERS))
+        self.playlist_name = playlist_name
+        self.queue_path = queue_path
+
+        self.states = [PENDING] * len(self.tracks)
+        self.results = [None] * len(self.tracks)
+        self.failed = []
+        self.next_position = 0
+        self.active = 0
+        self.in_flight = {}  # track key -> positions waiting on that download
+
+        # Coalesces queue writes; rewriting the whole file per track stalls the GUI thread on big imports
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(SAVE_DELAY_MS)
+        self.save_timer.timeout.connect(self.save)
+
+    @classmethod
+    def load_queue(cls, queue_path):
+        """Returns the saved queue dict left by an interrupted import, or None."""
+        try:
+            with open(queue_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Discarding unreadable import queue {queue_path}: {e}")
+            try:
+                os.remove(queue_path)
+            except OSError as e:
+                print(f"Could not remove import queue {queue_path}: {e}")
+            return None
+
+    def resume(self, saved, is_song_present):
+        """Restores per-track progress from a saved queue; finished songs missing from the library are redone."""
+        for position, (state, song_id) in enumerate(zip(saved["states"], saved["song_ids"])):
+            if state == DONE and is_song_present(song_id):
+                self.states[position] = DONE
+                self.results[position] = song_id
+            elif state == FAILED:
+                self.states[position] = FAILED
+                self.failed.append(self.tracks[position])
+
+    def save(self):
+        self.save_timer.stop()
+        if not self.queue_path:
+            return
+        tmp_path = self.queue_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"playlist_name": self.playlist_name, "download_path": self.download_path,
+                           "tracks": self.tracks, "states": self.states, "song_ids": self.results}, f,
+                          separators=(",", ":"))
+            os.replace(tmp_path, self.queue_path)
+        except OSError as e:
+            # The import carries on; it just can't be resumed from this point after a crash
+            print(f"Could not save import queue {self.queue_path}: {e}")
+
+    def schedule_save(self):
+        if self.queue_path and not self.save_timer.isActive():
+            self.save_timer.start()
+
+    def flush(self):
+        """Writes a pending queue update now, e.g. before the app exits."""
+        if self.save_timer.isActive():
+            self.save()
+
+    def discard(self):
+        self.save_timer.stop()
+        if not self.queue_path:
+            return
+        try:
+            os.remove(self.queue_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Could not remove import queue {self.queue_path}: {e}")
+
+    @staticmethod
+    def track_key(track):
+        try:
+            return song_key(track['name'], track['artists'][0]['name'])
+        except (KeyError, IndexError):
+            return track.get('id')
+
+    def start(self):
+        for track, state in zip(self.tracks, self.states):
+            if state == DONE:
+                self.trackStatus.emit(track['id'], "Downloaded")
+            elif state == FAILED:
+                self.trackStatus.emit(track['id'], "Failed")
+        self.save()
+        self.dispatch()
+
+    def dispatch(self):
+        changed = False
+        while self.active < self.workers and self.next_position < len(self.tracks):
+            position = self.next_position
+            self.next_position += 1
+            if self.states[position] != PENDING:
+                continue
+            track = self.tracks[position]
+
+            existing_id = self.find_existing_song_id(track)
+            if existing_id is not None:
+                self.states[position] = DONE
+                self.results[position] = existing_id
+                changed = True
+                self.trackStatus.emit(track['id'], "In Library")
+                continue
+
+            key = self.track_key(track)
+            if key in self.in_flight:
+                self.in_flight[key].append(position)
+                continue
+
+            self.in_flight[key] = [position]
+            self.states[position] = FETCHING
+            changed = True
+            self.active += 1
+            self.trackStatus.emit(track['id'], "Downloading...")
+            downloader = SongDownloader(track, position, self.download_path, BULK)
+            downloader.signals.finished.connect(self.on_downloaded)
+            downloader.signals.error.connect(self.on_download_error)
+            self.download_engine.start(downloader)
+
+        if self.active == 0 and self.next_position >= len(self.tracks):
+            self.discard()
+            self.finished.emit([song_id for song_id in self.results if song_id is not None], self.failed)
+        elif changed:
+            self.schedule_save()
+
+    def on_downloaded(self, new_song_info, position):
+        self.active -= 1
+        existing_id = self.find_existing_song_id({'id': new_song_info['id'], 'name': new_song_info['song_name'],
+                                                  'artists': [{'name': new_song_info['artist']}]})
+        song_id = existing_id if existing_id is not None else self.add_song(new_song_info)['id']
+        for waiting in self.in_flight.pop(self.track_key(self.tracks[position]), [position]):
+            self.states[waiting] = DONE
+            self.results[waiting] = song_id
+            self.trackStatus.emit(self.tracks[waiting]['id'], "Downloaded")
+        self.schedule_save()
+        self.dispatch()
+
+    def on_download_error(self, error_msg, position):
+        self.active -= 1
+        for waiting in self.in_flight.pop(self.track_key(self.tracks[position]), [position]):
+            track = self.tracks[waiting]
+            print(f"Failed to download {track.get('name')}: {error_msg}")
+            self.states[waiting] = FAILED
+            self.failed.append(track)
+            self.trackStatus.emit(track['id'], "Failed")
+        self.schedule_save()
+        self.dispatch()
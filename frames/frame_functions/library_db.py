@@ -0,0 +1,347 @@
+import json
+import os
+import sqlite3
+import uuid
+
+SONG_COLUMNS = ("song_name", "artist", "mp3_location", "cover_location", "lyrics_location", "artist_id")
+
+DEFAULT_SETTINGS = {
+    "download_path": "",
+    "recently_played": [],
+    "groq_api_key": "",
+    "spotify_client_id": "",
+    "spotify_client_secret": "",
+    "import_workers": 3,
+    "convert_to_mp3": False
+}
+
+SONG_SELECT = "song_id, song_name, artist, mp3_location, cover_location, lyrics_location, artist_id, extra"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS songs (
+    song_id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    song_name TEXT NOT NULL DEFAULT '',
+    artist TEXT NOT NULL DEFAULT '',
+    mp3_location TEXT NOT NULL DEFAULT '',
+    cover_location TEXT NOT NULL DEFAULT '',
+    lyrics_location TEXT NOT NULL DEFAULT '',
+    artist_id TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_songs_position ON songs(position);
+CREATE INDEX IF NOT EXISTS idx_songs_name_artist ON songs(song_name COLLATE NOCASE, artist COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_songs_mp3 ON songs(mp3_location);
+CREATE TABLE IF NOT EXISTS playlists (
+    playlist_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    playlist_cover TEXT NOT NULL DEFAULT 'auto'
+);
+CREATE TABLE IF NOT EXISTS playlist_items (
+    playlist_id INTEGER NOT NULL REFERENCES playlists(playlist_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    song_id TEXT NOT NULL REFERENCES songs(song_id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_playlist_items_order ON playlist_items(playlist_id, position);
+CREATE INDEX IF NOT EXISTS idx_playlist_items_song ON playlist_items(song_id);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class LibraryDatabase:
+    """
+    Embedded SQLite store for songs, playlists and settings.
+
+    This is the compacted snapshot of the library; recent changes live in the
+    journal until LibraryStore folds them in with apply_journal(), touching
+    only the rows each operation changes. The connection may be handed to a
+    single writer thread after loading.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    # --- Migration ---
+
+    def is_initialized(self):
+        return self.get_meta("initialized") == "1"
+
+    def initialize(self, legacy_json_path=None):
+        """
+        Seeds a new database. If a legacy data.json exists it is imported once;
+        the JSON file itself is left untouched as a backup.
+        """
+        if self.is_initialized():
+            return
+
+        data = {}
+        if legacy_json_path and os.path.exists(legacy_json_path):
+            try:
+                with open(legacy_json_path) as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Could not read legacy library '{legacy_json_path}': {e}")
+                data = {}
+
+        songs = data.get("All Songs", [])
+        playlists = data.get("Playlists", {})
+        settings = dict(DEFAULT_SETTINGS)
+        settings.update(data.get("Settings", {}))
+
+        song_ids = []
+        seen_ids = set()
+        with self.conn:
+            for position, song in enumerate(songs):
+                song = dict(song)
+                song_id = song.get("id")
+                if not song_id or song_id in seen_ids:
+                    song_id = f"local_{uuid.uuid4().hex}"
+                    song["id"] = song_id
+                seen_ids.add(song_id)
+                song_ids.append(song_id)
+                self._insert_song(song, position)
+
+            if "All songs" not in playlists:
+                playlists = {"All songs": {"songs": list(range(len(songs))), "playlist_cover": "auto"}, **playlists}
+
+            for name, info in playlists.items():
+                ids = [song_ids[idx] for idx in info.get("songs", [])
+                       if isinstance(idx, int) and 0 <= idx < len(song_ids)]
+                self._insert_playlist(name, ids, info.get("playlist_cover", "auto"))
+
+            # Legacy entries are positions in "All Songs"; keep only the ones that still resolve
+            settings["recently_played"] = [song_ids[idx] for idx in settings.get("recently_played") or []
+                                           if isinstance(idx, int) and 0 <= idx < len(song_ids)]
+            self._write_settings(settings)
+            self.set_meta("initialized", "1")
+            if data:
+                print(f"Migrated {len(songs)} songs and {len(playlists)} playlists from {legacy_json_path}.")
+
+    # --- Loading ---
+
+    def load(self, make_songs=None):
+        """
+        Returns (all_songs, playlists, settings) in the in-memory shape the UI uses.
+        Playlists reference songs by id. make_songs builds the song list from an
+        iterable of song rows (defaults to plain dicts).
+        """
+        rows = self.conn.execute(f"SELECT {SONG_SELECT} FROM songs ORDER BY position")
+        all_songs = make_songs(rows) if make_songs else [self._row_to_song(row) for row in rows]
+
+        playlists = {}
+        playlist_ids = {}
+        for playlist_id, name, cover in self.conn.execute(
+                "SELECT playlist_id, name, playlist_cover FROM playlists ORDER BY playlist_id"):
+            playlists[name] = {"songs": [], "playlist_cover": cover}
+            playlist_ids[playlist_id] = name
+
+        # Foreign keys guarantee every item references an existing song
+        for playlist_id, song_id in self.conn.execute(
+                "SELECT playlist_id, song_id FROM playlist_items ORDER BY playlist_id, position"):
+            playlists[playlist_ids[playlist_id]]["songs"].append(song_id)
+
+        if "All songs" not in playlists:
+            playlists["All songs"] = {"songs": [s["id"] for s in all_songs], "playlist_cover": "auto"}
+            with self.conn:
+                self._insert_playlist("All songs", playlists["All songs"]["songs"], "auto")
+
+        settings = dict(DEFAULT_SETTINGS)
+        for key, value in self.conn.execute("SELECT key, value FROM settings"):
+            try:
+                settings[key] = json.loads(value)
+            except (TypeError, json.JSONDecodeError):
+                settings[key] = value
+
+        return all_songs, playlists, settings
+
+    @staticmethod
+    def _row_to_song(row):
+        song_id, song_name, artist, mp3, cover, lyrics, artist_id, extra = row
+        song = json.loads(extra) if extra else {}
+        song.update({
+            "song_name": song_name,
+            "artist": artist,
+            "mp3_location": mp3,
+            "cover_location": cover,
+            "lyrics_location": lyrics,
+            "id": song_id,
+            "artist_id": artist_id
+        })
+        return song
+
+    # --- Journal compaction ---
+
+    def apply_journal(self, entries, last_seq):
+        """
+        Applies journal entries (see LibraryStore) in a single transaction and
+        records last_seq, so entries at or below it are skipped on the next replay.
+        """
+        with self.conn:
+            for entry in entries:
+                handler = getattr(self, f"_op_{entry['op']}", None)
+                if handler is None:
+                    print(f"Skipping unknown journal operation: {entry['op']}")
+                    continue
+                handler(entry)
+            self.set_meta("journal_seq", str(last_seq))
+
+    def _op_add_song(self, entry):
+        position = self.conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM songs").fetchone()[0]
+        self._insert_song(entry["song"], position)
+        if entry.get("all_songs"):
+            self._append_items("All songs", [entry["song"]["id"]])
+
+    def _op_update_song(self, entry):
+        row = self.conn.execute(f"SELECT {SONG_SELECT} FROM songs WHERE song_id = ?", (entry["id"],)).fetchone()
+        if row is None:
+            return
+        song = self._row_to_song(row)
+        song.update(entry["changes"])
+        self.conn.execute(
+            "UPDATE songs SET song_name = ?, artist = ?, mp3_location = ?, cover_location = ?, "
+            "lyrics_location = ?, artist_id = ?, extra = ? WHERE song_id = ?",
+            (*self._song_values(song), song["id"]))
+
+    def _op_delete_songs(self, entry):
+        """Deletes songs (and their playlist entries) and closes the gaps left in playlist positions."""
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS doomed (song_id TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM doomed")
+        self.conn.executemany("INSERT OR IGNORE INTO doomed (song_id) VALUES (?)", ((i,) for i in entry["ids"]))
+        affected = [r[0] for r in self.conn.execute(
+            "SELECT DISTINCT playlist_id FROM playlist_items WHERE song_id IN (SELECT song_id FROM doomed)")]
+        self.conn.execute("DELETE FROM songs WHERE song_id IN (SELECT song_id FROM doomed)")
+        self.conn.execute("DELETE FROM doomed")
+        for playlist_id in affected:
+            self._renumber_playlist(playlist_id)
+
+    def _op_create_playlist(self, entry):
+        self.conn.execute("DELETE FROM playlists WHERE name = ?", (entry["name"],))
+        self._insert_playlist(entry["name"], entry["songs"], entry.get("cover", "auto"))
+
+    def _op_delete_playlist(self, entry):
+        self.conn.execute("DELETE FROM playlists WHERE name = ?", (entry["name"],))
+
+    def _op_rename_playlist(self, entry):
+        self.conn.execute("UPDATE playlists SET name = ? WHERE name = ?", (entry["new_name"], entry["old_name"]))
+
+    def _op_set_playlist_cover(self, entry):
+        self.conn.execute(
+            "UPDATE playlists SET playlist_cover = ? WHERE name = ?", (entry["cover"] or "auto", entry["name"]))
+
+    def _op_set_playlist_songs(self, entry):
+        playlist_id = self._playlist_id(entry["name"])
+        if playlist_id is None:
+            self._insert_playlist(entry["name"], entry["songs"])
+            return
+        self.conn.execute("DELETE FROM playlist_items WHERE playlist_id = ?", (playlist_id,))
+        self.conn.executemany(
+            "INSERT INTO playlist_items (playlist_id, position, song_id) VALUES (?, ?, ?)",
+            ((playlist_id, pos, song_id) for pos, song_id in enumerate(entry["songs"])))
+
+    def _op_add_to_playlist(self, entry):
+        self._append_items(entry["name"], entry["songs"])
+
+    def _op_move_in_playlist(self, entry):
+        """Moves one item; only the rows between the two positions are rewritten."""
+        source, target = entry["source"], entry["target"]
+        playlist_id = self._playlist_id(entry["name"])
+        if playlist_id is None or source == target:
+            return
+        if source < target:
+            shift, low, high = -1, source, target
+        else:
+            shift, low, high = 1, target, source
+        self.conn.execute(
+            "UPDATE playlist_items SET position = CASE WHEN position = ? THEN ? ELSE position + ? END "
+            "WHERE playlist_id = ? AND position BETWEEN ? AND ?",
+            (source, target, shift, playlist_id, low, high))
+
+    def _op_remove_from_playlist(self, entry):
+        playlist_id = self._playlist_id(entry["name"])
+        if playlist_id is None:
+            return
+        self.conn.execute(
+            "DELETE FROM playlist_items WHERE playlist_id = ? AND position = ?", (playlist_id, entry["position"]))
+        self.conn.execute(
+            "UPDATE playlist_items SET position = position - 1 WHERE playlist_id = ? AND position > ?",
+            (playlist_id, entry["position"]))
+
+    def _op_settings(self, entry):
+        self._write_settings(entry["values"])
+
+    def _append_items(self, name, song_ids):
+        playlist_id = self._playlist_id(name)
+        if playlist_id is None:
+            return
+        start = self.conn.execute(
+            "SELECT COUNT(*) FROM playlist_items WHERE playlist_id = ?", (playlist_id,)).fetchone()[0]
+        self.conn.executemany(
+            "INSERT INTO playlist_items (playlist_id, position, song_id) VALUES (?, ?, ?)",
+            ((playlist_id, start + offset, song_id) for offset, song_id in enumerate(song_ids)))
+
+    def _renumber_playlist(self, playlist_id):
+        self.conn.execute("""
+            WITH ranked AS (
+                SELECT rowid AS rid, ROW_NUMBER() OVER (ORDER BY position) - 1 AS new_position
+                FROM playlist_items WHERE playlist_id = ?
+            )
+            UPDATE playlist_items SET position = ranked.new_position
+            FROM ranked WHERE playlist_items.rowid = ranked.rid
+        """, (playlist_id,))
+
+    def _insert_song(self, song, position):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO songs (song_name, artist, mp3_location, cover_location, lyrics_location, "
+            "artist_id, extra, song_id, position) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (*self._song_values(song), song["id"], position))
+
+    @staticmethod
+    def _song_values(song):
+        extra = {k: v for k, v in song.items() if k not in SONG_COLUMNS and k != "id"}
+        return (*(song.get(c) or "" for c in SONG_COLUMNS[:5]), song.get("artist_id"),
+                json.dumps(extra) if extra else None)
+
+    def _playlist_id(self, name):
+        row = self.conn.execute("SELECT playlist_id FROM playlists WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _insert_playlist(self, name, song_ids, cover="auto"):
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO playlists (name, playlist_cover) VALUES (?, ?)", (name, cover or "auto"))
+        playlist_id = cursor.lastrowid if cursor.rowcount else self._playlist_id(name)
+        self.conn.executemany(
+            "INSERT INTO playlist_items (playlist_id, position, song_id) VALUES (?, ?, ?)",
+            ((playlist_id, pos, song_id) for pos, song_id in enumerate(song_ids)))
+        return playlist_id
+
+    def get_setting(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _write_settings(self, settings):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+            ((key, json.dumps(value)) for key, value in settings.items()))
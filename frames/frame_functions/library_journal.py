@@ -0,0 +1,61 @@
+import json
+import os
+
+
+class LibraryJournal:
+    """
+    Append-only JSONL log of library mutations, one operation per line.
+
+    Appending costs the same no matter how large the library is. A crash can
+    at worst leave a half-written last line, which read() drops.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+
+    def read(self):
+        """Returns every complete entry, trimming a torn final line left by a crash."""
+        entries = []
+        valid_bytes = 0
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        break
+                    valid_bytes += len(line)
+        except FileNotFoundError:
+            self.count = 0
+            return entries
+
+        if valid_bytes < os.path.getsize(self.path):
+            print(f"Discarding incomplete journal entries in {self.path}")
+            self.close()
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_bytes)
+
+        self.count = len(entries)
+        return entries
+
+    def append(self, entries):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write("".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.count += len(entries)
+
+    def truncate(self):
+        self.close()
+        open(self.path, "w").close()
+        self.count = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
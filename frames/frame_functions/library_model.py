@@ -0,0 +1,89 @@
+from PySide6.QtCore import QObject, Signal
+
+from frames.frame_functions.library_store import LibraryStore
+
+# Fields no view shows, so changing them doesn't make views redraw the song. Lyrics and
+# audio paths are only read when a song is played, and background jobs fill them in.
+SILENT_FIELDS = frozenset({"palette", "lyrics_location", "mp3_location"})
+
+
+class LibraryModel(LibraryStore):
+    """
+    LibraryStore that announces every change through Qt signals.
+
+    Views connect to `signals` and update only the rows a change touches
+    instead of redrawing everything after each edit. Signals are emitted after
+    the in-memory library has been updated.
+    """
+
+    class Signals(QObject):
+        songAdded = Signal(object)
+        songChanged = Signal(str, list)  # song id, changed fields
+        songsRemoved = Signal(list)
+        playlistAdded = Signal(str)
+        playlistRemoved = Signal(str)
+        playlistRenamed = Signal(str, str)
+        playlistChanged = Signal(str)
+        playlistReordered = Signal(str, int, int)
+
+    def __init__(self, db_path, legacy_json_path=None):
+        # Journal replay in LibraryStore.__init__ goes through the overrides below
+        self.signals = LibraryModel.Signals()
+        super().__init__(db_path, legacy_json_path)
+
+    def add_song(self, song, add_to_all_songs=True):
+        song = super().add_song(song, add_to_all_songs)
+        self.signals.songAdded.emit(song)
+        if add_to_all_songs:
+            self.signals.playlistChanged.emit("All songs")
+        return song
+
+    def update_song(self, song_id, changes):
+        super().update_song(song_id, changes)
+        if not SILENT_FIELDS.issuperset(changes):
+            self.signals.songChanged.emit(song_id, list(changes))
+
+    def delete_songs(self, song_ids):
+        doomed = {song_id for song_id in song_ids if song_id in self.songs_by_id}
+        if not doomed:
+            return
+        affected = [name for name, members in self.playlist_members.items() if not doomed.isdisjoint(members)]
+        super().delete_songs(doomed)
+        self.signals.songsRemoved.emit(list(doomed))
+        for name in affected:
+            self.signals.playlistChanged.emit(name)
+
+    def create_playlist(self, name, song_ids, cover="auto"):
+        super().create_playlist(name, song_ids, cover)
+        self.signals.playlistAdded.emit(name)
+
+    def delete_playlist(self, name):
+        if name in self.playlists:
+            super().delete_playlist(name)
+            self.signals.playlistRemoved.emit(name)
+
+    def rename_playlist(self, old_name, new_name):
+        if old_name == new_name or old_name not in self.playlists:
+            return
+        super().rename_playlist(old_name, new_name)
+        self.signals.playlistRenamed.emit(old_name, new_name)
+
+    def set_playlist_cover(self, name, cover):
+        super().set_playlist_cover(name, cover)
+        self.signals.playlistChanged.emit(name)
+
+    def set_playlist_songs(self, name, song_ids):
+        super().set_playlist_songs(name, song_ids)
+        self.signals.playlistChanged.emit(name)
+
+    def add_to_playlist(self, name, song_ids):
+        super().add_to_playlist(name, song_ids)
+        self.signals.playlistChanged.emit(name)
+
+    def move_in_playlist(self, name, source_pos, target_pos):
+        super().move_in_playlist(name, source_pos, target_pos)
+        self.signals.playlistReordered.emit(name, source_pos, target_pos)
+
+    def remove_from_playlist(self, name, position):
+        super().remove_from_playlist(name, position)
+        self.signals.playlistChanged.emit(name)
@@ -0,0 +1,397 @@
+import copy
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from frames.frame_functions.library_db import LibraryDatabase
+from frames.frame_functions.library_journal import LibraryJournal
+from frames.frame_functions.song import Song
+
+
+def song_key(title, artist):
+    """Normalized (title, artist) key used to recognise a track that is already in the library."""
+    return (title or "").lower().strip(), (artist or "").lower().strip()
+
+
+def path_key(path):
+    return (path or "").replace("\\", "/").lower()
+
+
+class LibraryStore:
+    """
+    Owns the in-memory library (songs, playlists, settings) and is the only
+    place that writes it to disk. Songs are Song records keyed by their stable
+    id; playlists hold lists of ids, so removing a song never renumbers anything.
+
+    Mutations update memory immediately and queue a small journal entry
+    (song added, playlist item moved, setting changed, ...) that refers to songs
+    by id. A background writer appends queued entries to the journal after a
+    short quiet period, and once the journal grows past COMPACT_THRESHOLD it
+    folds the entries into the SQLite snapshot in one transaction and empties
+    the journal. On startup the journal is replayed on top of the snapshot.
+
+    On a clean close the parsed library is also pickled next to the database
+    as plain per-field columns, keyed by the size and mtime of the database,
+    its WAL and the journal. If none of those changed, the next startup loads
+    the columns and skips the query, JSON decoding and journal replay.
+
+    Lookup indexes (songs by id and per-playlist membership counts) are updated
+    incrementally by every mutation, so lookups never scan the library. The
+    title/artist and file path indexes are only needed when adding or importing
+    songs, so they are built on first use and then kept up to date the same way.
+    """
+
+    SNAPSHOT_VERSION = 3
+
+    FLUSH_DELAY = 0.5  # seconds without new edits before queued entries are appended
+    MAX_FLUSH_DELAY = 3.0  # upper bound on how long an edit may stay in memory only
+    RETRY_DELAY = 5.0
+    COMPACT_THRESHOLD = 1000  # journal entries
+
+    def __init__(self, db_path, legacy_json_path=None):
+        base_path = os.path.splitext(db_path)[0]
+        self.db_path = db_path
+        self.snapshot_path = base_path + ".snapshot.pickle"
+        self.journal = LibraryJournal(base_path + ".journal.jsonl")
+        self._replaying = False
+
+        # The key has to be taken before the database is opened, which creates an empty WAL
+        snapshot = self._read_snapshot()
+        self.db = LibraryDatabase(db_path)
+        if snapshot is not None:
+            self.root = snapshot["root"]
+            self.all_songs = Song.from_columns(snapshot["songs"], self.root)
+            self.playlists = snapshot["playlists"]
+            self.settings = snapshot["settings"]
+            self._build_indexes()
+            self._compacted_seq = self._seq = snapshot["seq"]
+        else:
+            self.db.initialize(legacy_json_path)
+            # Paths under the download folder are stored relative to it (see Song)
+            self.root = (self.db.get_setting("download_path") or "").rstrip("/\\")
+            self.all_songs, self.playlists, self.settings = self.db.load(
+                lambda rows: Song.from_rows(rows, self.root))
+            self._build_indexes()
+
+            self._compacted_seq = int(self.db.get_meta("journal_seq", "0"))
+            self._seq = self._compacted_seq
+            self._replay([entry for entry in self.journal.read() if entry["seq"] > self._compacted_seq])
+        self._saved_settings = copy.deepcopy(self.settings)
+
+        self._pending = []
+        self._last_change = 0.0
+        self._closing = False
+        self._cond = threading.Condition()
+        self._writer = threading.Thread(target=self._writer_loop, name="LibraryStoreWriter", daemon=True)
+        self._writer.start()
+
+    # --- Indexes ---
+
+    def _build_indexes(self):
+        self.songs_by_id = {song.id: song for song in self.all_songs}
+        self.playlist_members = {name: Counter(info["songs"]) for name, info in self.playlists.items()}
+        self._songs_by_key = self._songs_by_path = None
+
+    def _build_lookup_indexes(self):
+        self._songs_by_key = {}
+        self._songs_by_path = {}
+        for song in self.all_songs:
+            self._songs_by_key.setdefault(song_key(song.song_name, song.artist), song)
+            self._songs_by_path[path_key(song.mp3_location)] = song
+
+    @property
+    def songs_by_key(self):
+        if self._songs_by_key is None:
+            self._build_lookup_indexes()
+        return self._songs_by_key
+
+    @property
+    def songs_by_path(self):
+        if self._songs_by_path is None:
+            self._build_lookup_indexes()
+        return self._songs_by_path
+
+    def _index_song(self, song):
+        self.songs_by_id[song.id] = song
+        if self._songs_by_key is not None:
+            self._songs_by_key.setdefault(song_key(song.song_name, song.artist), song)
+            self._songs_by_path[path_key(song.mp3_location)] = song
+
+    def _unindex_song(self, song):
+        self.songs_by_id.pop(song.id, None)
+        if self._songs_by_key is None:
+            return
+        key = song_key(song.song_name, song.artist)
+        if self._songs_by_key.get(key) is song:
+            del self._songs_by_key[key]
+        path = path_key(song.mp3_location)
+        if self._songs_by_path.get(path) is song:
+            del self._songs_by_path[path]
+
+    def find_song(self, title, artist):
+        """Returns the library song with this title and artist (case-insensitive), or None."""
+        return self.songs_by_key.get(song_key(title, artist))
+
+    def find_song_by_path(self, path):
+        return self.songs_by_path.get(path_key(path))
+
+    def playlist_contains(self, name, song_id):
+        return song_id in self.playlist_members.get(name, ())
+
+    # --- Songs ---
+
+    def add_song(self, song, add_to_all_songs=True):
+        """Appends a song (a Song or a song dict) to the library and to "All songs", returning the Song."""
+        if not isinstance(song, Song):
+            song = Song.from_dict(song, self.root)
+        self.all_songs.append(song)
+        self._index_song(song)
+        if add_to_all_songs:
+            self.playlists["All songs"]["songs"].append(song.id)
+            self.playlist_members["All songs"][song.id] += 1
+        self._log("add_song", song=song.to_dict(), all_songs=add_to_all_songs)
+        return song
+
+    def update_song(self, song_id, changes):
+        song = self.songs_by_id[song_id]
+        self._unindex_song(song)
+        song.update(changes)
+        self._index_song(song)
+        self._log("update_song", id=song_id, changes=dict(changes))
+
+    def delete_songs(self, song_ids):
+        """Removes songs from the library and from every playlist in a single pass over each."""
+        doomed = {song_id for song_id in song_ids if song_id in self.songs_by_id}
+        if not doomed:
+            return
+        self._log("delete_songs", ids=list(doomed))
+        for song_id in doomed:
+            self._unindex_song(self.songs_by_id[song_id])
+        self.all_songs[:] = [song for song in self.all_songs if song.id not in doomed]
+        # A deleted song may have shadowed another in the title/artist or path index; rebuilt on next use
+        self._songs_by_key = self._songs_by_path = None
+        for name, info in self.playlists.items():
+            members = self.playlist_members[name]
+            if doomed.isdisjoint(members):
+                continue
+            info["songs"] = [song_id for song_id in info["songs"] if song_id not in doomed]
+            for song_id in doomed:
+                members.pop(song_id, None)
+
+    # --- Playlists ---
+
+    def create_playlist(self, name, song_ids, cover="auto"):
+        self.playlists[name] = {"songs": list(song_ids), "playlist_cover": cover or "auto"}
+        self.playlist_members[name] = Counter(song_ids)
+        self._log("create_playlist", name=name, songs=list(song_ids), cover=cover or "auto")
+
+    def delete_playlist(self, name):
+        if self.playlists.pop(name, None) is not None:
+            self.playlist_members.pop(name, None)
+            self._log("delete_playlist", name=name)
+
+    def rename_playlist(self, old_name, new_name):
+        if old_name == new_name or old_name not in self.playlists:
+            return
+        self.playlists[new_name] = self.playlists.pop(old_name)
+        self.playlist_members[new_name] = self.playlist_members.pop(old_name)
+        self._log("rename_playlist", old_name=old_name, new_name=new_name)
+
+    def set_playlist_cover(self, name, cover):
+        self.playlists[name]["playlist_cover"] = cover
+        self._log("set_playlist_cover", name=name, cover=cover)
+
+    def set_playlist_songs(self, name, song_ids):
+        self.playlists[name]["songs"] = list(song_ids)
+        self.playlist_members[name] = Counter(song_ids)
+        self._log("set_playlist_songs", name=name, songs=list(song_ids))
+
+    def add_to_playlist(self, name, song_ids):
+        self.playlists[name]["songs"].extend(song_ids)
+        self.playlist_members[name].update(song_ids)
+        self._log("add_to_playlist", name=name, songs=list(song_ids))
+
+    def move_in_playlist(self, name, source_pos, target_pos):
+        songs = self.playlists[name]["songs"]
+        songs.insert(target_pos, songs.pop(source_pos))
+        self._log("move_in_playlist", name=name, source=source_pos, target=target_pos)
+
+    def remove_from_playlist(self, name, position):
+        songs = self.playlists[name]["songs"]
+        song_id = songs.pop(position)
+        members = self.playlist_members[name]
+        members[song_id] -= 1
+        if not members[song_id]:
+            del members[song_id]
+        self._log("remove_from_playlist", name=name, position=position)
+
+    # --- Settings ---
+
+    def save_settings(self):
+        """Journals the settings that changed since the last save."""
+        changed = {key: copy.deepcopy(value) for key, value in self.settings.items()
+                   if key not in self._saved_settings or self._saved_settings[key] != value}
+        if changed:
+            self._saved_settings.update(copy.deepcopy(changed))
+            self._log("settings", values=changed)
+
+    # --- Journal ---
+
+    def _log(self, op, **fields):
+        if self._replaying:
+            return
+        with self._cond:
+            self._seq += 1
+            self._pending.append({"seq": self._seq, "op": op, **fields})
+            self._last_change = time.monotonic()
+            self._cond.notify()
+
+    def _replay(self, entries):
+        """Re-applies journal entries that were not yet compacted into the database."""
+        if not entries:
+            return
+
+        def known(song_ids):
+            return [song_id for song_id in song_ids if song_id in self.songs_by_id]
+
+        self._replaying = True
+        try:
+            for entry in entries:
+                op = entry["op"]
+                name = entry.get("name")
+                if op == "add_song":
+                    self.add_song(entry["song"], entry.get("all_songs") and "All songs" in self.playlists)
+                elif op == "update_song" and entry["id"] in self.songs_by_id:
+                    self.update_song(entry["id"], entry["changes"])
+                elif op == "delete_songs":
+                    self.delete_songs(entry["ids"])
+                elif op == "create_playlist":
+                    self.create_playlist(name, known(entry["songs"]), entry.get("cover", "auto"))
+                elif op == "delete_playlist":
+                    self.delete_playlist(name)
+                elif op == "rename_playlist":
+                    self.rename_playlist(entry["old_name"], entry["new_name"])
+                elif op == "settings":
+                    self.settings.update(entry["values"])
+                elif name in self.playlists:
+                    if op == "set_playlist_cover":
+                        self.set_playlist_cover(name, entry["cover"])
+                    elif op == "set_playlist_songs":
+                        self.set_playlist_songs(name, known(entry["songs"]))
+                    elif op == "add_to_playlist":
+                        self.add_to_playlist(name, known(entry["songs"]))
+                    elif op == "move_in_playlist":
+                        self.move_in_playlist(name, entry["source"], entry["target"])
+                    elif op == "remove_from_playlist":
+                        self.remove_from_playlist(name, entry["position"])
+        finally:
+            self._replaying = False
+        self._seq = entries[-1]["seq"]
+
+    def _writer_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing and self.journal.count < self.COMPACT_THRESHOLD:
+                    self._cond.wait()
+                first_change = time.monotonic()
+                while self._pending and not self._closing:
+                    wait = min(self._last_change + self.FLUSH_DELAY,
+                               first_change + self.MAX_FLUSH_DELAY) - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                batch, self._pending = self._pending, []
+                closing = self._closing
+
+            if batch and not self._append(batch):
+                with self._cond:
+                    self._pending[:0] = batch
+                    if closing:
+                        return
+                    self._cond.wait(self.RETRY_DELAY)
+                continue
+
+            if closing or self.journal.count >= self.COMPACT_THRESHOLD:
+                if not self._compact() and not closing:
+                    with self._cond:
+                        self._cond.wait(self.RETRY_DELAY)
+            if closing:
+                return
+
+    def _append(self, batch):
+        try:
+            self.journal.append(batch)
+            return True
+        except OSError as e:
+            print(f"Error writing library journal: {e}")
+            return False
+
+    def _compact(self):
+        """Folds the journal into the database and empties it. Runs on the writer thread only."""
+        try:
+            entries = [entry for entry in self.journal.read() if entry["seq"] > self._compacted_seq]
+            if entries:
+                self.db.apply_journal(entries, entries[-1]["seq"])
+                self._compacted_seq = entries[-1]["seq"]
+            self.journal.truncate()
+            return True
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error compacting library journal: {e}")
+            return False
+
+    def close(self):
+        """Stops the writer after it has journaled and compacted everything still pending."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._writer.join()
+        self.journal.close()
+        self.db.close()
+        if not self._pending and self.journal.count == 0:
+            self._write_snapshot()
+
+    # --- Startup snapshot ---
+
+    def _snapshot_key(self):
+        key = [self.SNAPSHOT_VERSION]
+        for path in (self.db_path, self.db_path + "-wal", self.journal.path):
+            try:
+                stat = os.stat(path)
+                key.append((stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                key.append(None)
+        return tuple(key)
+
+    def _read_snapshot(self):
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Ignoring unreadable library snapshot: {e}")
+            return None
+        if not isinstance(snapshot, dict) or snapshot.get("key") != self._snapshot_key():
+            return None
+        return snapshot
+
+    def _write_snapshot(self):
+        """Pickles the library as of a clean close. Only the database is left, so the journal is empty."""
+        snapshot = {
+            "key": self._snapshot_key(),
+            "root": self.root,
+            "songs": Song.to_columns(self.all_songs),
+            "playlists": self.playlists,
+            "settings": self.settings,
+            "seq": self._seq,
+        }
+        temp_path = self.snapshot_path + ".tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.snapshot_path)
+        except (OSError, pickle.PicklingError) as e:
+            print(f"Could not write library snapshot: {e}")
@@ -0,0 +1,39 @@
+from frames.frame_functions import http_client
+from frames.frame_functions.net_scheduler import BULK
+
+LRCLIB_GET = "https://lrclib.net/api/get"
+LRCLIB_SEARCH = "https://lrclib.net/api/search"
+DURATION_TOLERANCE = 2  # seconds lrclib's exact match allows between the track and its lyrics
+
+
+def lyrics_text(record):
+    return (record or {}).get('syncedLyrics') or (record or {}).get('plainLyrics') or ""
+
+
+def lookup_lyrics(song_name, artist_name, duration=None, priority=BULK):
+    """
+    Returns synced (or else plain) lyrics for a track, or "" when lrclib has none.
+
+    With a duration (seconds) the exact-match endpoint is tried first, which
+    picks the right version of songs with several recordings. Without one, or
+    when it finds nothing, falls back to search, preferring the result closest
+    in length. Network and HTTP errors are raised.
+    """
+    params = {"track_name": song_name, "artist_name": artist_name}
+    if duration:
+        resp = http_client.get(LRCLIB_GET, params={**params, "duration": int(round(duration))}, timeout=10,
+                               priority=priority)
+        if resp.status_code != 404:
+            resp.raise_for_status()
+            lyrics = lyrics_text(resp.json())
+            if lyrics:
+                return lyrics
+
+    resp = http_client.get(LRCLIB_SEARCH, params=params, timeout=10, priority=priority)
+    resp.raise_for_status()
+    results = [result for result in resp.json() or [] if lyrics_text(result)]
+    if duration:
+        close = [result for result in results
+                 if abs((result.get('duration') or 0) - duration) <= DURATION_TOLERANCE]
+        results = close or results
+    return lyrics_text(results[0]) if results else ""
@@ -0,0 +1,142 @@
+import json
+import os
+import time
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+from frames.frame_functions.lrclib import lookup_lyrics
+from frames.frame_functions.net_scheduler import BACKGROUND, thread_priority
+
+BACKFILL_WORKERS = 2
+NOT_FOUND_RETRY = 14 * 24 * 3600  # seconds before asking lrclib again about a song it had no lyrics for
+SAVE_EVERY = 20  # results between cache writes
+
+
+def has_lyrics(path):
+    try:
+        return bool(path) and os.path.getsize(path) > 0
+    except OSError:
+        return False
+
+
+class LyricsLookupJob(QRunnable):
+    class Signals(QObject):
+        finished = Signal(str, str)  # song id, lyrics path ("" when lrclib has none)
+        error = Signal(str, str)
+
+    def __init__(self, song_id, song_name, artist, duration, lrc_path):
+        super().__init__()
+        self.song_id = song_id
+        self.song_name = song_name
+        self.artist = artist
+        self.duration = duration
+        self.lrc_path = lrc_path
+        self.signals = self.Signals()
+
+    def run(self):
+        if has_lyrics(self.lrc_path):
+            # Filled in some other way since the scan
+            self.signals.finished.emit(self.song_id, self.lrc_path)
+            return
+        try:
+            lyrics = lookup_lyrics(self.song_name, self.artist, self.duration, BACKGROUND)
+            if lyrics:
+                with open(self.lrc_path, 'w', encoding='utf-8') as f:
+                    f.write(lyrics)
+        except Exception as e:
+            self.signals.error.emit(self.song_id, str(e))
+            return
+        self.signals.finished.emit(self.song_id, self.lrc_path if lyrics else "")
+
+
+class LyricsBackfill(QObject):
+    """
+    Looks up lyrics for library songs whose .lrc file is missing or empty.
+
+    Runs at background priority with at most `workers` lookups at a time.
+    Songs lrclib had nothing for are remembered in the cache file at
+    `cache_path` and not asked about again for NOT_FOUND_RETRY; lookups that
+    failed on the network are retried on the next start.
+    """
+
+    lyricsFound = Signal(str)  # song id
+
+    def __init__(self, library, cache_path, workers=BACKFILL_WORKERS, parent=None):
+        super().__init__(parent)
+        self.library = library
+        self.cache_path = cache_path
+        self.threadpool = QThreadPool(self)
+        self.threadpool.setMaxThreadCount(workers)
+        self.workers = workers
+        self.not_found = self.load_cache()
+        self.candidates = []
+        self.active = 0
+        self.unsaved = 0
+
+    def load_cache(self):
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                return json.load(f).get("not_found", {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable lyrics cache {self.cache_path}: {e}")
+            return {}
+
+    def save_cache(self):
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"not_found": self.not_found}, f)
+        os.replace(tmp_path, self.cache_path)
+        self.unsaved = 0
+
+    def start(self):
+        if self.candidates or self.active:
+            return
+        retry_before = time.time() - NOT_FOUND_RETRY
+        self.candidates = [song["id"] for song in self.library.all_songs
+                           if self.not_found.get(song["id"], 0) < retry_before
+                           and not has_lyrics(song.get("lyrics_location"))]
+        self.candidates.reverse()
+        self.dispatch()
+
+    def dispatch(self):
+        while self.active < self.workers and self.candidates:
+            song = self.library.songs_by_id.get(self.candidates.pop())
+            if song is None or not song.get("mp3_location"):
+                continue
+            lrc_path = song.get("lyrics_location") or os.path.splitext(song["mp3_location"])[0] + ".lrc"
+            job = LyricsLookupJob(song["id"], song["song_name"], song["artist"], song.get("duration"), lrc_path)
+            job.signals.finished.connect(self.on_finished)
+            job.signals.error.connect(self.on_error)
+            self.active += 1
+            self.threadpool.start(job, thread_priority(BACKGROUND))
+        if not self.active and self.unsaved:
+            self.save_cache()
+
+    def on_finished(self, song_id, lrc_path):
+        self.active -= 1
+        song = self.library.songs_by_id.get(song_id)
+        if not lrc_path:
+            self.not_found[song_id] = time.time()
+            self.unsaved += 1
+        elif song is not None:
+            if self.not_found.pop(song_id, None):
+                self.unsaved += 1
+            if song.get("lyrics_location") != lrc_path:
+                self.library.update_song(song_id, {"lyrics_location": lrc_path})
+            self.lyricsFound.emit(song_id)
+        if self.unsaved >= SAVE_EVERY:
+            self.save_cache()
+        self.dispatch()
+
+    def on_error(self, song_id, message):
+        self.active -= 1
+        print(f"Lyrics lookup for song {song_id} failed: {message}")
+        self.dispatch()
+
+    def shutdown(self):
+        self.candidates = []
+        self.threadpool.clear()
+        if self.unsaved:
+            self.save_cache()
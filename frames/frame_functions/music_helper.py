@@ -1,9 +1,9 @@
-import requests
 import base64
 import json
 import sys
 import urllib3
 from ddgs import DDGS
+from frames.frame_functions import http_client
 try:
     from pyDes import des, ECB, PAD_PKCS5
 except ImportError:
@@ -31,7 +31,7 @@ def get_lyrics(id):
     """Fetches lyrics for a given song ID."""
     try:
         url = lyrics_base_url + id
-        lyrics_json = requests.get(url, headers=headers).text
+        lyrics_json = http_client.get(url, headers=headers).text
         return json.loads(lyrics_json)['lyrics']
     except Exception:
         return None
@@ -85,7 +85,7 @@ def get_song(id, lyrics):
     """Gets a song's details by its ID."""
     try:
         url = song_details_base_url + id
-        song_response = requests.get(url, headers=headers, verify=False).text.encode().decode('unicode-escape')
+        song_response = http_client.get(url, headers=headers, verify=False).text.encode().decode('unicode-escape')
         song_response = json.loads(song_response)
         return format_song(song_response[id], lyrics)
     except Exception:
@@ -95,7 +95,7 @@ def get_song(id, lyrics):
 def get_song_id(url):
     """Extracts song ID from a JioSaavn URL."""
     try:
-        res = requests.get(url, headers=headers, data=[('bitrate', '320')], verify=False)
+        res = http_client.get(url, headers=headers, data=[('bitrate', '320')], verify=False)
         return res.text.split('"pid":"')[1].split('","')[0]
     except IndexError:
         print('Error: Could not find song ID. The link might be for an album or playlist.', file=sys.stderr)
@@ -0,0 +1,127 @@
+import heapq
+import itertools
+import threading
+import time
+from urllib.parse import urlparse
+
+# Priority classes, most urgent first
+INTERACTIVE = 0  # the user clicked something and is waiting on it
+VISIBLE = 1  # fills in what is on screen, e.g. cover thumbnails
+BULK = 2  # playlist imports
+BACKGROUND = 3  # prefetching nothing is showing yet
+
+# Host (and its subdomains) -> (requests per second, burst)
+HOST_LIMITS = {
+    "lrclib.net": (2, 5),
+    "scdn.co": (20, 40),  # Spotify's image CDN
+    "jiosaavn.com": (2, 4),
+    "youtube.com": (1, 3),
+}
+
+
+def thread_priority(priority):
+    """QThreadPool priority for a priority class; QThreadPool runs higher numbers first."""
+    return BACKGROUND - priority
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Takes a token and returns 0, or returns the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class SharedTokenBucket:
+    """TokenBucket whose state lives in shared memory, so several processes draw from one budget."""
+
+    def __init__(self, rate, burst, context):
+        self.rate = rate
+        self.burst = burst
+        self.state = context.Array("d", [burst, time.monotonic()])  # tokens, last update
+
+    def take(self):
+        with self.state.get_lock():
+            now = time.monotonic()
+            tokens = min(self.burst, self.state[0] + (now - self.state[1]) * self.rate)
+            self.state[1] = now
+            if tokens >= 1:
+                self.state[0] = tokens - 1
+                return 0
+            self.state[0] = tokens
+            return (1 - tokens) / self.rate
+
+
+class NetScheduler:
+    """
+    Per-host rate limits with priority ordering.
+
+    Every request to a host in `limits` takes a token from that host's bucket
+    first. When the bucket is empty, callers queue and the most urgent
+    priority class gets the next token, so a click or an on-screen thumbnail
+    doesn't wait behind a 300-track import. Hosts without a limit pass
+    straight through. Limits apply per process until share() moves the
+    buckets into shared memory for worker processes to adopt with use().
+    """
+
+    def __init__(self, limits=HOST_LIMITS):
+        self.buckets = {host: TokenBucket(rate, burst) for host, (rate, burst) in limits.items()}
+        self._waiting = {host: [] for host in limits}
+        self._cond = threading.Condition()
+        self._order = itertools.count()
+
+    def share(self, context):
+        """Moves the buckets into shared memory and returns them for use() in processes made by `context`."""
+        with self._cond:
+            if not all(isinstance(bucket, SharedTokenBucket) for bucket in self.buckets.values()):
+                self.buckets = {host: SharedTokenBucket(bucket.rate, bucket.burst, context)
+                                for host, bucket in self.buckets.items()}
+            return self.buckets
+
+    def use(self, buckets):
+        """Draws from `buckets` (from share() in the parent process) instead of this process's own."""
+        with self._cond:
+            self.buckets = dict(buckets)
+
+    def limited_host(self, host):
+        host = (host or "").lower()
+        for limited in self.buckets:
+            if host == limited or host.endswith("." + limited):
+                return limited
+        return None
+
+    def acquire(self, target, priority=VISIBLE):
+        """Blocks until a request to `target` (a URL or host name) may be sent."""
+        host = self.limited_host(urlparse(target).hostname if "://" in target else target)
+        if host is None:
+            return
+        bucket, waiting = self.buckets[host], self._waiting[host]
+        entry = (priority, next(self._order))
+        with self._cond:
+            heapq.heappush(waiting, entry)
+            try:
+                while True:
+                    if waiting[0] != entry:
+                        self._cond.wait()
+                        continue
+                    delay = bucket.take()
+                    if delay == 0:
+                        return
+                    self._cond.wait(delay)
+            finally:
+                waiting.remove(entry)
+                heapq.heapify(waiting)
+                self._cond.notify_all()
+
+
+scheduler = NetScheduler()
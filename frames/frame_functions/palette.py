@@ -0,0 +1,41 @@
+"""
+Dominant colours of a cover image.
+
+Qt-free so the download worker processes can compute a song's palette right
+after fetching its cover; the GUI side is PaletteService.
+"""
+import numpy as np
+from PIL import Image
+
+PALETTE_COLORS = 3
+SAMPLE_SIZE = 64  # covers are reduced to fit this square first; the palette barely changes
+DEFAULT_PALETTE = [(100, 100, 100), (80, 80, 80), (60, 60, 60)]
+
+
+def extract_palette(image_path, count=PALETTE_COLORS):
+    """Returns up to `count` (r, g, b) colours of the image, most common first."""
+    with Image.open(image_path) as image:
+        image.draft("RGB", (SAMPLE_SIZE, SAMPLE_SIZE))  # JPEGs decode straight at a fraction of full size
+        image = image.convert("RGBA")
+    image.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE))
+    pixels = np.asarray(image).reshape(-1, 4)
+    # Like ColorThief, transparent and near-white pixels don't count
+    keep = (pixels[:, 3] >= 125) & ~np.all(pixels[:, :3] > 250, axis=1)
+    return median_cut(pixels[keep, :3] if keep.any() else pixels[:, :3], count)
+
+
+def median_cut(pixels, count):
+    """Splits an (n, 3) array of colours into `count` boxes and returns their mean colours, largest box first."""
+    boxes = [pixels]
+    while len(boxes) < count:
+        ranges = [np.ptp(box, axis=0) if len(box) > 1 else np.zeros(3, pixels.dtype) for box in boxes]
+        scores = [int(spread.max()) * len(box) for spread, box in zip(ranges, boxes)]
+        i = int(np.argmax(scores))
+        if scores[i] == 0:
+            break
+        box = boxes.pop(i)
+        order = np.argsort(box[:, int(np.argmax(ranges[i]))], kind="stable")
+        half = len(box) // 2
+        boxes += [box[order[:half]], box[order[half:]]]
+    boxes.sort(key=len, reverse=True)
+    return [tuple(int(c) for c in np.rint(box.mean(axis=0))) for box in boxes]
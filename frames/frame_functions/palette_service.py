@@ -0,0 +1,77 @@
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+from frames.frame_functions.palette import DEFAULT_PALETTE, extract_palette
+
+DEFAULT_COVER = "icons/default-image.png"
+
+
+class PaletteJob(QRunnable):
+    class Signals(QObject):
+        finished = Signal(str, object)  # cover path, palette
+        error = Signal(str, str)
+
+    def __init__(self, cover_path):
+        super().__init__()
+        self.cover_path = cover_path
+        self.signals = self.Signals()
+
+    def run(self):
+        try:
+            palette = extract_palette(self.cover_path)
+        except Exception as e:
+            self.signals.error.emit(self.cover_path, str(e))
+            return
+        self.signals.finished.emit(self.cover_path, palette)
+
+
+class PaletteService(QObject):
+    """
+    Dominant colours of song covers, never computed on the GUI thread.
+
+    Downloads store a song's palette in its library record. For songs from
+    before that, palette() starts extracting it on a worker thread and
+    returns None; `paletteReady` fires when it is done and the palette is
+    written back to the song so it is only ever extracted once.
+    """
+
+    paletteReady = Signal(str, object)  # cover path, palette
+
+    def __init__(self, library, parent=None):
+        super().__init__(parent)
+        self.library = library
+        self.threadpool = QThreadPool(self)
+        self.threadpool.setMaxThreadCount(1)
+        self.cache = {}  # cover path -> palette
+        self.waiting = {}  # cover path -> ids of the songs to store its palette on
+
+    def palette(self, song):
+        """Returns the palette for `song`, or None while it is being extracted."""
+        if song.get("palette"):
+            return song["palette"]
+        cover_path = song.get("cover_location") or DEFAULT_COVER
+        if cover_path in self.cache:
+            return self.cache[cover_path]
+        if cover_path not in self.waiting:
+            self.waiting[cover_path] = set()
+            job = PaletteJob(cover_path)
+            job.signals.finished.connect(self.on_finished)
+            job.signals.error.connect(self.on_error)
+            self.threadpool.start(job)
+        if song.get("id") in self.library.songs_by_id:
+            self.waiting[cover_path].add(song["id"])
+        return None
+
+    def on_finished(self, cover_path, palette):
+        self.cache[cover_path] = palette
+        for song_id in self.waiting.pop(cover_path, ()):
+            song = self.library.songs_by_id.get(song_id)
+            if song is not None and song["cover_location"] == cover_path:
+                self.library.update_song(song_id, {"palette": palette})
+        self.paletteReady.emit(cover_path, palette)
+
+    def on_error(self, cover_path, message):
+        print(f"Error getting dominant colors for {cover_path}: {message}")
+        # Not stored on the songs, so a cover that is fixed later gets a real palette after a restart
+        self.waiting.pop(cover_path, None)
+        self.cache[cover_path] = DEFAULT_PALETTE
+        self.paletteReady.emit(cover_path, DEFAULT_PALETTE)
@@ -1,12 +1,11 @@
-import json
 import os
 import spotipy
-from PySide6.QtCore import Qt, QThreadPool
-from PySide6.QtGui import QPixmap, QIcon, QPixmapCache, QFont, QColor
+from PySide6.QtCore import Qt, QSize
+from PySide6.QtGui import QPixmap, QIcon, QFont, QColor
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
                                QListWidget, QPushButton, QFileDialog, QWidget, QScrollArea, QMessageBox,
                                QAbstractItemView, QCheckBox, QProgressBar, QListWidgetItem)
-from frames.search_frame import ImageDownloader
+from frames.frame_functions.thumbnail_cache import DIALOG_COVER, LIST_ICON
 from .utils import create_button, apply_hover_effect
 
 
@@ -64,10 +63,10 @@ class CreatePlaylistDialog(QDialog):
         self.song_list_widget.setSelectionMode(QListWidget.MultiSelection)
         self.song_list_widget.setStyleSheet("QListWidget::item { padding: 5px; }")
 
-        for i, song in enumerate(self.parent.all_songs):
+        for song in self.parent.all_songs:
             item = QListWidgetItem(f"{song['song_name']} - {song['artist']}")
-            item.setIcon(QIcon(song['cover_location']))
-            item.setData(Qt.UserRole, i)
+            item.setIcon(QIcon(self.parent.thumbnails.pixmap(song['cover_location'], LIST_ICON)))
+            item.setData(Qt.UserRole, song['id'])
             self.song_list_widget.addItem(item)
 
         main_layout.addWidget(self.song_list_widget)
@@ -178,32 +177,15 @@ class CreatePlaylistDialog(QDialog):
             self.update_cover_image()
 
     def update_cover_image(self):
-        if self.auto_cover:
-            pixmap = QPixmap("icons/music.png")
-        else:
-            pixmap = QPixmap(self.cover_path)
-
-        self.cover_label.setPixmap(pixmap.scaled(200, 200, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        cover_path = "icons/music.png" if self.auto_cover else self.cover_path
+        self.cover_label.setPixmap(self.parent.thumbnails.pixmap(cover_path, DIALOG_COVER))
 
     def get_playlist_info(self):
         playlist_name = self.name_input.text()
-        song_indexes = [item.data(Qt.UserRole) for item in self.song_list_widget.selectedItems()]
+        song_ids = [item.data(Qt.UserRole) for item in self.song_list_widget.selectedItems()]
         cover_info = "auto" if self.auto_cover else self.cover_path
-        return playlist_name, song_indexes, cover_info
-
-
-def update_playlists_to_json(file_path, playlists):
-    with open(file_path, 'r+') as f:
-        try:
-            data = json.load(f)
-        except json.JSONDecodeError:
-            data = {}
-
-        data['Playlists'] = playlists
+        return playlist_name, song_ids, cover_info
 
-        f.seek(0)
-        f.truncate()
-        json.dump(data, f, indent=4)
 
 class DownloadProgressDialog(QDialog):
     def __init__(self, playlist_name, total_songs, parent=None):
@@ -313,11 +295,13 @@ class ImportPlaylistsDialog(QDialog):
         super().__init__(parent)
         self.setWindowTitle("Import Spotify Playlist")
         self.setMinimumSize(480, 700)
+        self.setAttribute(Qt.WA_DeleteOnClose)
         self.track_widgets = []
         self.sp = self.parent().sp
+        self.playlist_cover_url = None
         self.setup_ui()
         self.apply_styles()
-        self.threadpool = QThreadPool()
+        self.parent().image_pipeline.imageReady.connect(self.on_image_ready)
 
     def setup_ui(self):
         self.main_layout = QVBoxLayout(self)
@@ -467,7 +451,7 @@ class ImportPlaylistsDialog(QDialog):
             self.update_playlist_info_widget(playlist_data)
 
             tracks = []
-            response = self.sp.playlist_items(playlist_id, fields='items.track(name,artists,album(images,name)),next')
+            response = self.sp.playlist_items(playlist_id, fields='items.track(name,artists,album(images,name),duration_ms),next')
             tracks.extend(response['items'])
             while response['next']:
                 response = self.sp.next(response)
@@ -498,9 +482,10 @@ class ImportPlaylistsDialog(QDialog):
             placeholder.fill(Qt.gray)
             self.playlist_cover_label.setPixmap(placeholder)
 
-            downloader = ImageDownloader(cover_url, {"id": "playlist_cover"})
-            downloader.signals.finished.connect(self.update_playlist_cover)
-            self.threadpool.start(downloader)
+            self.playlist_cover_url = cover_url
+            image = self.parent().image_pipeline.request(cover_url, QSize(150, 150))
+            if image is not None:
+                self.playlist_cover_label.setPixmap(QPixmap.fromImage(image))
         else:
             pixmap = QPixmap("icons/music.png")
             scaled_pixmap = pixmap.scaled(150, 150, Qt.KeepAspectRatio, Qt.SmoothTransformation)
@@ -508,10 +493,6 @@ class ImportPlaylistsDialog(QDialog):
 
         self.playlist_info_widget.setVisible(True)
 
-    def update_playlist_cover(self, url, pixmap):
-        scaled_pixmap = pixmap.scaled(150, 150, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.playlist_cover_label.setPixmap(scaled_pixmap)
-
     def create_song_widget(self, song):
         song_widget = QWidget()
         song_layout = QHBoxLayout(song_widget)
@@ -528,7 +509,7 @@ class ImportPlaylistsDialog(QDialog):
         cover_label.setStyleSheet("border-radius: 4px;")
         if song["album"]["images"]:
             url = song["album"]["images"][-1]["url"]
-            cover_pix = self.load_pixmap_from_url(url, song)
+            cover_pix = self.load_pixmap_from_url(url)
             cover_label.setPixmap(cover_pix)
             cover_label.setProperty("url", url)
         else:
@@ -585,26 +566,30 @@ class ImportPlaylistsDialog(QDialog):
         else:
             QMessageBox.critical(self, "Error", "Cannot find the import handler. Import failed.")
 
-    def load_pixmap_from_url(self, url, song):
-        pixmap = QPixmapCache.find(url)
-        if pixmap:
-            return pixmap.scaled(45, 45, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-
-        downloader = ImageDownloader(url, song)
-        downloader.signals.finished.connect(self.update_pixmap)
-        self.threadpool.start(downloader)
+    def load_pixmap_from_url(self, url):
+        image = self.parent().image_pipeline.request(url, QSize(45, 45))
+        if image is not None:
+            return QPixmap.fromImage(image)
 
         placeholder = QPixmap(45, 45)
         placeholder.fill(Qt.transparent)
         return placeholder
 
-    def update_pixmap(self, url, pixmap):
-        QPixmapCache.insert(url, pixmap)
-        for widget in self.track_widgets:
-            for child in widget.findChildren(QLabel):
-                if child.property("url") == url:
-                    child.setPixmap(pixmap.scaled(45, 45, Qt.KeepAspectRatio, Qt.SmoothTransformation))
-                    break
+    def done(self, result):
+        # The pipeline outlives the dialog; stop sending it artwork for a search nobody sees
+        self.parent().image_pipeline.imageReady.disconnect(self.on_image_ready)
+        super().done(result)
+
+    def on_image_ready(self, url, shape, image):
+        if shape == (150, 150, 0) and url == self.playlist_cover_url:
+            self.playlist_cover_label.setPixmap(QPixmap.fromImage(image))
+        elif shape == (45, 45, 0):
+            pixmap = QPixmap.fromImage(image)
+            for widget in self.track_widgets:
+                for child in widget.findChildren(QLabel):
+                    if child.property("url") == url:
+                        child.setPixmap(pixmap)
+                        break
 
 
 class EditPlaylistDialog(QDialog):
@@ -613,7 +598,9 @@ class EditPlaylistDialog(QDialog):
         self.main_frame = parent.home_frame.main_frame
         self.playlist_name = playlist_name
         self.original_name = playlist_name
-        self.playlist_info = self.main_frame.playlists[playlist_name]
+        # Edits are made on a copy and written through the library on save
+        self.playlist_info = dict(self.main_frame.playlists[playlist_name])
+        self.playlist_info['songs'] = list(self.playlist_info['songs'])
         self.all_songs = self.main_frame.all_songs
         self.setup_ui()
         self.setWindowIcon(QIcon("icons/vibeflow.ico"))
@@ -797,14 +784,13 @@ class EditPlaylistDialog(QDialog):
     def update_cover_image(self):
         if self.playlist_info['playlist_cover'] == "auto":
             if self.playlist_info['songs']:
-                first_song = self.all_songs[self.playlist_info['songs'][0]]
-                pixmap = QPixmap(first_song['cover_location'])
+                cover_path = self.main_frame.songs_by_id[self.playlist_info['songs'][0]]['cover_location']
             else:
-                pixmap = QPixmap("icons/music.png")
+                cover_path = "icons/music.png"
         else:
-            pixmap = QPixmap(self.playlist_info['playlist_cover'])
+            cover_path = self.playlist_info['playlist_cover']
 
-        self.cover_label.setPixmap(pixmap.scaled(200, 200, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        self.cover_label.setPixmap(self.main_frame.thumbnails.pixmap(cover_path, DIALOG_COVER))
 
     def on_name_changed(self, new_name):
         if self.original_name == 'All songs':
@@ -828,13 +814,11 @@ class EditPlaylistDialog(QDialog):
                 QMessageBox.warning(self, "Warning", "A playlist with this name already exists")
                 return
 
-            self.main_frame.playlists[new_name] = self.main_frame.playlists.pop(self.original_name)
+            self.main_frame.library.rename_playlist(self.original_name, new_name)
             self.playlist_name = new_name
 
-        self.main_frame.playlists[self.playlist_name] = self.playlist_info
-
-        self.update_json()
-        self.main_frame.home_screen_frame.display_playlists()
+        if self.playlist_info['songs'] != self.main_frame.playlists[self.playlist_name]['songs']:
+            self.main_frame.library.set_playlist_songs(self.playlist_name, self.playlist_info['songs'])
         self.accept()
 
     def change_cover_image(self):
@@ -842,7 +826,7 @@ class EditPlaylistDialog(QDialog):
         if file_name:
             self.playlist_info['playlist_cover'] = file_name
             self.update_cover_image()
-            self.update_json()
+            self.main_frame.library.set_playlist_cover(self.original_name, file_name)
 
     def remove_selected_songs(self):
         selected_items = self.songs_list.selectedItems()
@@ -859,12 +843,12 @@ class EditPlaylistDialog(QDialog):
             if reply == QMessageBox.No:
                 return
 
-            deleted_indices = []
+            deleted_ids = []
             for item in reversed(selected_items):
                 index = self.songs_list.row(item)
-                song_index = self.playlist_info['songs'][index]
+                song_id = self.playlist_info['songs'][index]
 
-                song_info = self.all_songs[song_index]
+                song_info = self.main_frame.songs_by_id[song_id]
                 try:
                     os.remove(song_info['mp3_location'])
                     os.remove(song_info['cover_location'])
@@ -873,23 +857,20 @@ class EditPlaylistDialog(QDialog):
                     QMessageBox.warning(self, "File Deletion Error",
                                         f"Error deleting files for '{song_info['song_name']}':\n{e}")
 
-                deleted_indices.append(song_index)
+                deleted_ids.append(song_id)
 
-            for index in sorted(deleted_indices, reverse=True):
-                del self.all_songs[index]
-            for playlist_name, playlist in self.main_frame.playlists.items():
-                playlist['songs'] = [s for s in playlist['songs'] if s not in deleted_indices]
-                playlist['songs'] = [s - sum(1 for d in deleted_indices if d < s) for s in playlist['songs']]
+            self.main_frame.library.delete_songs(deleted_ids)
+            self.main_frame.remove_songs_from_queue(deleted_ids)
+            # Keep any unsaved edits in the dialog's copy; only the deleted songs go
+            doomed = set(deleted_ids)
+            self.playlist_info['songs'] = [song_id for song_id in self.playlist_info['songs'] if song_id not in doomed]
 
             self.update_songs_list()
-            self.update_json()
             QMessageBox.information(self, "Deletion Complete",
                                     f"{len(selected_items)} song(s) have been deleted from your system and all playlists.")
         else:
-            for item in reversed(selected_items):
-                index = self.songs_list.row(item)
-                song_index = self.playlist_info['songs'][index]
-                self.playlist_info['songs'].remove(song_index)
+            for index in sorted((self.songs_list.row(item) for item in selected_items), reverse=True):
+                del self.playlist_info['songs'][index]
 
             self.update_songs_list()
 
@@ -902,8 +883,8 @@ class EditPlaylistDialog(QDialog):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
 
         if reply == QMessageBox.Yes:
-            if self.playlist_name in self.main_frame.playlists:
-                del self.main_frame.playlists[self.playlist_name]
+            if self.original_name in self.main_frame.playlists:
+                self.main_frame.library.delete_playlist(self.original_name)
 
             if hasattr(self.main_frame, 'player_frame') and hasattr(self.main_frame.player_frame, 'playlists'):
                 if self.playlist_name in self.main_frame.player_frame.playlists:
@@ -912,33 +893,12 @@ class EditPlaylistDialog(QDialog):
             if hasattr(self.main_frame, 'player_frame'):
                 self.main_frame.player_frame.playlists = self.main_frame.playlists
 
-            self.update_json()
-            self.main_frame.home_screen_frame.display_playlists()
             self.accept()
 
-    def update_json(self):
-        data_json_path = os.path.join(os.getcwd(), self.main_frame.get_data_file_path())
-        with open(data_json_path) as f:
-            data = json.load(f)
-
-        data['All Songs'] = self.all_songs
-
-        updated_playlists = {}
-        for playlist_name in list(data['Playlists'].keys()):
-            if playlist_name in self.main_frame.playlists:
-                updated_playlists[playlist_name] = self.main_frame.playlists[playlist_name]
-            elif playlist_name == self.original_name and self.playlist_name != self.original_name:
-                updated_playlists[self.playlist_name] = self.main_frame.playlists[self.playlist_name]
-
-        data['Playlists'] = updated_playlists
-
-        with open(data_json_path, 'w') as f:
-            json.dump(data, f, indent=4)
-
     def update_songs_list(self):
         self.songs_list.clear()
-        for song_index in self.playlist_info['songs']:
-            song = self.all_songs[song_index]
+        for song_id in self.playlist_info['songs']:
+            song = self.main_frame.songs_by_id[song_id]
             item = QListWidgetItem(f"{song['song_name']} - {song['artist']}")
-            item.setIcon(QIcon(song['cover_location']))
+            item.setIcon(QIcon(self.main_frame.thumbnails.pixmap(song['cover_location'], LIST_ICON)))
             self.songs_list.addItem(item)
\ No newline at end of file
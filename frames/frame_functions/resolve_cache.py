@@ -0,0 +1,70 @@
+import sqlite3
+import time
+
+RESOLVE_TTL = 30 * 24 * 3600  # seconds a resolved source is trusted before searching again
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resolved (
+    key TEXT PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    format_id TEXT,
+    resolved_at REAL NOT NULL
+);
+"""
+
+
+def resolve_key(title, artist, track_id):
+    """Normalized (title, artist, Spotify id) cache key."""
+    return "\x1f".join(((title or "").lower().strip(), (artist or "").lower().strip(), track_id or ""))
+
+
+class ResolveCache:
+    """
+    Persistent map from a track to the YouTube video (and audio format) it was downloaded from.
+
+    Lets a repeat download of the same track skip the ytsearch1 lookup. Shared
+    by every download worker process through SQLite, so an entry resolved by
+    one worker is used by the others. Entries expire after `ttl` seconds and
+    are dropped as soon as a download from them fails.
+    """
+
+    def __init__(self, path, ttl=RESOLVE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def get(self, key):
+        """Returns (video_id, format_id) for a fresh entry, or None."""
+        try:
+            row = self._connection().execute(
+                "SELECT video_id, format_id FROM resolved WHERE key = ? AND resolved_at > ?",
+                (key, time.time() - self.ttl)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Resolve cache lookup failed: {e}")
+            return None
+        return tuple(row) if row else None
+
+    def put(self, key, video_id, format_id):
+        try:
+            self._connection().execute("INSERT OR REPLACE INTO resolved VALUES (?, ?, ?, ?)",
+                                       (key, video_id, format_id, time.time()))
+        except sqlite3.Error as e:
+            print(f"Resolve cache update failed: {e}")
+
+    def invalidate(self, key):
+        try:
+            self._connection().execute("DELETE FROM resolved WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            print(f"Resolve cache update failed: {e}")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
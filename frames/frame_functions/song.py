@@ -0,0 +1,188 @@
+import json
+import sys
+
+PATH_FIELDS = ("mp3_location", "cover_location", "lyrics_location")
+FIELDS = ("song_name", "artist", "mp3_location", "cover_location", "lyrics_location", "id", "artist_id")
+# What the startup snapshot stores per song; the library root is stored once for all of them
+COLUMNS = ("id", "song_name", "artist", "artist_id", "_mp3", "_cover", "_lyrics", "_relative", "extra")
+
+
+class Song:
+    """
+    Compact library record.
+
+    Paths under the library root are kept as the suffix after the root, so the
+    download folder prefix is stored once per library instead of three times
+    per song. Artist names and ids are interned. Dict-style access
+    (song['artist'], song.get(...), dict(song)) still works for existing callers;
+    keys that are not fields, such as 'duration', live in `extra`.
+    """
+
+    __slots__ = ("id", "song_name", "artist", "artist_id", "_root", "_mp3", "_cover", "_lyrics", "_relative",
+                 "extra")
+
+    def __init__(self, song_id, song_name="", artist="", mp3_location="", cover_location="", lyrics_location="",
+                 artist_id=None, extra=None, root=""):
+        self.id = song_id
+        self.song_name = song_name
+        self.artist = sys.intern(artist or "")
+        self.artist_id = sys.intern(artist_id) if artist_id else artist_id
+        self._root = root
+        self._relative = 0
+        self._mp3 = self._store_path(mp3_location, 1)
+        self._cover = self._store_path(cover_location, 2)
+        self._lyrics = self._store_path(lyrics_location, 4)
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, data, root=""):
+        extra = {k: v for k, v in data.items() if k not in FIELDS}
+        return cls(data["id"], data.get("song_name") or "", data.get("artist") or "",
+                   data.get("mp3_location") or "", data.get("cover_location") or "",
+                   data.get("lyrics_location") or "", data.get("artist_id"), extra, root)
+
+    @classmethod
+    def from_rows(cls, rows, root=""):
+        """
+        Builds Songs straight from LibraryDatabase songs rows (see SONG_SELECT).
+
+        Same result as the constructor, with _store_path inlined: this is most
+        of a cold library load.
+        """
+        n = len(root)
+        new = cls.__new__
+        intern = sys.intern
+        songs = []
+        for song_id, song_name, artist, mp3, cover, lyrics, artist_id, extra in rows:
+            mp3, cover, lyrics = mp3 or "", cover or "", lyrics or ""
+            relative = 0
+            if n:
+                if len(mp3) > n and mp3[n] in "/\\" and mp3.startswith(root):
+                    mp3 = mp3[n:]
+                    relative = 1
+                if len(cover) > n and cover[n] in "/\\" and cover.startswith(root):
+                    cover = cover[n:]
+                    relative |= 2
+                if len(lyrics) > n and lyrics[n] in "/\\" and lyrics.startswith(root):
+                    lyrics = lyrics[n:]
+                    relative |= 4
+            song = new(cls)
+            song.id = song_id
+            song.song_name = song_name
+            song.artist = intern(artist or "")
+            song.artist_id = intern(artist_id) if artist_id else artist_id
+            song._root = root
+            song._mp3 = mp3
+            song._cover = cover
+            song._lyrics = lyrics
+            song._relative = relative
+            song.extra = json.loads(extra) if extra else None
+            songs.append(song)
+        return songs
+
+    def _store_path(self, path, bit):
+        root = self._root
+        n = len(root)
+        if n and len(path) > n and path[n] in "/\\" and path.startswith(root):
+            self._relative |= bit
+            return path[n:]
+        self._relative &= ~bit
+        return path
+
+    def _load_path(self, value, bit):
+        return self._root + value if self._relative & bit else value
+
+    @property
+    def mp3_location(self):
+        return self._load_path(self._mp3, 1)
+
+    @mp3_location.setter
+    def mp3_location(self, path):
+        self._mp3 = self._store_path(path or "", 1)
+
+    @property
+    def cover_location(self):
+        return self._load_path(self._cover, 2)
+
+    @cover_location.setter
+    def cover_location(self, path):
+        self._cover = self._store_path(path or "", 2)
+
+    @property
+    def lyrics_location(self):
+        return self._load_path(self._lyrics, 4)
+
+    @lyrics_location.setter
+    def lyrics_location(self, path):
+        self._lyrics = self._store_path(path or "", 4)
+
+    # --- Dict-style adapter ---
+
+    def __getitem__(self, key):
+        if key in FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in FIELDS:
+            if key in ("artist", "artist_id") and value:
+                value = sys.intern(value)
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        return key in FIELDS or bool(self.extra and key in self.extra)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def update(self, changes):
+        for key, value in changes.items():
+            self[key] = value
+
+    def keys(self):
+        return list(FIELDS) + list(self.extra or ())
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    # --- Startup snapshot ---
+
+    @staticmethod
+    def to_columns(songs):
+        """Returns one list per entry of COLUMNS: plain strings and ints, which pickle far faster than objects."""
+        return [[getattr(song, column) for song in songs] for column in COLUMNS]
+
+    @classmethod
+    def from_columns(cls, columns, root=""):
+        """Rebuilds the songs from to_columns() output without re-checking their paths against `root`."""
+        songs = []
+        new = cls.__new__
+        for song_id, song_name, artist, artist_id, mp3, cover, lyrics, relative, extra in zip(*columns):
+            song = new(cls)
+            song.id = song_id
+            song.song_name = song_name
+            song.artist = artist
+            song.artist_id = artist_id
+            song._root = root
+            song._mp3 = mp3
+            song._cover = cover
+            song._lyrics = lyrics
+            song._relative = relative
+            song.extra = extra
+            songs.append(song)
+        return songs
+
+    def __repr__(self):
+        return f"Song({self.id!r}, {self.song_name!r}, {self.artist!r})"
@@ -0,0 +1,186 @@
+"""
+Song download pipeline that runs inside the download worker processes.
+
+Nothing here imports Qt: the worker processes only need requests, yt_dlp
+and Pillow, and report progress through the queue handed to init_worker().
+"""
+import glob
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from frames.frame_functions import http_client
+from frames.frame_functions.lrclib import lookup_lyrics
+from frames.frame_functions.net_scheduler import BULK, scheduler
+from frames.frame_functions.palette import extract_palette
+from frames.frame_functions.resolve_cache import ResolveCache, resolve_key
+from frames.frame_functions.ytdl_pool import AUDIO_OPTS, audio_pool
+
+YOUTUBE_WATCH_URL = "https://www.youtube.com/watch?v="
+STREAM_START_BYTES = 256 * 1024  # audio on disk before a streaming download reports it can be played
+
+# Kinds of message on the progress queue: (job_id, kind, payload)
+PROGRESS = "progress"
+BUFFERED = "buffered"
+
+# Shared by all downloads in this process for the short cover/lyrics requests, so those never take a download slot
+stage_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="DownloadStage")
+
+_progress_queue = None
+_resolve_cache = None
+
+
+def sanitize_filename(filename):
+    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+    filename = filename.replace(' ', '_')
+    filename = ''.join(char for char in filename if ord(char) < 128)
+    return filename[:200]
+
+
+def init_worker(progress_queue, resolve_cache_path=None, rate_buckets=None):
+    global _progress_queue, _resolve_cache
+    _progress_queue = progress_queue
+    if rate_buckets is not None:
+        # Every worker and the app share one budget per host instead of each having its own
+        scheduler.use(rate_buckets)
+    _resolve_cache = ResolveCache(resolve_cache_path) if resolve_cache_path else None
+
+
+def run_job(job_id, track_info, download_path, priority=BULK, stream=False):
+    """Worker-process entry point; progress messages are tagged with `job_id`."""
+    buffered = (lambda info: _progress_queue.put((job_id, BUFFERED, info))) if stream else None
+    return download_song(track_info, download_path, lambda message: _progress_queue.put((job_id, PROGRESS, message)),
+                         priority, buffered)
+
+
+def download_song(track_info, download_path, progress, priority=BULK, buffered=None):
+    """
+    Downloads audio, cover and lyrics for a Spotify track and returns the new library song dict.
+
+    `buffered`, when given, is called once with {"part_path", "final_path",
+    "total_bytes"} as soon as enough audio is on disk to start playing it.
+    """
+    song_name = track_info["name"]
+    artist_name = track_info["artists"][0]["name"]
+    track_id = track_info.get("id", song_name + artist_name)
+    artist_id = track_info['artists'][0]['id']
+    duration = track_info["duration_ms"] / 1000 if track_info.get("duration_ms") else None
+    safe_fb = sanitize_filename(f"{song_name}_{artist_name}")
+    cover_url = track_info["album"]["images"][0]["url"] if track_info["album"]["images"] else None
+    cover_path = os.path.join(download_path, f"{safe_fb}.png")
+    # The audio keeps the container YouTube serves (m4a/webm/opus); no conversion before it is playable
+    audio_template = os.path.join(download_path, f"{safe_fb}.%(ext)s")
+    lrc_path = os.path.join(download_path, f"{safe_fb}.lrc")
+
+    # Cover and lyrics don't depend on the audio, so they run alongside it
+    side_stages = [stage_pool.submit(fetch_lyrics, song_name, artist_name, lrc_path, progress, priority, duration)]
+    if cover_url:
+        side_stages.append(stage_pool.submit(fetch_cover, cover_url, cover_path, progress, priority))
+
+    try:
+        audio_path = fetch_audio(song_name, artist_name, track_id, audio_template, priority,
+                                 buffering_hook(buffered) if buffered else None)
+        progress("Audio downloaded")
+    except Exception:
+        # Don't leave a cover, lyrics or partial audio behind for a song that never made it into the library
+        wait(side_stages)
+        remove_partial_audio(audio_template)
+        for path in (cover_path, lrc_path):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+    wait(side_stages)
+
+    song = {
+        "song_name": song_name,
+        "artist": artist_name,
+        "mp3_location": audio_path,
+        "cover_location": cover_path if os.path.exists(cover_path) else "icons/default-image.png",
+        "lyrics_location": lrc_path if os.path.exists(lrc_path) else "",
+        "id": track_id,
+        "artist_id": artist_id
+    }
+    if duration:
+        song["duration"] = round(duration)
+    if os.path.exists(cover_path):
+        try:
+            # Done here so switching to the song never waits on colour extraction
+            song["palette"] = extract_palette(cover_path)
+        except Exception as e:
+            progress(f"Palette extraction failed: {e}")
+    return song
+
+
+def remove_partial_audio(audio_template):
+    for path in glob.glob(glob.escape(audio_template.replace("%(ext)s", "")) + "*.part"):
+        os.remove(path)
+
+
+def downloaded_path(info, audio_template):
+    downloads = info.get('requested_downloads') or [{}]
+    return downloads[0].get('filepath') or audio_template.replace("%(ext)s", info.get('ext') or "webm")
+
+
+def buffering_hook(buffered):
+    """yt_dlp progress hook that calls `buffered` once the first STREAM_START_BYTES are written."""
+    reported = []
+
+    def hook(status):
+        if reported or status.get('status') not in ('downloading', 'finished'):
+            return
+        if status['status'] == 'downloading' and (status.get('downloaded_bytes') or 0) < STREAM_START_BYTES:
+            return
+        reported.append(True)
+        buffered({"part_path": status.get('tmpfilename') or status.get('filename'),
+                  "final_path": status.get('filename'),
+                  "total_bytes": status.get('total_bytes') or 0})
+    return hook
+
+
+def fetch_audio(song_name, artist_name, track_id, audio_template, priority=BULK, progress_hook=None):
+    """
+    Downloads from the cached source when there is one, otherwise searches YouTube and caches the result.
+
+    Returns the path of the downloaded file.
+    """
+    query = f"{song_name} {artist_name} audio"
+    key = resolve_key(song_name, artist_name, track_id)
+    cached = _resolve_cache.get(key) if _resolve_cache else None
+    if cached:
+        video_id, format_id = cached
+        scheduler.acquire("youtube.com", priority)
+        try:
+            info = audio_pool.download(YOUTUBE_WATCH_URL + video_id, audio_template,
+                                       f"{format_id}/{AUDIO_OPTS['format']}" if format_id else None, progress_hook)
+            return downloaded_path(info, audio_template)
+        except Exception as e:
+            print(f"Cached source {video_id} for '{query}' failed, searching again: {e}")
+            _resolve_cache.invalidate(key)
+            # A partial file from the old source can't be continued from a different one
+            remove_partial_audio(audio_template)
+
+    scheduler.acquire("youtube.com", priority)
+    info = audio_pool.download(query, audio_template, progress_hook=progress_hook)
+    if _resolve_cache:
+        _resolve_cache.put(key, info['id'], info.get('format_id'))
+    return downloaded_path(info, audio_template)
+
+
+def fetch_cover(cover_url, cover_path, progress, priority=BULK):
+    try:
+        http_client.download(cover_url, cover_path, priority=priority)
+        progress("Cover downloaded")
+    except:
+        progress("Cover download failed")
+
+
+def fetch_lyrics(song_name, artist_name, lrc_path, progress, priority=BULK, duration=None):
+    try:
+        lyrics_txt = lookup_lyrics(song_name, artist_name, duration, priority)
+        with open(lrc_path, 'w', encoding='utf-8') as f:
+            f.write(lyrics_txt or "")
+        progress("Lyrics fetched" if lyrics_txt else "No lyrics")
+    except:
+        open(lrc_path, 'w').close()
+        progress("Lyrics fetch error")
@@ -0,0 +1,173 @@
+import os
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHUNK_SIZE = 64 * 1024
+STALL_TIMEOUT = 30  # seconds a reader waits for the download to grow before giving up
+POLL_INTERVAL = 0.1
+
+CONTENT_TYPES = {
+    ".webm": "audio/webm",
+    ".weba": "audio/webm",
+    ".m4a": "audio/mp4",
+    ".mp4": "audio/mp4",
+    ".opus": "audio/ogg",
+    ".ogg": "audio/ogg",
+    ".mp3": "audio/mpeg",
+}
+
+
+class GrowingFile:
+    """A download in progress: yt_dlp writes `part_path` and renames it to `final_path` when done."""
+
+    def __init__(self, part_path, final_path, total_bytes=0):
+        self.part_path = part_path
+        self.final_path = final_path
+        self.total_bytes = total_bytes  # 0 when the size isn't known up front
+        self.done = False
+        self.failed = False
+
+    def available(self):
+        for path in (self.final_path, self.part_path) if self.done else (self.part_path, self.final_path):
+            try:
+                return os.path.getsize(path)
+            except OSError:
+                continue
+        return 0
+
+    def read(self, offset, size):
+        # Opened per chunk and closed straight away, so yt_dlp can still rename the .part file
+        for path in (self.part_path, self.final_path):
+            try:
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    return f.read(size)
+            except OSError:
+                continue
+        return b""
+
+    def content_type(self):
+        return CONTENT_TYPES.get(os.path.splitext(self.final_path)[1].lower(), "application/octet-stream")
+
+
+class StreamServer:
+    """
+    Loopback HTTP server that plays downloads before they finish.
+
+    add() registers a download once its first bytes are on disk and returns a
+    URL for QMediaPlayer. Reads past what has been written wait for the file
+    to grow; finish() or fail() ends the stream, and remove() drops it once
+    nothing plays it any more. Range requests are supported
+    when the download's size is known, so seeking works. The server thread
+    starts with the first stream.
+    """
+
+    def __init__(self):
+        self._streams = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def add(self, part_path, final_path, total_bytes=0):
+        """Returns (token, url) for a download in progress."""
+        with self._lock:
+            if self._server is None:
+                self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+                self._server.daemon_threads = True
+                threading.Thread(target=self._server.serve_forever, name="StreamServer", daemon=True).start()
+            token = uuid.uuid4().hex
+            self._streams[token] = GrowingFile(part_path, final_path, total_bytes)
+            return token, f"http://127.0.0.1:{self._server.server_port}/{token}"
+
+    def finish(self, token, final_path=None):
+        stream = self._streams.get(token)
+        if stream is not None:
+            if final_path:
+                stream.final_path = final_path
+            stream.done = True
+
+    def fail(self, token):
+        self.remove(token)
+
+    def local_path(self, url):
+        """The file a stream URL from add() plays, or None if it isn't one of ours."""
+        stream = self._streams.get(url.rstrip("/").rsplit("/", 1)[-1])
+        return stream.final_path if stream is not None else None
+
+    def remove(self, token):
+        """Forgets a stream, cutting off anyone still reading it."""
+        stream = self._streams.pop(token, None)
+        if stream is not None:
+            stream.failed = True
+
+    def close(self):
+        with self._lock:
+            if self._server is not None:
+                self._server.shutdown()
+                self._server.server_close()
+                self._server = None
+        for stream in self._streams.values():
+            stream.failed = True
+        self._streams.clear()
+
+    def _handler_class(self):
+        streams = self._streams
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stream = streams.get(self.path.strip("/"))
+                if stream is None:
+                    self.send_error(404)
+                    return
+                total = stream.total_bytes
+                start, end = 0, None
+                match = re.match(r"bytes=(\d*)-(\d*)", self.headers.get("Range") or "")
+                if match and total:
+                    start = int(match.group(1) or 0)
+                    end = min(int(match.group(2)), total - 1) if match.group(2) else total - 1
+                    if start >= total:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{total}")
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{total}")
+                    self.send_header("Content-Length", str(end - start + 1))
+                else:
+                    self.send_response(200)
+                    if total:
+                        end = total - 1
+                        self.send_header("Content-Length", str(total))
+                self.send_header("Content-Type", stream.content_type())
+                self.send_header("Accept-Ranges", "bytes" if total else "none")
+                self.end_headers()
+                try:
+                    self.copy(stream, start, end)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def copy(self, stream, position, end):
+                waited_since = None
+                while end is None or position <= end:
+                    available = stream.available()
+                    if position < available:
+                        size = CHUNK_SIZE if end is None else min(CHUNK_SIZE, end - position + 1)
+                        data = stream.read(position, min(size, available - position))
+                        if data:
+                            self.wfile.write(data)
+                            position += len(data)
+                            waited_since = None
+                            continue
+                    if stream.failed or (stream.done and position >= stream.available()):
+                        return
+                    waited_since = waited_since or time.monotonic()
+                    if time.monotonic() - waited_since > STALL_TIMEOUT:
+                        return
+                    time.sleep(POLL_INTERVAL)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,294 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict, deque
+
+from PySide6.QtCore import QObject, QRectF, QRunnable, QThreadPool, Qt, Signal
+from PySide6.QtGui import QImage, QImageReader, QPainter, QPainterPath, QPixmap, QPixmapCache
+
+from frames.frame_functions.net_scheduler import BACKGROUND, VISIBLE, thread_priority
+
+# (size, corner radius) of each cover thumbnail the UI shows
+LIST_ICON = (32, 4)
+SONG_CARD = (50, 8)
+PLAYLIST_CARD = (60, 8)
+MICRO_COVER = (60, 8)
+DIALOG_COVER = (200, 0)
+LARGE_COVER = (300, 30)
+MINI_BACKGROUND = (400, 0)
+
+# Rendered as soon as a song is added: lists show many of these at once. Larger ones are made on first use.
+PREFETCH_SIZES = (LIST_ICON, SONG_CARD, PLAYLIST_CARD)
+MAX_DISK_BYTES = 100 * 1024 * 1024
+# Prefetch stops here, so it never evicts a thumbnail someone looked at; about 6.5k covers at ~11.5 KB each
+PREFETCH_LIMIT = MAX_DISK_BYTES * 3 // 4
+PREFETCH_BATCH = 20  # covers per prefetch job
+
+
+def fit_image(image, width, height, radius=0):
+    """Returns `image` scaled to fill width x height, centre-cropped, with rounded corners (safe off the GUI thread)."""
+    scaled = image.scaled(width, height, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+    fitted = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+    fitted.fill(Qt.transparent)
+    painter = QPainter(fitted)
+    painter.setRenderHint(QPainter.Antialiasing)
+    if radius:
+        clip_path = QPainterPath()
+        clip_path.addRoundedRect(QRectF(0, 0, width, height), radius, radius)
+        painter.setClipPath(clip_path)
+    painter.drawImage((width - scaled.width()) // 2, (height - scaled.height()) // 2, scaled)
+    painter.end()
+    return fitted
+
+
+def render_thumbnail(path, size, radius):
+    """Returns `path` cropped to a `size` square with rounded corners, or a null QImage (safe off the GUI thread)."""
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    image = reader.read()
+    return fit_image(image, size, size, radius) if not image.isNull() else image
+
+
+def render_mosaic(paths, size, radius):
+    """Returns the covers at `paths` tiled 2x2 on a `size` square with rounded corners (safe off the GUI thread)."""
+    half = size // 2
+    mosaic = QImage(size, size, QImage.Format_ARGB32_Premultiplied)
+    mosaic.fill(Qt.transparent)
+    painter = QPainter(mosaic)
+    painter.setRenderHint(QPainter.Antialiasing)
+    if radius:
+        clip_path = QPainterPath()
+        clip_path.addRoundedRect(QRectF(0, 0, size, size), radius, radius)
+        painter.setClipPath(clip_path)
+    for i, path in enumerate(paths[:4]):
+        tile = render_thumbnail(path, half, 0)
+        if not tile.isNull():
+            painter.drawImage((i % 2) * half, (i // 2) * half, tile)
+    painter.end()
+    return mosaic
+
+
+class ThumbnailJob(QRunnable):
+    class Signals(QObject):
+        finished = Signal(list)  # [(file name, bytes)] written to the cache directory
+
+    def __init__(self, cache, paths, sizes):
+        super().__init__()
+        self.cache = cache
+        self.paths = paths
+        self.sizes = sizes
+        self.signals = self.Signals()
+
+    def run(self):
+        written = []
+        for path in self.paths:
+            for size, radius in self.sizes:
+                name = self.cache.file_name(path, size, radius)
+                if name is None or os.path.exists(os.path.join(self.cache.directory, name)):
+                    continue
+                thumbnail = render_thumbnail(path, size, radius)
+                if thumbnail.isNull():
+                    break
+                size_bytes = self.cache.save(name, thumbnail)
+                try:
+                    # Dated as never used, so after a restart they are still the first to go
+                    os.utime(os.path.join(self.cache.directory, name), (0, 0))
+                except OSError:
+                    pass
+                written.append((name, size_bytes))
+        self.signals.finished.emit(written)
+
+
+class MosaicJob(QRunnable):
+    class Signals(QObject):
+        finished = Signal(str, QImage, int)  # file name, mosaic, bytes written
+
+    def __init__(self, cache, name, paths, size, radius):
+        super().__init__()
+        self.cache = cache
+        self.name = name
+        self.paths = paths
+        self.size = size
+        self.radius = radius
+        self.signals = self.Signals()
+
+    def run(self):
+        mosaic = render_mosaic(self.paths, self.size, self.radius)
+        self.signals.finished.emit(self.name, mosaic, self.cache.save(self.name, mosaic))
+
+
+class ThumbnailCache(QObject):
+    """
+    Pre-rounded cover thumbnails at the sizes the UI draws them.
+
+    Thumbnails are rendered once per cover and size and kept as PNGs in
+    `directory`, which is trimmed back to MAX_DISK_BYTES by dropping the least
+    recently used files. Decoded thumbnails are shared through QPixmapCache,
+    so every view showing a cover at the same size gets the same pixmap.
+    A changed cover file gets new thumbnails; the old ones age out.
+
+    Playlist mosaics are cached the same way, keyed by the four covers they
+    are made of, but always rendered on the worker thread: mosaic() returns
+    None until `mosaicReady` fires.
+
+    prefetch() renders thumbnails ahead of use, one batch at a time, and only
+    while the cache is below PREFETCH_LIMIT. Prefetched thumbnails count as
+    least recently used until they are shown, so they are evicted first.
+    """
+
+    mosaicReady = Signal(object, object)  # cover paths, (size, radius)
+
+    def __init__(self, directory, parent=None):
+        super().__init__(parent)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.threadpool = QThreadPool(self)
+        self.threadpool.setMaxThreadCount(1)
+        self.files = None  # file name -> bytes, least recently used first; read on first use
+        self.total_bytes = 0
+        self.rendering = {}  # mosaic file name -> (cover paths, (size, radius))
+        self.prefetch_queue = deque()  # cover paths waiting for a prefetch batch
+        self.prefetching = False
+
+    @staticmethod
+    def file_name(path, size, radius):
+        """Cache file for `path` at this size, or None if the cover doesn't exist."""
+        try:
+            modified = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        digest = hashlib.sha1(f"{os.path.abspath(path)}|{modified}".encode("utf-8")).hexdigest()
+        return f"{digest}_{size}_{radius}.png"
+
+    @staticmethod
+    def mosaic_file_name(paths, size, radius):
+        """Cache file for a mosaic of the covers at `paths`, or None if one of them doesn't exist."""
+        parts = []
+        for path in paths:
+            try:
+                parts.append(f"{os.path.abspath(path)}|{os.stat(path).st_mtime_ns}")
+            except OSError:
+                return None
+        digest = hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+        return f"mosaic_{digest}_{size}_{radius}.png"
+
+    def save(self, name, thumbnail):
+        # Written under a temporary name so a reader never sees half a file
+        tmp_path = os.path.join(self.directory, f"{name}.{threading.get_ident()}.tmp")
+        thumbnail.save(tmp_path, "PNG")
+        os.replace(tmp_path, os.path.join(self.directory, name))
+        return os.path.getsize(os.path.join(self.directory, name))
+
+    def pixmap(self, path, size_and_radius):
+        """Returns the thumbnail of `path` at (size, radius), e.g. SONG_CARD; null if the image can't be read."""
+        size, radius = size_and_radius
+        name = self.file_name(path, size, radius)
+        if name is None:
+            return QPixmap()
+        pixmap = QPixmapCache.find(name)
+        if pixmap is not None:
+            return pixmap
+        pixmap = QPixmap(os.path.join(self.directory, name))
+        if pixmap.isNull():
+            thumbnail = render_thumbnail(path, size, radius)
+            if thumbnail.isNull():
+                return QPixmap()
+            self.add_files([(name, self.save(name, thumbnail))])
+            pixmap = QPixmap.fromImage(thumbnail)
+        else:
+            self.touch(name)
+        QPixmapCache.insert(name, pixmap)
+        return pixmap
+
+    def mosaic(self, paths, size_and_radius):
+        """Returns the mosaic of the four covers at `paths`, or None while it is rendered on the worker thread."""
+        paths = tuple(paths[:4])
+        size, radius = size_and_radius
+        name = self.mosaic_file_name(paths, size, radius)
+        if name is None:
+            return None
+        pixmap = QPixmapCache.find(name)
+        if pixmap is not None:
+            return pixmap
+        if name in self.rendering:
+            return None
+        pixmap = QPixmap(os.path.join(self.directory, name))
+        if not pixmap.isNull():
+            self.touch(name)
+            QPixmapCache.insert(name, pixmap)
+            return pixmap
+        self.rendering[name] = (paths, (size, radius))
+        job = MosaicJob(self, name, paths, size, radius)
+        job.signals.finished.connect(self.on_mosaic_rendered)
+        self.threadpool.start(job, thread_priority(VISIBLE))
+        return None
+
+    def on_mosaic_rendered(self, name, mosaic, size):
+        self.add_files([(name, size)])
+        QPixmapCache.insert(name, QPixmap.fromImage(mosaic))
+        paths, size_and_radius = self.rendering.pop(name)
+        self.mosaicReady.emit(paths, size_and_radius)
+
+    def prefetch(self, paths):
+        """Renders missing thumbnails of the covers at `paths`, in order, on a worker thread while there is room."""
+        self.prefetch_queue.extend(path for path in paths if path)
+        if not self.prefetching:
+            self.prefetch_next()
+
+    def prefetch_next(self):
+        if self.files is None:
+            self.load_index()
+        if self.total_bytes >= PREFETCH_LIMIT:
+            self.prefetch_queue.clear()
+        if not self.prefetch_queue:
+            self.prefetching = False
+            return
+        # One batch at a time, so a mosaic someone is waiting for never queues behind the whole library
+        batch = [self.prefetch_queue.popleft() for _ in range(min(PREFETCH_BATCH, len(self.prefetch_queue)))]
+        job = ThumbnailJob(self, batch, PREFETCH_SIZES)
+        job.signals.finished.connect(self.on_prefetched)
+        self.prefetching = True
+        self.threadpool.start(job, thread_priority(BACKGROUND))
+
+    def on_prefetched(self, written):
+        self.add_files(written, used=False)
+        self.prefetch_next()
+
+    def load_index(self):
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".png"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name, stat.st_size))
+        entries.sort()
+        self.files = OrderedDict((name, size) for _, name, size in entries)
+        self.total_bytes = sum(self.files.values())
+
+    def touch(self, name):
+        if self.files is None:
+            self.load_index()
+        if name in self.files:
+            self.files.move_to_end(name)
+        try:
+            # The modification time is the last use, so the order survives a restart
+            os.utime(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def add_files(self, written, used=True):
+        if self.files is None:
+            self.load_index()
+        for name, size in written:
+            self.total_bytes += size - self.files.pop(name, 0)
+            self.files[name] = size
+            if not used:
+                self.files.move_to_end(name, last=False)
+        while self.total_bytes > MAX_DISK_BYTES and len(self.files) > 1:
+            name, size = self.files.popitem(last=False)
+            self.total_bytes -= size
+            QPixmapCache.remove(name)
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError as e:
+                print(f"Could not remove thumbnail {name}: {e}")
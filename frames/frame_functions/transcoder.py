@@ -0,0 +1,147 @@
+import os
+import shutil
+import subprocess
+import sys
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+FFMPEG = shutil.which("ffmpeg")
+SHUTDOWN_TIMEOUT_MS = 3000
+
+
+def low_priority_kwargs():
+    """subprocess arguments that run ffmpeg below normal priority, so conversions don't compete with the UI."""
+    if sys.platform == "win32":
+        return {"creationflags": subprocess.BELOW_NORMAL_PRIORITY_CLASS | subprocess.CREATE_NO_WINDOW}
+    return {"preexec_fn": lambda: os.nice(10)}
+
+
+class TranscodeJob(QRunnable):
+    class Signals(QObject):
+        finished = Signal(str, str, str)  # song id, source path, mp3 path
+        error = Signal(str, str)
+
+    def __init__(self, song_id, source_path):
+        super().__init__()
+        self.song_id = song_id
+        self.source_path = source_path
+        self.process = None
+        self.cancelled = False
+        self.signals = self.Signals()
+
+    def cancel(self):
+        """Stops the conversion; run() then removes its temporary file and reports nothing."""
+        self.cancelled = True
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+
+    def run(self):
+        mp3_path = os.path.splitext(self.source_path)[0] + ".mp3"
+        tmp_path = mp3_path + ".tmp"
+        try:
+            args = [FFMPEG, "-y", "-loglevel", "error", "-i", self.source_path, "-vn",
+                    "-codec:a", "libmp3lame", "-q:a", "2", "-f", "mp3", tmp_path]
+            self.process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                            **low_priority_kwargs())
+            if self.cancelled:
+                self.process.kill()
+            _, stderr = self.process.communicate()
+            if self.process.returncode != 0:
+                raise subprocess.CalledProcessError(self.process.returncode, args, stderr=stderr)
+            os.replace(tmp_path, mp3_path)
+        except (OSError, subprocess.CalledProcessError) as e:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            if not self.cancelled:
+                stderr = getattr(e, "stderr", None)
+                self.signals.error.emit(self.song_id, stderr.decode(errors="replace").strip() if stderr else str(e))
+            return
+        self.signals.finished.emit(self.song_id, self.source_path, mp3_path)
+
+
+class Transcoder(QObject):
+    """
+    Converts downloaded audio to MP3 in the background, one song at a time.
+
+    Songs are downloaded in whatever container YouTube serves so they are
+    playable straight away. With "Convert to MP3" on, each one is then
+    converted here by a below-normal-priority ffmpeg, written to a temporary
+    file and renamed into place; only then does the song's mp3_location move
+    to the MP3 and the original file get removed. While `in_use(path)` says a
+    player still has the original open, that last step waits for release().
+    Needs ffmpeg on PATH.
+    """
+
+    def __init__(self, library, in_use=None, parent=None):
+        super().__init__(parent)
+        self.library = library
+        self.in_use = in_use or (lambda path: False)
+        self.threadpool = QThreadPool(self)
+        self.threadpool.setMaxThreadCount(1)
+        self.pending = {}  # song id -> TranscodeJob queued or running
+        self.deferred = {}  # song id -> (source path, mp3 path) converted while its source was playing
+
+    @staticmethod
+    def available():
+        return FFMPEG is not None
+
+    @staticmethod
+    def needs_conversion(song):
+        location = song.get("mp3_location") or ""
+        return bool(location) and not location.lower().endswith(".mp3")
+
+    def queue(self, song):
+        if (not self.available() or song["id"] in self.pending or song["id"] in self.deferred
+                or not self.needs_conversion(song)):
+            return
+        job = TranscodeJob(song["id"], song["mp3_location"])
+        self.pending[song["id"]] = job
+        job.signals.finished.connect(self.on_converted)
+        job.signals.error.connect(self.on_error)
+        self.threadpool.start(job)
+
+    def queue_library(self):
+        for song in list(self.library.all_songs):
+            self.queue(song)
+
+    def on_converted(self, song_id, source_path, mp3_path):
+        self.pending.pop(song_id, None)
+        if self.in_use(source_path):
+            self.deferred[song_id] = (source_path, mp3_path)
+            return
+        self.swap(song_id, source_path, mp3_path)
+
+    def release(self):
+        """Finishes deferred conversions whose source no player has open any more; called on source changes."""
+        for song_id, (source_path, mp3_path) in list(self.deferred.items()):
+            if not self.in_use(source_path):
+                del self.deferred[song_id]
+                self.swap(song_id, source_path, mp3_path)
+
+    def swap(self, song_id, source_path, mp3_path):
+        song = self.library.songs_by_id.get(song_id)
+        if song is None or song["mp3_location"] != source_path:
+            # Deleted or changed while converting; the conversion is no longer wanted
+            try:
+                os.remove(mp3_path)
+            except OSError as e:
+                print(f"Could not remove unwanted conversion {mp3_path}: {e}")
+            return
+        self.library.update_song(song_id, {"mp3_location": mp3_path})
+        try:
+            os.remove(source_path)
+        except OSError as e:
+            print(f"Could not remove {source_path} after converting it: {e}")
+
+    def on_error(self, song_id, message):
+        self.pending.pop(song_id, None)
+        print(f"Converting song {song_id} to MP3 failed: {message}")
+
+    def shutdown(self):
+        """Drops queued conversions and kills the running one, so no half-written .mp3.tmp is left behind."""
+        self.threadpool.clear()
+        for job in self.pending.values():
+            job.cancel()
+        self.threadpool.waitForDone(SHUTDOWN_TIMEOUT_MS)
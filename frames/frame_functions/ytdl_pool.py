@@ -0,0 +1,96 @@
+import threading
+
+from yt_dlp import YoutubeDL
+
+AUDIO_OPTS = {
+    'format': 'bestaudio/best',
+    'noplaylist': True,
+    'no_warnings': True,
+    'default_search': 'ytsearch1',
+    'quiet': True,
+    # Partial downloads stay in <file>.part and are continued by the next attempt at the same file
+    'continuedl': True,
+    'nopart': False
+}
+
+
+class YoutubeDLPool:
+    """
+    Keeps initialized YoutubeDL instances around and hands them out one thread at a time.
+
+    A fresh YoutubeDL per song pays for option parsing, extractor setup, a new
+    HTTP connection and (for YouTube) fetching the player code before any audio
+    moves. Reusing instances keeps all of that warm across downloads. An
+    instance is never shared by two threads at once, and one that raised is
+    dropped rather than reused.
+    """
+
+    def __init__(self, opts=AUDIO_OPTS, max_idle=8):
+        self.opts = opts
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        ydl = YoutubeDL(dict(self.opts))
+        # Instances outlive a download, so they get one hook that forwards to the current download's
+        ydl.add_progress_hook(self._on_progress)
+        return ydl
+
+    def _on_progress(self, status):
+        hook = getattr(self._local, "progress_hook", None)
+        if hook is not None:
+            hook(status)
+
+    def release(self, ydl):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(ydl)
+                return
+        ydl.close()
+
+    def download(self, target, output_path, format_spec=None, progress_hook=None):
+        """
+        Downloads `target` (a search query or a video URL) to `output_path` using a warm instance.
+
+        `output_path` may be a yt_dlp template such as "name.%(ext)s". Returns
+        the info dict of the video that was downloaded; for a search that is
+        its first result. `format_spec` overrides the pool's format
+        selection for this download only, and `progress_hook` receives its
+        yt_dlp progress dicts.
+        """
+        ydl = self.acquire()
+        default_selector = ydl.format_selector
+        self._local.progress_hook = progress_hook
+        try:
+            ydl.params['outtmpl']['default'] = output_path
+            if format_spec:
+                ydl.format_selector = ydl.build_format_selector(format_spec)
+            info = ydl.extract_info(target, download=True)
+            ydl.format_selector = default_selector
+        except BaseException:
+            ydl.close()
+            raise
+        finally:
+            self._local.progress_hook = None
+        self.release(ydl)
+
+        if info and 'entries' in info:
+            entries = list(info['entries'] or [])
+            info = entries[0] if entries else None
+        if not info:
+            raise ValueError(f"No results for '{target}'")
+        return info
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for ydl in idle:
+            ydl.close()
+
+
+audio_pool = YoutubeDLPool()
@@ -1,10 +1,11 @@
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QScrollArea, QStackedWidget, QApplication, \
-    QMenu, QDialog
+    QMenu
 from PySide6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QPoint, QParallelAnimationGroup, QRectF, QMimeData, \
     QTimer
 from PySide6.QtGui import QPixmap, QPainter, QPainterPath, QColor, QLinearGradient, QBrush, QDrag, QAction
 from frames.frame_functions.utils import name_label, create_button
 from frames.frame_functions.playlist_functions import EditPlaylistDialog
+from frames.frame_functions.thumbnail_cache import SONG_CARD
 from frames.search_frame import SearchFrame
 from frames.picks_for_you import PicksForYouWidget
 from frames.settings_frame import SettingsFrame
@@ -90,9 +91,7 @@ class PlaylistCardWidget(QWidget):
 
     def edit_playlist(self, playlist_name):
         dialog = EditPlaylistDialog(self, playlist_name)
-        if dialog.exec() == QDialog.Accepted:
-            self.home_frame.main_frame.load_data()
-            self.home_frame.display_playlists()
+        dialog.exec()
 
     def contextMenuEvent(self, event):
         if not self.home_frame or not self.playlist_name:
@@ -161,13 +160,13 @@ class DropIndicator(QWidget):
 class SongCardWidget(QWidget):
     """Enhanced song card with drag & drop and a context menu"""
 
-    def __init__(self, parent=None, song_index=None, playlist_name=None, home_frame=None):
+    def __init__(self, parent=None, song_id=None, playlist_name=None, home_frame=None):
         super().__init__(parent)
         self.setFixedHeight(60)
         self.setAttribute(Qt.WA_StyledBackground, True)
         self.is_hovered = False
         self.is_being_dragged = False
-        self.song_index = song_index
+        self.song_id = song_id
         self.playlist_name = playlist_name
         self.home_frame = home_frame
         self.drag_start_position = None
@@ -223,12 +222,12 @@ class SongCardWidget(QWidget):
 
     def mouseDoubleClickEvent(self, event):
         """Handle double-click to play song"""
-        if event.button() == Qt.LeftButton and self.song_index and self.playlist_name:
-            self.home_frame.main_frame.play_song_from_sidebar(self.song_index, self.playlist_name)
+        if event.button() == Qt.LeftButton and self.song_id is not None and self.playlist_name:
+            self.home_frame.main_frame.play_song_from_sidebar(self.song_id, self.playlist_name)
         super().mouseDoubleClickEvent(event)
 
     def contextMenuEvent(self, event):
-        if self.song_index is None or not self.playlist_name or not self.home_frame:
+        if self.song_id is None or not self.playlist_name or not self.home_frame:
             return
 
         menu = QMenu(self)
@@ -268,9 +267,9 @@ class SongCardWidget(QWidget):
         add_to_queue_action = QAction("Add to Queue", self)
         remove_action = QAction("Remove from this Playlist", self)
 
-        play_next_action.triggered.connect(lambda: main_frame.play_song_next(self.song_index))
-        add_to_queue_action.triggered.connect(lambda: main_frame.add_song_to_queue(self.song_index))
-        remove_action.triggered.connect(lambda: self.home_frame.remove_song_from_current_playlist(self.song_index))
+        play_next_action.triggered.connect(lambda: main_frame.play_song_next(self.song_id))
+        add_to_queue_action.triggered.connect(lambda: main_frame.add_song_to_queue(self.song_id))
+        remove_action.triggered.connect(lambda: self.home_frame.remove_song_from_current_playlist(self.song_id))
 
         menu.addAction(play_next_action)
         menu.addAction(add_to_queue_action)
@@ -286,7 +285,7 @@ class SongCardWidget(QWidget):
             for p_name in other_playlists:
                 action = QAction(p_name, self)
                 action.triggered.connect(
-                    lambda checked=False, p=p_name: main_frame.add_song_to_playlist(self.song_index, p))
+                    lambda checked=False, p=p_name: main_frame.add_song_to_playlist(self.song_id, p))
                 add_to_playlist_menu.addAction(action)
 
         menu.addMenu(add_to_playlist_menu)
@@ -305,13 +304,13 @@ class SongCardWidget(QWidget):
 
     def start_drag(self):
         """Start the drag operation"""
-        if self.song_index is None or not self.playlist_name or not self.home_frame:
+        if self.song_id is None or not self.playlist_name or not self.home_frame:
             return
 
         drag = QDrag(self)
         mimeData = QMimeData()
 
-        mimeData.setText(f"{self.song_index}|{self.playlist_name}")
+        mimeData.setText(f"{self.song_id}|{self.playlist_name}")
         drag.setMimeData(mimeData)
 
         pixmap = self.grab()
@@ -336,7 +335,7 @@ class SongCardWidget(QWidget):
         if event.mimeData().hasText() and event.source() != self:
             try:
                 data = event.mimeData().text()
-                source_index, source_playlist = data.split('|')
+                source_id, source_playlist = data.split('|', 1)
                 if source_playlist == self.playlist_name:
                     event.acceptProposedAction()
                     if hasattr(self.home_frame, 'show_drop_indicator'):
@@ -350,7 +349,7 @@ class SongCardWidget(QWidget):
         if event.mimeData().hasText() and event.source() != self:
             try:
                 data = event.mimeData().text()
-                source_index, source_playlist = data.split('|')
+                source_id, source_playlist = data.split('|', 1)
                 if source_playlist == self.playlist_name:
                     event.acceptProposedAction()
                     return
@@ -366,12 +365,11 @@ class SongCardWidget(QWidget):
         if event.mimeData().hasText():
             data = event.mimeData().text()
             try:
-                source_index, source_playlist = data.split('|')
-                source_index = int(source_index)
+                source_id, source_playlist = data.split('|', 1)
 
-                if source_playlist == self.playlist_name and source_index != self.song_index:
+                if source_playlist == self.playlist_name and source_id != self.song_id:
                     self.home_frame.reorder_song_in_playlist(
-                        source_index, self.song_index, self.playlist_name
+                        source_id, self.song_id, self.playlist_name
                     )
                     event.acceptProposedAction()
             except (ValueError, AttributeError):
@@ -398,8 +396,18 @@ class HomeScreenFrame(QWidget):
         self.main_frame = main_frame
         self.current_playlist_name = None
         self.drop_indicator = None
+        self.playlist_cards = {}
+        self.song_cards = []
         self.init_ui()
 
+        signals = self.main_frame.library.signals
+        signals.playlistAdded.connect(self.on_playlist_added)
+        signals.playlistRemoved.connect(self.on_playlist_removed)
+        signals.playlistRenamed.connect(self.on_playlist_renamed)
+        signals.playlistChanged.connect(self.on_playlist_changed)
+        signals.playlistReordered.connect(self.on_playlist_reordered)
+        signals.songChanged.connect(self.on_song_changed)
+
     def init_ui(self):
         self.layout = QVBoxLayout(self)
         self.layout.setContentsMargins(15, 20, 15, 20)
@@ -530,10 +538,65 @@ class HomeScreenFrame(QWidget):
             if w := item.widget():
                 w.deleteLater()
 
+        self.playlist_cards = {}
         for name in self.main_frame.playlists:
-            self.playlist_list_layout.addWidget(self.create_playlist_card(name))
+            self.playlist_cards[name] = self.create_playlist_card(name)
+            self.playlist_list_layout.addWidget(self.playlist_cards[name])
         self.playlist_list_layout.addStretch()
 
+    # --- Library change handlers: each touches only the cards the change affects ---
+
+    def on_playlist_added(self, name):
+        self.playlist_cards[name] = self.create_playlist_card(name)
+        # Insert before the trailing stretch, matching the library's playlist order
+        self.playlist_list_layout.insertWidget(self.playlist_list_layout.count() - 1, self.playlist_cards[name])
+
+    def on_playlist_removed(self, name):
+        card = self.playlist_cards.pop(name, None)
+        if card is not None:
+            self.playlist_list_layout.removeWidget(card)
+            card.deleteLater()
+        if name == self.current_playlist_name:
+            self.current_playlist_name = None
+            if self.content_stack.currentWidget() == self.song_glass_container:
+                self.show_playlists()
+
+    def on_playlist_renamed(self, old_name, new_name):
+        # A renamed playlist moves to the end of the library's order, so its card does too
+        self.on_playlist_removed(old_name)
+        self.on_playlist_added(new_name)
+
+    def on_playlist_changed(self, name):
+        self.refresh_playlist_cover(name)
+        if name == self.current_playlist_name:
+            self.sync_song_cards(name)
+
+    def on_playlist_reordered(self, name, source_pos, target_pos):
+        self.refresh_playlist_cover(name)
+        if name == self.current_playlist_name and source_pos < len(self.song_cards):
+            card = self.song_cards.pop(source_pos)
+            self.song_cards.insert(target_pos, card)
+            self.song_list_layout.removeWidget(card)
+            self.song_list_layout.insertWidget(target_pos, card)
+
+    def on_song_changed(self, song_id, fields):
+        if 'cover_location' in fields:
+            for name in self.playlist_cards:
+                if self.main_frame.library.playlist_contains(name, song_id):
+                    self.refresh_playlist_cover(name)
+        for position, card in enumerate(self.song_cards):
+            if card.song_id == song_id:
+                new_card = self.create_song_card(self.main_frame.songs_by_id[song_id], song_id,
+                                                 self.current_playlist_name)
+                self.song_list_layout.replaceWidget(card, new_card)
+                card.deleteLater()
+                self.song_cards[position] = new_card
+
+    def refresh_playlist_cover(self, name):
+        card = self.playlist_cards.get(name)
+        if card is not None:
+            card.cover_label.setPixmap(self.main_frame.generate_playlist_cover(name, 60))
+
     def create_playlist_card(self, name):
         card = PlaylistCardWidget(home_frame=self, playlist_name=name)
         layout = QHBoxLayout(card)
@@ -543,6 +606,7 @@ class HomeScreenFrame(QWidget):
         cover.setFixedSize(60, 60)
         cover.setPixmap(self.main_frame.generate_playlist_cover(name, 60))
         cover.setStyleSheet("background: transparent;")
+        card.cover_label = cover
 
         name_widget = name_label(name,
                                  styleSheet="font-size: 16px; font-weight: 500; color: #e0e0e0; background: transparent;")
@@ -558,25 +622,50 @@ class HomeScreenFrame(QWidget):
     def display_songs_for_playlist(self, name):
         self.current_playlist_name = name
         self.song_list_title.setText(name)
+        self.display_song_cards(name)
+        self.animate_transition(self.song_glass_container)
+
+    def display_song_cards(self, name):
         while self.song_list_layout.count():
             item = self.song_list_layout.takeAt(0)
             if w := item.widget():
                 w.deleteLater()
 
-        playlist = self.main_frame.playlists.get(name)
-        if not playlist or not playlist.get('songs'):
+        songs_by_id = self.main_frame.songs_by_id
+        song_ids = self.main_frame.playlists.get(name, {}).get('songs', [])
+        self.song_cards = [self.create_song_card(songs_by_id[song_id], song_id, name) for song_id in song_ids]
+        if not self.song_cards:
             empty_label = QLabel("This playlist is empty.")
             empty_label.setStyleSheet("color: #a0a0a0; background: transparent;")
             self.song_list_layout.addWidget(empty_label)
-        else:
-            for idx in playlist['songs']:
-                self.song_list_layout.addWidget(self.create_song_card(self.main_frame.all_songs[idx], idx, name))
-
+        for card in self.song_cards:
+            self.song_list_layout.addWidget(card)
         self.song_list_layout.addStretch()
-        self.animate_transition(self.song_glass_container)
 
-    def create_song_card(self, info, index, playlist_name):
-        card = SongCardWidget(song_index=index, playlist_name=playlist_name, home_frame=self)
+    def sync_song_cards(self, name):
+        """Brings the open song list in line with the playlist, touching only the cards that changed when it can."""
+        shown = [card.song_id for card in self.song_cards]
+        song_ids = self.main_frame.playlists[name]['songs']
+
+        if shown and song_ids[:len(shown)] == shown:
+            songs_by_id = self.main_frame.songs_by_id
+            for song_id in song_ids[len(shown):]:
+                card = self.create_song_card(songs_by_id[song_id], song_id, name)
+                self.song_list_layout.insertWidget(len(self.song_cards), card)
+                self.song_cards.append(card)
+        elif len(song_ids) == len(shown) - 1 and song_ids:
+            position = next((i for i, song_id in enumerate(song_ids) if song_id != shown[i]), len(song_ids))
+            if song_ids[position:] != shown[position + 1:]:
+                self.display_song_cards(name)
+                return
+            card = self.song_cards.pop(position)
+            self.song_list_layout.removeWidget(card)
+            card.deleteLater()
+        else:
+            self.display_song_cards(name)
+
+    def create_song_card(self, info, song_id, playlist_name):
+        card = SongCardWidget(song_id=song_id, playlist_name=playlist_name, home_frame=self)
 
         layout = QHBoxLayout(card)
         layout.setContentsMargins(10, 5, 10, 5)
@@ -584,19 +673,7 @@ class HomeScreenFrame(QWidget):
         cover = QLabel()
         cover.setFixedSize(50, 50)
         cover.setStyleSheet("background: transparent;")
-        pix = QPixmap(info['cover_location'])
-        rounded = QPixmap(cover.size())
-        rounded.fill(Qt.transparent)
-
-        painter = QPainter(rounded)
-        painter.setRenderHint(QPainter.Antialiasing)
-
-        path = QPainterPath()
-        path.addRoundedRect(QRectF(cover.rect()), 8, 8)
-        painter.setClipPath(path)
-        painter.drawPixmap(0, 0, pix.scaled(cover.size(), Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation))
-        painter.end()
-        cover.setPixmap(rounded)
+        cover.setPixmap(self.main_frame.thumbnails.pixmap(info['cover_location'], SONG_CARD))
 
         info_layout = QVBoxLayout()
         info_layout.setSpacing(0)
@@ -616,38 +693,32 @@ class HomeScreenFrame(QWidget):
 
         return card
 
-    def reorder_song_in_playlist(self, source_index, target_index, playlist_name):
-        """Reorder songs in the playlist and update JSON"""
+    def reorder_song_in_playlist(self, source_id, target_id, playlist_name):
+        """Reorder songs in the playlist and persist only the moved range"""
         if playlist_name not in self.main_frame.playlists:
             return
 
         playlist_songs = self.main_frame.playlists[playlist_name]['songs']
 
         try:
-            source_pos = playlist_songs.index(source_index)
-            target_pos = playlist_songs.index(target_index)
-
-            song_to_move = playlist_songs.pop(source_pos)
-            playlist_songs.insert(target_pos, song_to_move)
-
-            self.main_frame.save_playlists_to_json()
+            source_pos = playlist_songs.index(source_id)
+            target_pos = playlist_songs.index(target_id)
 
-            self.display_songs_for_playlist(playlist_name)
+            self.main_frame.library.move_in_playlist(playlist_name, source_pos, target_pos)
 
         except ValueError:
             pass
 
-    def remove_song_from_current_playlist(self, song_index):
-        """Removes a song from the currently displayed playlist and refreshes the view."""
+    def remove_song_from_current_playlist(self, song_id):
+        """Removes a song from the currently displayed playlist; the view updates from the library's signal."""
         if self.current_playlist_name not in self.main_frame.playlists:
             return
 
         playlist_songs = self.main_frame.playlists[self.current_playlist_name]['songs']
 
         try:
-            playlist_songs.remove(song_index)
-            self.main_frame.save_playlists_to_json()
-            self.display_songs_for_playlist(self.current_playlist_name)
+            position = playlist_songs.index(song_id)
+            self.main_frame.library.remove_from_playlist(self.current_playlist_name, position)
         except ValueError:
             pass
 
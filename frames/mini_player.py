@@ -2,6 +2,7 @@ from PySide6.QtWidgets import QWidget, QHBoxLayout, QApplication, QVBoxLayout, Q
 from PySide6.QtCore import Qt, QPropertyAnimation, QEasingCurve
 from PySide6.QtGui import QIcon, QPixmap, QMouseEvent, QPainter, QPainterPath, QBrush, QColor
 from frames.frame_functions.utils import create_button
+from frames.frame_functions.thumbnail_cache import MICRO_COVER, MINI_BACKGROUND
 
 
 class BasePlayer(QWidget):
@@ -199,23 +200,9 @@ class MicroPlayer(BasePlayer):
         self.show()
 
     def set_cover_image(self, image_path):
-        pixmap = QPixmap(image_path)
+        pixmap = self.main_window.thumbnails.pixmap(image_path, MICRO_COVER)
         if not pixmap.isNull():
-            rounded_pixmap = QPixmap(60, 60)
-            rounded_pixmap.fill(Qt.transparent)
-
-            painter = QPainter(rounded_pixmap)
-            painter.setRenderHint(QPainter.Antialiasing)
-
-            path = QPainterPath()
-            path.addRoundedRect(0, 0, 60, 60, 8, 8)
-            painter.setClipPath(path)
-
-            scaled_pixmap = pixmap.scaled(60, 60, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
-            painter.drawPixmap(0, 0, scaled_pixmap)
-            painter.end()
-
-            self.cover_label.setPixmap(rounded_pixmap)
+            self.cover_label.setPixmap(pixmap)
 
     def mouseDoubleClickEvent(self, event: QMouseEvent):
         self.expand_to_mini()
@@ -338,9 +325,9 @@ class MiniPlayer(BasePlayer):
         self.hide()
 
         if hasattr(self.main_window, 'player') and not self.main_window.player.source().isEmpty():
-            source = self.main_window.player.source().toString().lower()
-            if source in self.main_window.url_to_song_info:
-                cover_path = self.main_window.url_to_song_info[source]['cover_location']
+            song = self.main_window.song_for_source()
+            if song is not None:
+                cover_path = song['cover_location']
             else:
                 cover_path = 'icons/default-image.png'
         else:
@@ -370,7 +357,7 @@ class MiniPlayer(BasePlayer):
             self.micro_player.hide()
 
     def set_background_image(self, image_path):
-        pixmap = QPixmap(image_path)
+        pixmap = self.main_window.thumbnails.pixmap(image_path, MINI_BACKGROUND)
         self.background_label.setPixmap(pixmap)
 
         if hasattr(self, 'micro_player'):
@@ -6,7 +6,7 @@ from PySide6.QtWidgets import (QWidget, QHBoxLayout, QLabel, QVBoxLayout, QSlide
                                QPushButton, QDialog, QSpinBox, QFrame, QListWidgetItem,
                                QListWidget, QSizePolicy, QGridLayout, QProgressBar)
 from .frame_functions.utils import create_button
-from colorthief import ColorThief
+from .frame_functions.thumbnail_cache import LARGE_COVER
 
 
 class CustomTimerDialog(QDialog):
@@ -201,7 +201,7 @@ class QueueListWidget(QListWidget):
     def dropEvent(self, event):
         super().dropEvent(event)
         new_order_data = [self.item(i).data(Qt.UserRole) for i in range(self.count())]
-        actual_song_order = [data for data in new_order_data if isinstance(data, dict) and 'mp3_location' in data]
+        actual_song_order = [data for data in new_order_data if data is not None]
         if hasattr(self.parent().parent(), 'queueUpdated'):
             self.parent().parent().queueUpdated.emit(actual_song_order)
 
@@ -283,7 +283,7 @@ class QueueView(QWidget):
         def create_song_item(song_info, highlight=False):
             display_text = f"⠿ {song_info['song_name']} - {song_info['artist']}"
             item = QListWidgetItem(display_text)
-            item.setData(Qt.UserRole, song_info)
+            item.setData(Qt.UserRole, song_info['id'])
             if highlight:
                 gradient = QLinearGradient(0, 0, 1, 0)
                 gradient.setCoordinateMode(QLinearGradient.ObjectBoundingMode)
@@ -521,76 +521,52 @@ class NowPlayingView(QWidget):
             self.top_bar_layout.setContentsMargins(20, 25, 20, 0)
             self.menu_button.setToolTip("Show Panel")
 
-    @staticmethod
-    def get_dominant_colors(image_path):
-        try:
-            color_thief = ColorThief(image_path)
-            palette = color_thief.get_palette(color_count=3, quality=1)
-            return palette
-        except Exception as e:
-            print(f"Error getting dominant colors: {e}")
-            return [(100, 100, 100), (80, 80, 80), (60, 60, 60)]
-
     def update_info(self, song_info):
         if not song_info or 'cover_location' not in song_info:
             self.song_title.setText("No Song Playing")
             self.artist_label.setText("Select a song to begin")
             pixmap = QPixmap("icons/default-image.png")
-            self.dominant_colors = self.get_dominant_colors("icons/default-image.png")
         else:
             self.song_title.setText(song_info['song_name'])
             self.artist_label.setText(song_info['artist'])
             pixmap = QPixmap(song_info['cover_location'])
             if pixmap.isNull():
                 pixmap = QPixmap("icons/default-image.png")
-            self.dominant_colors = self.get_dominant_colors(song_info.get('cover_location', "icons/default-image.png"))
 
-        self.update_large_cover(pixmap)
+        self.update_large_cover(song_info.get('cover_location') if song_info else None)
         QTimer.singleShot(10, lambda: self.backgroundChanged.emit(pixmap))
 
-    def update_large_cover(self, pixmap):
-        rounded_cover_pixmap = QPixmap(self.large_cover.size())
-        rounded_cover_pixmap.fill(Qt.transparent)
-        painter = QPainter(rounded_cover_pixmap)
-        painter.setRenderHint(QPainter.Antialiasing)
-        clip_path = QPainterPath()
-        clip_path.addRoundedRect(QRectF(0, 0, self.large_cover.width(), self.large_cover.height()), 30, 30)
-        painter.setClipPath(clip_path)
-        scaled_image_for_cover = pixmap.scaled(self.large_cover.size(), Qt.KeepAspectRatioByExpanding,
-                                               Qt.SmoothTransformation)
-        painter.drawPixmap(0, 0, scaled_image_for_cover)
-        painter.end()
+    def update_large_cover(self, cover_path):
+        thumbnails = self.main_frame.thumbnails
+        rounded_cover_pixmap = thumbnails.pixmap(cover_path, LARGE_COVER) if cover_path else QPixmap()
+        if rounded_cover_pixmap.isNull():
+            rounded_cover_pixmap = thumbnails.pixmap("icons/default-image.png", LARGE_COVER)
         self.large_cover.setPixmap(rounded_cover_pixmap)
 
-    def update_current_playlist_from_queue(self, new_song_info_order):
-        new_indices = []
-        current_song_path = self.main_frame.player.source().toLocalFile().lower() if self.main_frame.player.source().isLocalFile() else ""
-        for info in new_song_info_order:
-            try:
-                original_index = next(
-                    i for i, s in enumerate(self.main_frame.all_songs) if s['mp3_location'] == info['mp3_location'])
-                new_indices.append(original_index)
-            except StopIteration:
-                print(f"Warning: Song '{info.get('song_name')}' from queue not found in all_songs.")
-
-        self.main_frame.current_playlist = new_indices
-        if current_song_path and new_indices:
+    def update_current_playlist_from_queue(self, new_song_id_order):
+        songs_by_id = self.main_frame.songs_by_id
+        new_ids = []
+        for song_id in new_song_id_order:
+            if song_id in songs_by_id:
+                new_ids.append(song_id)
+            else:
+                print(f"Warning: Song '{song_id}' from queue not found in all_songs.")
+
+        self.main_frame.current_playlist = new_ids
+        current_song = self.main_frame.song_for_source()
+        if current_song and new_ids:
             try:
-                current_original_idx = next(i for i, s in enumerate(self.main_frame.all_songs) if
-                                            s['mp3_location'].lower() == current_song_path)
-                self.main_frame.current_song_index = new_indices.index(current_original_idx)
-            except (StopIteration, ValueError):
+                self.main_frame.current_song_index = new_ids.index(current_song['id'])
+            except ValueError:
                 self.main_frame.current_song_index = 0
-        elif new_indices:
+        elif new_ids:
             self.main_frame.current_song_index = 0
         else:
             self.main_frame.current_song_index = -1
             self.main_frame.player.stop()
             self.update_info(None)
 
-        current_songs_for_queue = [self.main_frame.all_songs[i] for i in self.main_frame.current_playlist if
-                                   0 <= i < len(self.main_frame.all_songs)]
-        self.queue_view.update_queue(current_songs_for_queue)
+        self.queue_view.update_queue([songs_by_id[song_id] for song_id in new_ids])
 
     def update_play_button_icon(self):
         if self.main_frame.player.isPlaying():
@@ -604,8 +580,8 @@ class NowPlayingView(QWidget):
         player = self.main_frame.player
         if player.source().isEmpty():
             if self.main_frame.current_playlist and self.main_frame.current_song_index != -1:
-                idx = self.main_frame.current_playlist[self.main_frame.current_song_index]
-                self.main_frame.set_media(self.main_frame.all_songs[idx]["mp3_location"])
+                song_id = self.main_frame.current_playlist[self.main_frame.current_song_index]
+                self.main_frame.set_media(self.main_frame.songs_by_id[song_id]["mp3_location"])
         elif player.isPlaying():
             player.pause()
         else:
@@ -628,8 +604,8 @@ class NowPlayingView(QWidget):
         else:
             self.main_frame.current_song_index = (self.main_frame.current_song_index + 1) % count
 
-        actual_idx = self.main_frame.current_playlist[self.main_frame.current_song_index]
-        self.main_frame.set_media(self.main_frame.all_songs[actual_idx]["mp3_location"])
+        song_id = self.main_frame.current_playlist[self.main_frame.current_song_index]
+        self.main_frame.set_media(self.main_frame.songs_by_id[song_id]["mp3_location"])
 
     def prev_song(self):
         if not self.main_frame.current_playlist:
@@ -639,8 +615,8 @@ class NowPlayingView(QWidget):
             return
 
         self.main_frame.current_song_index = (self.main_frame.current_song_index - 1 + count) % count
-        actual_idx = self.main_frame.current_playlist[self.main_frame.current_song_index]
-        self.main_frame.set_media(self.main_frame.all_songs[actual_idx]["mp3_location"])
+        song_id = self.main_frame.current_playlist[self.main_frame.current_song_index]
+        self.main_frame.set_media(self.main_frame.songs_by_id[song_id]["mp3_location"])
 
     def set_position(self, position):
         self.main_frame.player.setPosition(position * 1000)
@@ -705,7 +681,8 @@ class NowPlayingView(QWidget):
     def show_queue(self):
         current_songs = []
         if self.main_frame.current_playlist:
-            current_songs = [self.main_frame.all_songs[i] for i in self.main_frame.current_playlist if
-                             0 <= i < len(self.main_frame.all_songs)]
+            songs_by_id = self.main_frame.songs_by_id
+            current_songs = [songs_by_id[song_id] for song_id in self.main_frame.current_playlist
+                             if song_id in songs_by_id]
         self.queue_view.update_queue(current_songs)
         self.queue_view.show_queue()
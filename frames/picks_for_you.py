@@ -1,6 +1,5 @@
 import json
 import random
-import requests
 import math
 from PySide6.QtCore import Qt, QRunnable, QObject, Signal, QThreadPool, QRectF, QTimer, QEasingCurve, QPropertyAnimation
 from PySide6.QtGui import QPixmap, QPainter, QPainterPath, QColor, QLinearGradient, QPen
@@ -316,30 +315,6 @@ class HandcraftedLayoutManager:
 
 
 
-class ImageDownloadWorker(QRunnable):
-    class Signals(QObject):
-        finished = Signal(str, QPixmap)
-        error = Signal(str)
-
-    def __init__(self, url, track_id):
-        super().__init__()
-        self.url = url
-        self.track_id = track_id
-        self.signals = self.Signals()
-
-    def run(self):
-        try:
-            if not self.url:
-                return
-            response = requests.get(self.url, timeout=10)
-            response.raise_for_status()
-            pixmap = QPixmap()
-            if pixmap.loadFromData(response.content):
-                self.signals.finished.emit(self.track_id, pixmap)
-        except Exception as e:
-            self.signals.error.emit(f"Error downloading image: {str(e)}")
-
-
 class RecommendationWorker(QRunnable):
     class Signals(QObject):
         finished = Signal(list)
@@ -596,6 +571,9 @@ class PicksForYouWidget(QWidget):
         self.threadpool = QThreadPool()
         self.recommendation_cards = []
         self.image_cache = {}
+        self.pending_covers = {}  # (cover url, shape) -> [(track id, card)] waiting for it
+        self.main_frame.image_pipeline.imageReady.connect(self.on_image_ready)
+        self.main_frame.image_pipeline.imageFailed.connect(self.on_image_failed)
         self.all_recommendations = []
         self.current_displayed_tracks = []
         self.animation_timer = QTimer(self)  
@@ -803,9 +781,23 @@ class PicksForYouWidget(QWidget):
         if not cover_url:
             return
 
-        worker = ImageDownloadWorker(cover_url, track_id)
-        worker.signals.finished.connect(lambda tid, pixmap, c=card: self.update_card_image(tid, pixmap, c))
-        self.threadpool.start(worker)
+        image = self.main_frame.image_pipeline.request(cover_url, card.size())
+        if image is not None:
+            self.update_card_image(track_id, QPixmap.fromImage(image), card)
+        else:
+            shape = (card.width(), card.height(), 0)
+            self.pending_covers.setdefault((cover_url, shape), []).append((track_id, card))
+
+    def on_image_ready(self, url, shape, image):
+        waiting = self.pending_covers.pop((url, shape), ())
+        if waiting:
+            pixmap = QPixmap.fromImage(image)
+            for track_id, card in waiting:
+                self.update_card_image(track_id, pixmap, card)
+
+    def on_image_failed(self, url, message):
+        for key in [key for key in self.pending_covers if key[0] == url]:
+            del self.pending_covers[key]
 
     def update_card_image(self, track_id, pixmap, card):
         """Update card with downloaded image."""
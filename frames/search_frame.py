@@ -1,14 +1,10 @@
-import json
 import os
-import re
-import requests
-import urllib.request
-from PySide6.QtCore import Qt, QByteArray, QObject, Signal, QRunnable, QThreadPool, QUrl, Slot, QSize, QRectF
+from PySide6.QtCore import Qt, QUrl, QSize, QRectF
 from PySide6.QtGui import QPixmap, QPixmapCache, QIcon, QPainter, QPainterPath, QColor, QLinearGradient, QBrush
 from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QScrollArea
-from yt_dlp import YoutubeDL
 from frames.frame_functions.utils import create_button, name_label
+from frames.frame_functions.download_engine import SongDownloader
 
 
 
@@ -57,114 +53,6 @@ class SearchResultCardWidget(QWidget):
         super().leaveEvent(event)
 
 
-class ImageDownloader(QRunnable):
-    class Signals(QObject):
-        finished = Signal(str, QPixmap)
-        error = Signal(str)
-
-    def __init__(self, url: str, item_identifier: str):
-        super().__init__()
-        self.url = url
-        self.item_identifier = item_identifier
-        self.signals = self.Signals()
-
-    def run(self):
-        try:
-            if not self.url:
-                self.signals.error.emit(f"No URL for {self.item_identifier}")
-                return
-            response = requests.get(self.url, timeout=10)
-            response.raise_for_status()
-            pixmap = QPixmap()
-            if pixmap.loadFromData(QByteArray(response.content)):
-                self.signals.finished.emit(self.url, pixmap)
-            else:
-                self.signals.error.emit(f"Failed to load image data for {self.url}")
-        except Exception as e:
-            self.signals.error.emit(str(e))
-
-
-def sanitize_filename(filename):
-    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
-    filename = filename.replace(' ', '_')
-    filename = ''.join(char for char in filename if ord(char) < 128)
-    return filename[:200]
-
-
-class SongDownloader(QRunnable):
-    class Signals(QObject):
-        finished = Signal(dict, int)
-        error = Signal(str, int)
-        progress = Signal(str, int)
-
-    def __init__(self, track_info, ui_index, download_path):
-        super().__init__()
-        self.track_info = track_info
-        self.ui_index = ui_index
-        self.download_path = download_path
-        self.signals = self.Signals()
-
-    @Slot()
-    def run(self):
-        try:
-            song_name = self.track_info["name"]
-            artist_name = self.track_info["artists"][0]["name"]
-            track_id = self.track_info.get("id", song_name + artist_name)
-            artist_id = self.track_info['artists'][0]['id']
-            safe_fb = sanitize_filename(f"{song_name}_{artist_name}")
-            cover_url = self.track_info["album"]["images"][0]["url"] if self.track_info["album"]["images"] else None
-            cover_path = os.path.join(self.download_path, f"{safe_fb}.png")
-            mp3_path = os.path.join(self.download_path, f"{safe_fb}.mp3")
-            lrc_path = os.path.join(self.download_path, f"{safe_fb}.lrc")
-
-            if cover_url:
-                try:
-                    urllib.request.urlretrieve(cover_url, cover_path)
-                    self.signals.progress.emit("Cover downloaded", self.ui_index)
-                except:
-                    self.signals.progress.emit("Cover download failed", self.ui_index)
-
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'outtmpl': mp3_path,
-                'noplaylist': True,
-                'no_warnings': True,
-                'default_search': 'ytsearch1',
-                'quiet': True
-            }
-            with YoutubeDL(ydl_opts) as ydl:
-                ydl.download([f"{song_name} {artist_name} audio"])
-                self.signals.progress.emit("MP3 downloaded", self.ui_index)
-
-            try:
-                l_song, l_artist = urllib.parse.quote_plus(song_name), urllib.parse.quote_plus(artist_name)
-                lyrics_url = f"https://lrclib.net/api/search?track_name={l_song}&artist_name={l_artist}"
-                resp = requests.get(lyrics_url, timeout=10)
-                resp.raise_for_status()
-                lyrics_data = resp.json()
-                lyrics_txt = lyrics_data[0].get('syncedLyrics') or lyrics_data[0].get('plainLyrics') if lyrics_data and lyrics_data[0] else None
-                with open(lrc_path, 'w', encoding='utf-8') as f:
-                    f.write(lyrics_txt or "")
-                self.signals.progress.emit("Lyrics fetched" if lyrics_txt else "No lyrics", self.ui_index)
-            except:
-                open(lrc_path, 'w').close()
-                self.signals.progress.emit("Lyrics fetch error", self.ui_index)
-
-            new_song_dict = {
-                "song_name": song_name,
-                "artist": artist_name,
-                "mp3_location": mp3_path,
-                "cover_location": cover_path if os.path.exists(cover_path) else "icons/default-image.png",
-                "lyrics_location": lrc_path if os.path.exists(lrc_path) else "",
-                "id": track_id,
-                "artist_id": artist_id
-            }
-
-            self.signals.finished.emit(new_song_dict, self.ui_index)
-        except Exception as e:
-            self.signals.error.emit(str(e), self.ui_index)
-
-
 class SearchFrame(QWidget):
     def __init__(self, parent=None, back_callback=None):
         super().__init__(parent)
@@ -172,17 +60,18 @@ class SearchFrame(QWidget):
         self.sp = self.main_frame.sp
         self.back_callback = back_callback
         self.back_callback = back_callback
-        self.active_downloads = {}
+        self.active_downloads = {}  # track id -> "downloading", "completed" or "error"; outlives the results
+        self.streams = {}  # track id -> stream server token, for songs played while they downloaded
         self.preview_buttons = {}
         self.download_buttons = {}
         self.result_cards = []
         self.search_results = []
-        self.threadpool = QThreadPool()
-        self.threadpool.setMaxThreadCount(5)
+        self.pending_art = {}  # (cover url, shape) -> labels waiting for it
         QPixmapCache.setCacheLimit(20 * 1024 * 1024)
         self.preview_player = QMediaPlayer()
         self.audio_output = QAudioOutput()
         self.preview_player.setAudioOutput(self.audio_output)
+        self.main_frame.watch_player(self.preview_player)
         self.currently_playing_preview_idx = -1
         self.setup_ui()
         self.connect_signals()
@@ -251,6 +140,9 @@ class SearchFrame(QWidget):
         self.preview_player.playbackStateChanged.connect(self.on_preview_playback_state_changed)
         self.preview_player.mediaStatusChanged.connect(self.on_preview_media_status_changed)
         self.preview_player.errorOccurred.connect(self.on_preview_player_error)
+        self.preview_player.sourceChanged.connect(self.release_streams)
+        self.main_frame.image_pipeline.imageReady.connect(self.on_image_ready)
+        self.main_frame.image_pipeline.imageFailed.connect(self.on_image_failed)
 
     def on_preview_player_error(self, error):
         idx = self.currently_playing_preview_idx
@@ -326,11 +218,9 @@ class SearchFrame(QWidget):
 
         cover_url = track_data["album"]["images"][0]["url"] if track_data["album"]["images"] else None
         if cover_url:
-            self.load_image_async(cover_url, art_label, QSize(60, 60), track_data.get("id", str(ui_index)))
+            self.load_image_async(cover_url, art_label, QSize(60, 60))
         else:
-            default_pixmap = QPixmap("icons/default-image.png").scaled(60, 60, Qt.KeepAspectRatio,
-                                                                       Qt.SmoothTransformation)
-            art_label.setPixmap(self.round_pixmap(default_pixmap, 8))
+            self.set_default_art(art_label, QSize(60, 60))
 
         text_widget = QWidget()
         text_widget.setStyleSheet("background: transparent;")
@@ -373,12 +263,16 @@ class SearchFrame(QWidget):
         self.download_buttons[ui_index] = download_btn
 
         track_id = track_data.get('id')
-        print(track_id, self.main_frame.get_song_index_by_id(track_id))
-        if track_id and self.main_frame.get_song_index_by_id(track_id) is not None:
+        if track_id and self.main_frame.get_song_by_id(track_id) is not None:
             download_btn.setIcon(QIcon("icons/complete.png"))
             download_btn.setEnabled(False)
             download_btn.setToolTip("Already in library")
-            self.active_downloads[ui_index] = "completed"
+            self.active_downloads[track_id] = "completed"
+        elif self.active_downloads.get(track_id) == "downloading":
+            # Started from an earlier search and still running
+            download_btn.setIcon(QIcon("icons/loading.png"))
+            download_btn.setEnabled(False)
+            download_btn.setToolTip("Downloading...")
         else:
             download_btn.setToolTip("Download")
 
@@ -390,6 +284,8 @@ class SearchFrame(QWidget):
 
     def clear_results(self):
         self.preview_player.stop()
+        # Lets go of the file, and through release_streams of any download it was streaming
+        self.preview_player.setSource(QUrl())
         self.currently_playing_preview_idx = -1
 
         for card in self.result_cards:
@@ -404,10 +300,12 @@ class SearchFrame(QWidget):
         self.status_label.setText("Search for music on Spotify.")
         self.status_label.show()
 
+        self.release_streams(QUrl())
+
         self.preview_buttons.clear()
         self.download_buttons.clear()
-        self.active_downloads.clear()
         self.search_results.clear()
+        self.pending_art.clear()
 
     def round_pixmap(self, pixmap, radius):
         if pixmap.isNull(): return QPixmap()
@@ -422,26 +320,28 @@ class SearchFrame(QWidget):
         painter.end()
         return rounded
 
-    def load_image_async(self, url, label, size, item_id):
-        cached = QPixmapCache.find(url)
-        if cached:
-            label.setPixmap(self.round_pixmap(cached.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation), 8))
-            return
+    def load_image_async(self, url, label, size):
+        image = self.main_frame.image_pipeline.request(url, size, 8)
+        if image is not None:
+            label.setPixmap(QPixmap.fromImage(image))
+        else:
+            self.pending_art.setdefault((url, (size.width(), size.height(), 8)), []).append(label)
 
-        downloader = ImageDownloader(url, item_id)
-        downloader.signals.finished.connect(lambda u, p: self.update_image_on_label(u, p, label, size))
-        downloader.signals.error.connect(lambda err: print(f"Image download error for {item_id}: {err}"))
-        self.threadpool.start(downloader)
+    def on_image_ready(self, url, shape, image):
+        labels = self.pending_art.pop((url, shape), ())
+        if labels:
+            pixmap = QPixmap.fromImage(image)
+            for label in labels:
+                label.setPixmap(pixmap)
 
-    def update_image_on_label(self, url, pixmap, label, size):
-        if not pixmap.isNull():
-            scaled = pixmap.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            label.setPixmap(self.round_pixmap(scaled, 8))
-            QPixmapCache.insert(url, pixmap)
-        else:
-            default_pixmap = QPixmap("icons/default-image.png").scaled(size, Qt.KeepAspectRatio,
-                                                                       Qt.SmoothTransformation)
-            label.setPixmap(self.round_pixmap(default_pixmap, 8))
+    def on_image_failed(self, url, message):
+        for key in [key for key in self.pending_art if key[0] == url]:
+            for label in self.pending_art.pop(key):
+                self.set_default_art(label, label.size())
+
+    def set_default_art(self, label, size):
+        default_pixmap = QPixmap("icons/default-image.png").scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        label.setPixmap(self.round_pixmap(default_pixmap, 8))
 
     def play_preview(self, track_data, ui_index):
         if self.main_frame.player.playbackState() == QMediaPlayer.PlayingState:
@@ -464,6 +364,10 @@ class SearchFrame(QWidget):
         if preview_url:
             self.preview_player.setSource(QUrl(preview_url))
             self.preview_player.play()
+        elif self.stream_track(track_data, ui_index):
+            if ui_index in self.preview_buttons:
+                self.preview_buttons[ui_index].setIcon(QIcon("icons/loading.png"))
+                self.preview_buttons[ui_index].setToolTip("Buffering...")
         else:
             if ui_index in self.preview_buttons:
                 self.preview_buttons[ui_index].setIcon(QIcon("icons/no-preview.png"))
@@ -471,85 +375,113 @@ class SearchFrame(QWidget):
                 self.preview_buttons[ui_index].setEnabled(False)
             self.currently_playing_preview_idx = -1
 
-    def initiate_download(self, track_data, ui_index):
-        if ui_index in self.active_downloads and self.active_downloads[ui_index] in ["downloading", "completed"]:
+    def stream_track(self, track_data, ui_index):
+        """
+        Plays a track with no Spotify preview: a library song plays from its file, anything else is
+        downloaded and starts playing once the first audio is on disk. Returns False if neither is possible.
+        """
+        song = self.main_frame.get_song_by_id(track_data.get('id'))
+        if song is not None:
+            self.preview_player.setSource(QUrl.fromLocalFile(song['mp3_location']))
+            self.preview_player.play()
+            return True
+        if self.active_downloads.get(track_data.get('id')) == "downloading":
+            return False
+        return self.initiate_download(track_data, ui_index, stream=True)
+
+    def result_index(self, track_id):
+        """Index of the search result showing `track_id`, or None; downloads outlive the results they started from."""
+        for ui_index, track_data in enumerate(self.search_results):
+            if track_data.get('id') == track_id:
+                return ui_index
+        return None
+
+    def on_download_buffered(self, info, track_id):
+        if self.result_index(track_id) != self.currently_playing_preview_idx:
             return
-
+        song = self.main_frame.get_song_by_id(track_id)
+        if song is not None:
+            # The download finished before this notice arrived (they travel separately)
+            source = QUrl.fromLocalFile(song['mp3_location'])
+        else:
+            token, url = self.main_frame.stream_server.add(info['part_path'], info['final_path'],
+                                                           info['total_bytes'])
+            self.streams[track_id] = token
+            source = QUrl(url)
+        self.preview_player.setSource(source)
+        self.preview_player.play()
+
+    def fail_stream(self, track_id):
+        if track_id in self.streams:
+            self.main_frame.stream_server.fail(self.streams.pop(track_id))
+
+    def release_streams(self, source):
+        """Stops serving every download stream except the one the preview player now plays from `source`."""
+        for track_id, token in list(self.streams.items()):
+            if source.path().strip("/") != token:
+                self.main_frame.stream_server.remove(self.streams.pop(track_id))
+
+    def initiate_download(self, track_data, ui_index, stream=False):
         track_id = track_data.get('id')
-        if track_id and self.main_frame.get_song_index_by_id(track_id) is not None:
+        if self.active_downloads.get(track_id) in ["downloading", "completed"]:
+            return False
+
+        if track_id and self.main_frame.get_song_by_id(track_id) is not None:
             if ui_index in self.download_buttons:
                 self.download_buttons[ui_index].setIcon(QIcon("icons/complete.png"))
                 self.download_buttons[ui_index].setEnabled(False)
                 self.download_buttons[ui_index].setToolTip("Already in library")
-            return
+            return False
 
-        data_json_path = self.main_frame.get_data_file_path()
-        try:
-            with open(data_json_path, "r") as f:
-                data = json.load(f)
-            download_path = data.get("Settings", {}).get("download_path")
-            if not download_path or not os.path.isdir(download_path):
-                return
-        except:
-            return
+        download_path = self.main_frame.settings.get("download_path")
+        if not download_path or not os.path.isdir(download_path):
+            return False
 
         os.makedirs(download_path, exist_ok=True)
 
-        worker = SongDownloader(track_data, ui_index, download_path)
-        worker.signals.finished.connect(self.on_download_complete)
-        worker.signals.error.connect(self.on_download_error)
-        worker.signals.progress.connect(self.on_download_progress)
+        worker = SongDownloader(track_data, ui_index, download_path, stream=stream)
+        # Notices carry the index the track had when the download started; handlers look it up again by id
+        worker.signals.finished.connect(lambda info, idx, t=track_id: self.on_download_complete(info, t))
+        worker.signals.error.connect(lambda message, idx, t=track_id: self.on_download_error(message, t))
+        worker.signals.progress.connect(lambda message, idx, t=track_id: self.on_download_progress(message, t))
+        if stream:
+            worker.signals.buffered.connect(lambda info, idx, t=track_id: self.on_download_buffered(info, t))
+            worker.signals.error.connect(lambda message, idx, t=track_id: self.fail_stream(t))
 
-        self.threadpool.start(worker)
-        self.active_downloads[ui_index] = "downloading"
+        self.main_frame.download_engine.start(worker)
+        self.active_downloads[track_id] = "downloading"
 
         if ui_index in self.download_buttons:
             self.download_buttons[ui_index].setIcon(QIcon("icons/loading.png"))
             self.download_buttons[ui_index].setEnabled(False)
             self.download_buttons[ui_index].setToolTip("Downloading...")
+        return True
 
-    def on_download_progress(self, message, ui_index):
+    def on_download_progress(self, message, track_id):
+        ui_index = self.result_index(track_id)
         if ui_index in self.download_buttons:
             self.download_buttons[ui_index].setToolTip(message)
 
-    def on_download_complete(self, new_song_info, ui_index):
-        self.active_downloads[ui_index] = "completed"
+    def on_download_complete(self, new_song_info, track_id):
+        self.active_downloads[track_id] = "completed"
+        ui_index = self.result_index(track_id)
+        if new_song_info["id"] in self.streams:
+            # Kept until the player moves on (release_streams), so a seek can still read the finished file
+            self.main_frame.stream_server.finish(self.streams[new_song_info["id"]], new_song_info["mp3_location"])
 
         if ui_index in self.download_buttons:
             self.download_buttons[ui_index].setIcon(QIcon("icons/complete.png"))
             self.download_buttons[ui_index].setEnabled(False)
             self.download_buttons[ui_index].setToolTip("Download Complete")
 
-        data_json_path = self.main_frame.get_data_file_path()
-        try:
-            with open(data_json_path, "r+") as f:
-                data = json.load(f)
-
-                if any(s.get("id") == new_song_info["id"] for s in data["All Songs"]):
-                    return
-
-                data["All Songs"].append(new_song_info)
-                new_idx = len(data["All Songs"]) - 1
-                if "All songs" not in data["Playlists"]:
-                    data["Playlists"]["All songs"] = {"songs": [], "playlist_cover": "auto"}
-                data["Playlists"]["All songs"]["songs"].append(new_idx)
-
-                f.seek(0)
-                f.truncate()
-                json.dump(data, f, indent=4)
-        except Exception:
-            if ui_index in self.download_buttons:
-                self.download_buttons[ui_index].setIcon(QIcon("icons/download-error.png"))
-                self.download_buttons[ui_index].setEnabled(True)
-                self.download_buttons[ui_index].setToolTip("Error saving. Retry?")
+        if self.main_frame.get_song_by_id(new_song_info["id"]) is not None:
             return
 
-        self.main_frame.load_data()
-        self.main_frame.rebuild_song_info_lookup()
-        self.main_frame.home_screen_frame.display_playlists()
+        self.main_frame.add_song_to_library(new_song_info)
 
-    def on_download_error(self, error_message, ui_index):
-        self.active_downloads[ui_index] = "error"
+    def on_download_error(self, error_message, track_id):
+        self.active_downloads[track_id] = "error"
+        ui_index = self.result_index(track_id)
         if ui_index in self.download_buttons:
             self.download_buttons[ui_index].setIcon(QIcon("icons/download-error.png"))
             self.download_buttons[ui_index].setEnabled(True)
@@ -1,7 +1,9 @@
 from PySide6.QtCore import Qt
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-                               QPushButton, QFileDialog, QMessageBox)
+                               QPushButton, QFileDialog, QMessageBox, QSpinBox, QCheckBox)
 from .frame_functions.utils import create_button
+from .frame_functions.import_engine import DEFAULT_WORKERS, MAX_WORKERS
+from .frame_functions.transcoder import Transcoder
 
 
 class SettingsFrame(QWidget):
@@ -88,6 +90,24 @@ class SettingsFrame(QWidget):
         download_path_layout.addWidget(browse_button)
         main_layout.addLayout(download_path_layout)
 
+        import_workers_layout = QHBoxLayout()
+        self.import_workers_spin = QSpinBox()
+        self.import_workers_spin.setRange(1, MAX_WORKERS)
+        self.import_workers_spin.setToolTip("How many songs a playlist import downloads at the same time")
+        import_workers_layout.addWidget(QLabel("Parallel Downloads:"))
+        import_workers_layout.addWidget(self.import_workers_spin)
+        import_workers_layout.addStretch()
+        main_layout.addLayout(import_workers_layout)
+
+        self.convert_to_mp3_check = QCheckBox("Convert downloads to MP3 in the background")
+        if Transcoder.available():
+            self.convert_to_mp3_check.setToolTip("Songs are playable as soon as they download; "
+                                                 "they are converted to MP3 afterwards")
+        else:
+            self.convert_to_mp3_check.setEnabled(False)
+            self.convert_to_mp3_check.setToolTip("Install ffmpeg to enable MP3 conversion")
+        main_layout.addWidget(self.convert_to_mp3_check)
+
         main_layout.addStretch()
 
         save_button_layout = QHBoxLayout()
@@ -139,6 +159,8 @@ class SettingsFrame(QWidget):
         self.spotify_client_id_input['widget'].setText(settings.get('spotify_client_id', ''))
         self.spotify_client_secret_input['widget'].setText(settings.get('spotify_client_secret', ''))
         self.download_path_edit.setText(settings.get('download_path', ''))
+        self.import_workers_spin.setValue(settings.get('import_workers') or DEFAULT_WORKERS)
+        self.convert_to_mp3_check.setChecked(bool(settings.get('convert_to_mp3')))
 
     def save_settings(self):
         """Save settings and apply them."""
@@ -146,8 +168,13 @@ class SettingsFrame(QWidget):
         self.main_frame.settings['spotify_client_id'] = self.spotify_client_id_input['widget'].text().strip()
         self.main_frame.settings['spotify_client_secret'] = self.spotify_client_secret_input['widget'].text().strip()
         self.main_frame.settings['download_path'] = self.download_path_edit.text().strip()
+        self.main_frame.settings['import_workers'] = self.import_workers_spin.value()
+        self.main_frame.download_engine.set_processes(self.import_workers_spin.value())
+        self.main_frame.settings['convert_to_mp3'] = self.convert_to_mp3_check.isChecked()
+        if self.convert_to_mp3_check.isChecked():
+            self.main_frame.transcoder.queue_library()
 
-        self.main_frame.update_settings_in_json()
+        self.main_frame.save_settings()
 
         self.main_frame.init_api_clients()
 
@@ -1,29 +1,41 @@
-import json
+import multiprocessing
 import os
 import sys
+from itertools import islice
 from random import randint
-from frames.search_frame import SongDownloader
 if sys.platform == "win32":
     try:
         from frames.frame_functions.smtc_handler import SMTCHandler
     except ImportError:
         SMTCHandler = None
-from PySide6.QtGui import (QPainter, QPixmap, QFontDatabase, QImage, QPainterPath,
+from PySide6.QtGui import (QPainter, QPixmap, QFontDatabase,
                            QIcon, QColor, QLinearGradient, QBrush)
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout,
     QWidget, QDialog, QMessageBox, QFileDialog,
-    QStackedWidget, QGraphicsOpacityEffect, QGraphicsScene, QGraphicsPixmapItem, QGraphicsBlurEffect
+    QStackedWidget, QGraphicsOpacityEffect
 )
-from PySide6.QtCore import Qt, QUrl, QRectF, QTimer, QPropertyAnimation, QEasingCurve, QSize, QParallelAnimationGroup
+from PySide6.QtCore import Qt, QUrl, QTimer, QPropertyAnimation, QEasingCurve, QParallelAnimationGroup
 from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
 from frames.frame_functions.shortcuts import ShortcutHandler
 from frames.lyrics_view import LyricsView
 from frames.music_player_frame import NowPlayingView
 from frames.mini_player import MiniPlayer
 from frames.home_screen_frame import HomeScreenFrame
-from frames.frame_functions.playlist_functions import CreatePlaylistDialog, update_playlists_to_json, \
-    ImportPlaylistsDialog, DownloadProgressDialog
+from frames.frame_functions.playlist_functions import CreatePlaylistDialog, ImportPlaylistsDialog, \
+    DownloadProgressDialog
+from frames.frame_functions.library_model import LibraryModel
+from frames.frame_functions.library_store import path_key
+from frames.frame_functions.import_engine import ImportEngine, STATUS_COLORS, DEFAULT_WORKERS
+from frames.frame_functions.download_engine import DownloadEngine
+from frames.frame_functions.transcoder import Transcoder
+from frames.frame_functions.lyrics_backfill import LyricsBackfill
+from frames.frame_functions.stream_server import StreamServer
+from frames.frame_functions.background_renderer import BackgroundRenderer
+from frames.frame_functions.palette_service import PaletteService
+from frames.frame_functions.thumbnail_cache import ThumbnailCache
+from frames.frame_functions.image_pipeline import ImagePipeline
+from frames.frame_functions import http_client
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
 from groq import Groq
@@ -42,9 +54,10 @@ class BackgroundStackedWidget(QStackedWidget):
         if (hasattr(self.main_window, 'background_pixmap') and
                 not self.main_window.background_pixmap.isNull()):
 
-            blurred_bg = self.main_window.create_blurred_background(
-                self.main_window.background_pixmap, self.size())
-            painter.drawPixmap(0, 0, blurred_bg)
+            blurred_bg = self.main_window.background_renderer.pixmap(self.main_window.background_pixmap,
+                                                                     self.size())
+            if blurred_bg is not None:
+                painter.drawPixmap(self.rect(), blurred_bg)
 
             if (hasattr(self.main_window, 'dominant_colors') and
                     self.main_window.dominant_colors):
@@ -78,21 +91,35 @@ class VibeFlow(QMainWindow):
         self.sp = None
         self.groq_client = None
         self.shortcut_guide = None
-        self.playlist_cover_cache = {}
-        self.track_id_to_index_map = {}
+        self.playlist_cover_cache = {}  # (playlist name, size) -> QPixmap
+        self.pending_mosaics = {}  # (cover paths, size) -> names of playlists showing a stand-in
+        self.library = None
         self.load_data()
+        self.download_engine = DownloadEngine(self.settings.get('import_workers') or DEFAULT_WORKERS,
+                                              self.get_resolve_cache_path())
+        self.media_players = []  # see watch_player()
+        self.transcoder = Transcoder(self.library, self.is_file_open, self)
+        if self.settings.get('convert_to_mp3'):
+            self.transcoder.queue_library()
+        self.stream_server = StreamServer()
+        self.lyrics_backfill = LyricsBackfill(self.library, self.get_lyrics_cache_path(), parent=self)
+        self.lyrics_backfill.lyricsFound.connect(self.on_lyrics_found)
+        self.palette_service = PaletteService(self.library, self)
+        self.palette_service.paletteReady.connect(self.on_palette_ready)
+        self.thumbnails = ThumbnailCache(self.get_thumbnail_dir(), self)
+        self.thumbnails.mosaicReady.connect(self.on_mosaic_ready)
+        self.image_pipeline = ImagePipeline(parent=self)
+        self.library.signals.songAdded.connect(lambda song: self.thumbnails.prefetch([song['cover_location']]))
         self.init_api_clients()
         self.player = QMediaPlayer()
         self.audio_output = QAudioOutput()
         self.player.setAudioOutput(self.audio_output)
+        self.watch_player(self.player)
         self.smtc_handler = None
 
         self.current_playlist = []
         self.current_song_index = 0
 
-        self.url_to_song_info = {}
-        self.rebuild_song_info_lookup()
-
         self.is_home_screen_expanded = True
         if not self.settings.get('download_path'):
             self.ask_for_download_path()
@@ -108,6 +135,12 @@ class VibeFlow(QMainWindow):
         self.setWindowIcon(QIcon("icons/vibeflow.ico"))
         self.setup_connections()
         QFontDatabase.addApplicationFont("font.ttf")
+        QTimer.singleShot(0, self.resume_playlist_import)
+        # Give startup a head start before looking up missing lyrics
+        QTimer.singleShot(5000, self.lyrics_backfill.start)
+        # Newest songs first: prefetch stops once the cache is mostly full
+        QTimer.singleShot(5000, lambda: self.thumbnails.prefetch(
+            song.cover_location for song in reversed(self.all_songs)))
 
     def get_data_file_path(self):
         app_data_dir = os.path.join(os.getenv('APPDATA'), 'VibeFlow Music')
@@ -115,45 +148,35 @@ class VibeFlow(QMainWindow):
             os.makedirs(app_data_dir)
         return os.path.join(app_data_dir, 'data.json')
 
+    def get_library_db_path(self):
+        return os.path.join(os.path.dirname(self.get_data_file_path()), 'library.db')
+
+    def get_import_queue_path(self):
+        return os.path.join(os.path.dirname(self.get_data_file_path()), 'import_queue.json')
+
+    def get_resolve_cache_path(self):
+        return os.path.join(os.path.dirname(self.get_data_file_path()), 'resolve_cache.db')
+
+    def get_lyrics_cache_path(self):
+        return os.path.join(os.path.dirname(self.get_data_file_path()), 'lyrics_cache.json')
+
+    def get_thumbnail_dir(self):
+        return os.path.join(os.path.dirname(self.get_data_file_path()), 'thumbnails')
+
     def load_data(self):
-        data_json_path = self.get_data_file_path()
-        if not os.path.exists(data_json_path):
-            with open(data_json_path, 'w') as f:
-                default_data = {
-                    "All Songs": [],
-                    "Playlists": {"All songs": {"songs": [], "playlist_cover": "auto"}},
-                    "Settings": {
-                        "download_path": "",
-                        "recently_played": [],
-                        "groq_api_key": "",
-                        "spotify_client_id": "",
-                        "spotify_client_secret": ""
-                    }
-                }
-                json.dump(default_data, f, indent=4)
-            self.all_songs = default_data["All Songs"]
-            self.playlists = default_data["Playlists"]
-            self.settings = default_data["Settings"]
-        else:
-            with open(data_json_path) as f:
-                data = json.load(f)
-                self.all_songs = data.get("All Songs", [])
-                self.playlists = data.get("Playlists", {"All songs": {"songs": [], "playlist_cover": "auto"}})
-                if "All songs" not in self.playlists:
-                    self.playlists["All songs"] = {"songs": list(range(len(self.all_songs))), "playlist_cover": "auto"}
-                self.settings = data.get("Settings", {"download_path": "", "recently_played": []})
-                self.settings = data.get("Settings", {})
-                self.settings.setdefault("download_path", "")
-                self.settings.setdefault("recently_played", [])
-                self.settings.setdefault("groq_api_key", "")
-                self.settings.setdefault("spotify_client_id", "")
-                self.settings.setdefault("spotify_client_secret", "")
-
-        if self.all_songs and "All songs" in self.playlists:
-            valid_indices = list(range(len(self.all_songs)))
-            for p_name, p_data in self.playlists.items():
-                p_data['songs'] = [idx for idx in p_data.get('songs', []) if idx in valid_indices]
-        self.track_id_to_index_map = {song.get('id'): i for i, song in enumerate(self.all_songs) if song.get('id')}
+        if self.library is None:
+            self.library = LibraryModel(self.get_library_db_path(), self.get_data_file_path())
+            signals = self.library.signals
+            signals.playlistChanged.connect(self.invalidate_playlist_cache)
+            signals.playlistReordered.connect(lambda name, *_: self.invalidate_playlist_cache(name))
+            signals.playlistRemoved.connect(self.invalidate_playlist_cache)
+            signals.playlistRenamed.connect(lambda old_name, _: self.invalidate_playlist_cache(old_name))
+            signals.songChanged.connect(self.on_song_changed)
+
+        self.all_songs = self.library.all_songs
+        self.playlists = self.library.playlists
+        self.settings = self.library.settings
+        self.songs_by_id = self.library.songs_by_id
 
     def init_api_clients(self):
         """Initializes Spotify and Groq clients using keys from settings."""
@@ -177,7 +200,9 @@ class VibeFlow(QMainWindow):
                     auth_manager=SpotifyClientCredentials(
                         client_id=client_id,
                         client_secret=client_secret,
-                    )
+                        requests_session=http_client.session,
+                    ),
+                    requests_session=http_client.session,
                 )
                 self.sp.search('test', limit=1, type='track')
                 print("Spotify client initialized successfully.")
@@ -198,7 +223,9 @@ class VibeFlow(QMainWindow):
         main_layout.setContentsMargins(0, 0, 0, 0)
         main_layout.setSpacing(0)
 
+        self.background_renderer = BackgroundRenderer(self)
         self.main_stack = BackgroundStackedWidget(self)
+        self.background_renderer.ready.connect(self.main_stack.update)
 
         self.main_view_widget = QWidget()
         self.main_view_widget.setStyleSheet("background: transparent;")
@@ -231,10 +258,11 @@ class VibeFlow(QMainWindow):
                 print(f"Failed to initialize SMTCHandler: {e}")
         self.show_frame(self.main_view_widget, immediate=True)
         if self.all_songs:
-            self.current_playlist = self.playlists.get("All songs", {}).get('songs', list(range(len(self.all_songs))))
+            self.current_playlist = list(self.playlists.get("All songs", {}).get(
+                'songs', [song['id'] for song in self.all_songs]))
             self.current_song_index = 0
             if self.current_playlist:
-                song_info = self.all_songs[self.current_playlist[self.current_song_index]]
+                song_info = self.songs_by_id[self.current_playlist[self.current_song_index]]
                 self.now_playing_view.update_info(song_info)
                 self.lyrics_view.set_lyrics(song_info.get('lyrics_location', ''))
                 self.player.setSource(QUrl.fromLocalFile(song_info["mp3_location"]))
@@ -251,11 +279,32 @@ class VibeFlow(QMainWindow):
 
         self.home_screen_frame.display_playlists()
 
-    def rebuild_song_info_lookup(self):
-        """Rebuilds the URL-to-song-info dictionary consistently using the full URL string as the key."""
-        self.url_to_song_info = {
-            QUrl.fromLocalFile(song["mp3_location"]).toString().lower(): song for song in self.all_songs
-        }
+    def watch_player(self, player):
+        """Registers a QMediaPlayer, so a song's file is never swapped out or deleted while it has it open."""
+        self.media_players.append(player)
+        player.sourceChanged.connect(self.transcoder.release)
+
+    def is_file_open(self, path):
+        """True if a watched player is playing `path`, from disk or streamed while it downloads."""
+        key = path_key(path)
+        for player in self.media_players:
+            open_path = self.source_path(player.source())
+            if open_path and path_key(open_path) == key:
+                return True
+        return False
+
+    def source_path(self, source):
+        """The file a player source plays, looking through stream server URLs; None for anything else."""
+        if source.isLocalFile():
+            return source.toLocalFile()
+        return self.stream_server.local_path(source.toString())
+
+    def song_for_source(self, source=None):
+        """Returns the library song playing from `source` (default: the player's current source), or None."""
+        if source is None:
+            source = self.player.source()
+        path = self.source_path(source)
+        return self.library.find_song_by_path(path) if path else None
 
     def toggle_home_screen(self):
         animation_duration = 350
@@ -303,75 +352,32 @@ class VibeFlow(QMainWindow):
         self.is_home_screen_expanded = not self.is_home_screen_expanded
         self.now_playing_view.update_menu_button_icon(self.is_home_screen_expanded)
 
-    def create_blurred_background(self, pixmap, size):
-        scaled_pixmap = pixmap.scaled(size, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
-
-        centered_pixmap = QPixmap(size)
-        centered_pixmap.fill(Qt.transparent)
-
-        painter = QPainter(centered_pixmap)
-        painter.setRenderHint(QPainter.Antialiasing)
-
-        x_offset = (size.width() - scaled_pixmap.width()) // 2
-        y_offset = (size.height() - scaled_pixmap.height()) // 2
-
-        painter.drawPixmap(x_offset, y_offset, scaled_pixmap)
-        painter.end()
-
-        scene = QGraphicsScene()
-        pixmap_item = QGraphicsPixmapItem()
-        pixmap_item.setPixmap(centered_pixmap)
-
-        blur_effect = QGraphicsBlurEffect()
-        blur_effect.setBlurRadius(20)
-        pixmap_item.setGraphicsEffect(blur_effect)
-        scene.addItem(pixmap_item)
-
-        blurred_image = QImage(size, QImage.Format_ARGB32_Premultiplied)
-        blurred_image.fill(Qt.transparent)
-
-        painter = QPainter(blurred_image)
-        painter.setRenderHint(QPainter.Antialiasing)
-        scene.render(painter, QRectF(blurred_image.rect()), QRectF(centered_pixmap.rect()))
-        painter.end()
-
-        return QPixmap.fromImage(blurred_image)
-
     def update_main_stack_background(self, pixmap):
         """Update the main_stack's background with the provided pixmap"""
         self.background_pixmap = pixmap
         self.main_stack.update()
 
-    def play_song_from_sidebar(self, song_index_in_all_songs, playlist_name_context):
-        self.current_playlist = self.playlists[playlist_name_context]['songs']
+    def play_song_from_sidebar(self, song_id, playlist_name_context):
+        self.current_playlist = list(self.playlists[playlist_name_context]['songs'])
         try:
-            self.current_song_index = self.current_playlist.index(song_index_in_all_songs)
+            self.current_song_index = self.current_playlist.index(song_id)
         except ValueError:
-            self.current_playlist = [song_index_in_all_songs]
+            self.current_playlist = [song_id]
             self.current_song_index = 0
-        self.set_media(self.all_songs[song_index_in_all_songs]["mp3_location"])
+        self.set_media(self.songs_by_id[song_id]["mp3_location"])
 
     def ask_for_download_path(self):
         options = QFileDialog.Options() | QFileDialog.ShowDirsOnly
         path = QFileDialog.getExistingDirectory(self, "Select Music Download Directory", options=options)
         if path:
             self.settings['download_path'] = path
-            self.update_settings_in_json()
+            self.save_settings()
         else:
             QMessageBox.warning(self, "Download Path Required", "Please select a directory to save your music.")
             self.ask_for_download_path()
 
-    def update_settings_in_json(self):
-        path = self.get_data_file_path()
-        try:
-            with open(path) as f:
-                data = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            data = {}
-        data['Settings'] = self.settings
-
-        with open(path, 'w') as f:
-            json.dump(data, f, indent=4)
+    def save_settings(self):
+        self.library.save_settings()
 
     def setup_connections(self):
         self.player.playbackStateChanged.connect(self.play_back_state)
@@ -426,86 +432,73 @@ class VibeFlow(QMainWindow):
                 self.player.play()
                 return
 
-            actual_idx = self.current_playlist[self.current_song_index]
-            self.set_media(self.all_songs[actual_idx]["mp3_location"])
+            song_id = self.current_playlist[self.current_song_index]
+            self.set_media(self.songs_by_id[song_id]["mp3_location"])
 
     def source_change_trigger(self):
         if self.player.source().isEmpty():
             return
 
-        path = self.player.source().toString().lower()
-
-        if path not in self.url_to_song_info:
-            print(f"Path '{path}' not in song info lookup. Rebuilding.")
-            self.rebuild_song_info_lookup()
-
-        if path in self.url_to_song_info:
-            song_info = self.url_to_song_info[path]
+        song_info = self.song_for_source()
+        if song_info is not None:
             self.now_playing_view.update_info(song_info)
             cover_pixmap = QPixmap(song_info.get('cover_location', 'icons/default-image.png'))
             if cover_pixmap.isNull():
                 cover_pixmap = QPixmap("icons/default-image.png")
             self.background_pixmap = cover_pixmap
-            self.dominant_colors = self.now_playing_view.get_dominant_colors(
-                song_info.get('cover_location', 'icons/default-image.png'))
+            # Until a song's palette is ready the previous colours stay, rather than blocking the switch
+            palette = self.palette_service.palette(song_info)
+            if palette is not None:
+                self.dominant_colors = palette
             self.mini_player.set_background_image(song_info['cover_location'])
             self.lyrics_view.set_lyrics(song_info.get('lyrics_location', ''))
             if self.smtc_handler:
                 self.smtc_handler.update_metadata(song_info)
-        else:
-            print(f"Error: Song with path '{path}' still not found after rebuilding lookup table.")
+        elif self.player.source().isLocalFile():
+            # A stream of a download that hasn't reached the library yet is expected to miss
+            print(f"Error: Song with path '{self.player.source().toString()}' not found in the library.")
 
-    def get_song_index_by_id(self, track_id):
-        """Returns the index of a song in all_songs if it exists, otherwise None."""
-        return self.track_id_to_index_map.get(track_id)
+    def get_song_by_id(self, track_id):
+        """Returns the library song with this id, or None if it is not in the library."""
+        return self.songs_by_id.get(track_id)
 
     def open_import_playlist_dialog(self):
         dialog = ImportPlaylistsDialog(self)
         dialog.exec()
-        self.home_screen_frame.display_playlists()
 
     def open_mini_player(self):
         if not self.all_songs:
             return
-        source = self.player.source().toLocalFile().lower() if self.player.source().isLocalFile() else self.player.source().toString().lower()
-        cover = self.url_to_song_info[source]['cover_location'] if source in self.url_to_song_info else \
-            self.all_songs[0]['cover_location']
+        song = self.song_for_source()
+        cover = song['cover_location'] if song is not None else self.all_songs[0]['cover_location']
         self.mini_player.show_mini(cover)
 
     def open_create_playlist_dialog(self):
         dialog = CreatePlaylistDialog(self)
         if dialog.exec() == QDialog.Accepted:
-            name, indices, cover = dialog.get_playlist_info()
+            name, song_ids, cover = dialog.get_playlist_info()
             if not name:
                 QMessageBox.warning(self, "Invalid Name", "Playlist name cannot be empty.")
                 return
             if name in self.playlists:
                 QMessageBox.warning(self, "Playlist Exists", f"A playlist named '{name}' already exists.")
                 return
-            self.playlists[name] = {'songs': indices, 'playlist_cover': cover}
-            update_playlists_to_json(self.get_data_file_path(), self.playlists)
-            self.home_screen_frame.display_playlists()
+            self.library.create_playlist(name, song_ids, cover)
 
-    def find_existing_song_index(self, song_data):
+    def find_existing_song_id(self, song_data):
         """
-        Finds the index of an existing song.
+        Finds the id of an existing song.
         First checks by track ID, then falls back to checking by name and artist.
         """
         track_id = song_data.get('id')
         if track_id and not track_id.startswith('fallback_'):
-            existing_index = self.get_song_index_by_id(track_id)
-            if existing_index is not None:
-                return existing_index
+            if track_id in self.songs_by_id:
+                return track_id
 
         try:
-            song_name_to_check = song_data['name'].lower().strip()
-            artist_name_to_check = song_data['artists'][0]['name'].lower().strip()
-
-            for i, existing_song in enumerate(self.all_songs):
-                existing_name = existing_song.get('song_name', '').lower().strip()
-                existing_artist = existing_song.get('artist', '').lower().strip()
-                if song_name_to_check == existing_name and artist_name_to_check == existing_artist:
-                    return i
+            existing_song = self.library.find_song(song_data['name'], song_data['artists'][0]['name'])
+            if existing_song is not None:
+                return existing_song['id']
         except (KeyError, IndexError):
             pass
 
@@ -516,77 +509,54 @@ class VibeFlow(QMainWindow):
             QMessageBox.information(self, "Import in Progress", "Another playlist import is already in progress.")
             return
 
+        self.run_playlist_import(songs_to_download, playlist_name, self.settings['download_path'])
+
+    def resume_playlist_import(self):
+        """Picks up an import that was still running when the app last closed."""
+        saved = ImportEngine.load_queue(self.get_import_queue_path())
+        if saved is None or self.is_downloading_playlist:
+            return
+        print(f"Resuming import of '{saved['playlist_name']}'")
+        self.run_playlist_import(saved["tracks"], saved["playlist_name"], saved["download_path"], saved)
+
+    def run_playlist_import(self, songs_to_download, playlist_name, download_path, saved=None):
         self.is_downloading_playlist = True
         progress_dialog = DownloadProgressDialog(playlist_name, len(songs_to_download), self)
         progress_dialog.populate_song_list(songs_to_download)
 
+        engine = ImportEngine(songs_to_download, download_path, self.download_engine,
+                              self.find_existing_song_id, self.add_song_to_library,
+                              self.settings.get('import_workers'), self,
+                              playlist_name=playlist_name, queue_path=self.get_import_queue_path())
+        if saved is not None:
+            engine.resume(saved, lambda song_id: song_id in self.songs_by_id)
+        engine.trackStatus.connect(
+            lambda track_id, status: progress_dialog.update_song_status(track_id, status, STATUS_COLORS[status]))
+        engine.finished.connect(self.finalize_playlist_import)
         self.playlist_import_progress = {
             "dialog": progress_dialog,
             "playlist_name": playlist_name,
-            "songs_to_process": list(songs_to_download),
-            "newly_added_indices": [],
-            "failed_songs": []
+            "engine": engine
         }
 
         progress_dialog.show()
-        self.process_next_in_queue()
+        engine.start()
 
-    def process_next_in_queue(self):
-        if not self.playlist_import_progress["songs_to_process"]:
-            self.finalize_playlist_import()
-            return
+    def add_song_to_library(self, new_song_info):
+        """Appends a downloaded song to the library and the 'All songs' playlist."""
+        song = self.library.add_song(new_song_info, add_to_all_songs="All songs" in self.playlists)
+        if self.settings.get('convert_to_mp3'):
+            self.transcoder.queue(song)
+        return song
 
-        song_data = self.playlist_import_progress["songs_to_process"].pop(0)
-        dialog = self.playlist_import_progress["dialog"]
-
-        existing_index = self.find_existing_song_index(song_data)
-        if existing_index is not None:
-            self.playlist_import_progress["newly_added_indices"].append(existing_index)
-            dialog.update_song_status(song_data['id'], "In Library", "#a9b1d6")
-            QTimer.singleShot(50, self.process_next_in_queue)
-            return
-
-        dialog.update_song_status(song_data['id'], "Downloading...", "#e0e0e0")
-
-        downloader = SongDownloader(song_data, -1, self.settings['download_path'])
-        downloader.signals.finished.connect(
-            lambda new_song, ui_idx, s=song_data: self.on_playlist_song_downloaded(s, new_song)
-        )
-        downloader.signals.error.connect(
-            lambda error_msg, s=song_data: self.on_playlist_song_download_error(s, error_msg)
-        )
-        self.home_screen_frame.search_view_widget.threadpool.start(downloader)
-
-    def on_playlist_song_downloaded(self, original_song_data, new_song_info):
-        self.all_songs.append(new_song_info)
-        new_song_index = len(self.all_songs) - 1
-
-        self.track_id_to_index_map[new_song_info['id']] = new_song_index
-
-        self.playlist_import_progress["newly_added_indices"].append(new_song_index)
-
-        dialog = self.playlist_import_progress["dialog"]
-        dialog.update_song_status(original_song_data['id'], "Downloaded", "#4ecdc4")
-
-        self.process_next_in_queue()
-
-    def on_playlist_song_download_error(self, original_song_data, error_msg):
-        print(f"Failed to download {original_song_data['name']}: {error_msg}")
-        self.playlist_import_progress["failed_songs"].append(original_song_data)
-
-        dialog = self.playlist_import_progress["dialog"]
-        dialog.update_song_status(original_song_data['id'], "Failed", "#ff6b6b")
-
-        self.process_next_in_queue()
-
-    def finalize_playlist_import(self):
+    def finalize_playlist_import(self, song_ids_for_new_playlist, failed_songs):
         dialog = self.playlist_import_progress["dialog"]
         original_playlist_name = self.playlist_import_progress["playlist_name"]
-        all_indices_for_new_playlist = self.playlist_import_progress["newly_added_indices"]
 
-        if not all_indices_for_new_playlist:
+        if not song_ids_for_new_playlist:
             dialog.import_complete(original_playlist_name + " (Failed - No songs added)")
             self.is_downloading_playlist = False
+            self.playlist_import_progress = {}
             return
 
         unique_playlist_name = original_playlist_name
@@ -595,103 +565,58 @@ class VibeFlow(QMainWindow):
             unique_playlist_name = f"{original_playlist_name} ({counter})"
             counter += 1
 
-        self.playlists[unique_playlist_name] = {
-            'songs': all_indices_for_new_playlist,
-            'playlist_cover': 'auto'
-        }
+        self.library.create_playlist(unique_playlist_name, song_ids_for_new_playlist)
 
         if "All songs" in self.playlists:
-            all_songs_playlist = self.playlists["All songs"]["songs"]
-            genuinely_new_song_indices = [
-                idx for idx in all_indices_for_new_playlist if idx not in all_songs_playlist
-            ]
-            all_songs_playlist.extend(genuinely_new_song_indices)
-
-        self.save_all_data()
-        self.rebuild_song_info_lookup()
-        self.load_data()
-        self.home_screen_frame.display_playlists()
-        self.invalidate_playlist_cache(unique_playlist_name)
+            genuinely_new_song_ids = []
+            for song_id in dict.fromkeys(song_ids_for_new_playlist):
+                if not self.library.playlist_contains("All songs", song_id):
+                    genuinely_new_song_ids.append(song_id)
+            if genuinely_new_song_ids:
+                self.library.add_to_playlist("All songs", genuinely_new_song_ids)
 
         dialog.import_complete(unique_playlist_name)
         self.is_downloading_playlist = False
         self.playlist_import_progress = {}
 
-    def save_all_data(self):
-        """Saves both 'All Songs' and 'Playlists' to the JSON file."""
-        data_path = self.get_data_file_path()
-        try:
-            with open(data_path, 'r') as f:
-                data = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            data = {"Settings": self.settings}
-
-        data['All Songs'] = self.all_songs
-        data['Playlists'] = self.playlists
-
-        with open(data_path, 'w') as f:
-            json.dump(data, f, indent=4)
-
     def generate_playlist_cover(self, playlist_name, size):
-        if playlist_name in self.playlist_cover_cache and self.playlist_cover_cache[playlist_name].size() == QSize(size,
-                                                                                                                   size):
-            return self.playlist_cover_cache[playlist_name]
+        if (playlist_name, size) in self.playlist_cover_cache:
+            return self.playlist_cover_cache[(playlist_name, size)]
 
         info = self.playlists.get(playlist_name, {})
-        indices = info.get("songs", [])
+        song_ids = info.get("songs", [])
         cover_type = info.get("playlist_cover", "auto")
         radius = 8
 
-        def round_corners(pix):
-            if pix.isNull():
-                return QPixmap(size, size)
-            scaled = pix.scaled(size, size, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
-            rounded = QPixmap(size, size)
-            rounded.fill(Qt.transparent)
-            painter = QPainter(rounded)
-            painter.setRenderHint(QPainter.Antialiasing)
-            path = QPainterPath()
-            path.addRoundedRect(QRectF(0, 0, size, size), radius, radius)
-            painter.setClipPath(path)
-            painter.drawPixmap((size - scaled.width()) / 2, (size - scaled.height()) / 2, scaled)
-            painter.end()
-            return rounded
-
-        if not indices:
-            final = round_corners(QPixmap("icons/music.png"))
-            self.playlist_cover_cache[playlist_name] = final
-            return final
-
-        if cover_type != "auto" and os.path.exists(cover_type):
-            final = round_corners(QPixmap(cover_type))
-            self.playlist_cover_cache[playlist_name] = final
-            return final
-
-        covers = [self.all_songs[i]["cover_location"] for i in indices if
-                  0 <= i < len(self.all_songs) and os.path.exists(self.all_songs[i]["cover_location"])]
-
-        if not covers:
-            final = round_corners(QPixmap("icons/music.png"))
-            self.playlist_cover_cache[playlist_name] = final
-            return final
-
-        cover_pixmap = QPixmap(covers[0]) if len(covers) < 4 else self.create_mosaic_cover(covers, size)
-        final = round_corners(cover_pixmap)
-        self.playlist_cover_cache[playlist_name] = final
+        def cover_thumbnail(path):
+            pix = self.thumbnails.pixmap(path, (size, radius))
+            return pix if not pix.isNull() else QPixmap(size, size)
+
+        if not song_ids:
+            final = cover_thumbnail("icons/music.png")
+        elif cover_type != "auto" and os.path.exists(cover_type):
+            final = cover_thumbnail(cover_type)
+        else:
+            # Only the first four covers that exist are needed, so the rest of the playlist isn't checked
+            covers = list(islice((cover for cover in (self.songs_by_id[i].cover_location for i in song_ids)
+                                  if os.path.exists(cover)), 4))
+            if not covers:
+                final = cover_thumbnail("icons/music.png")
+            elif len(covers) < 4:
+                final = cover_thumbnail(covers[0])
+            else:
+                final = self.thumbnails.mosaic(covers, (size, radius))
+                if final is None:
+                    # Shown until the mosaic is rendered; on_mosaic_ready then refreshes the card
+                    self.pending_mosaics.setdefault((tuple(covers), size), set()).add(playlist_name)
+                    return cover_thumbnail(covers[0])
+        self.playlist_cover_cache[(playlist_name, size)] = final
         return final
 
-    def create_mosaic_cover(self, cover_paths, size):
-        mosaic = QImage(size, size, QImage.Format_ARGB32_Premultiplied)
-        mosaic.fill(Qt.transparent)
-        painter = QPainter(mosaic)
-        painter.setRenderHint(QPainter.Antialiasing)
-        half = size // 2
-        for i, path in enumerate(cover_paths[:4]):
-            pix = QPixmap(path).scaled(half, half, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
-            x, y = (i % 2) * half, (i // 2) * half
-            painter.drawPixmap(x + (half - pix.width()) / 2, y + (half - pix.height()) / 2, pix)
-        painter.end()
-        return QPixmap.fromImage(mosaic)
+    def on_mosaic_ready(self, covers, size_and_radius):
+        for playlist_name in self.pending_mosaics.pop((covers, size_and_radius[0]), ()):
+            self.invalidate_playlist_cache(playlist_name)
+            self.home_screen_frame.refresh_playlist_cover(playlist_name)
 
     def play_playlist(self, playlist_name):
         """Play all songs from the specified playlist"""
@@ -705,9 +630,7 @@ class VibeFlow(QMainWindow):
         self.current_playlist = playlist_songs.copy()
         self.current_song_index = 0
 
-        first_song_idx = self.current_playlist[0]
-        if 0 <= first_song_idx < len(self.all_songs):
-            self.set_media(self.all_songs[first_song_idx]["mp3_location"])
+        self.set_media(self.songs_by_id[self.current_playlist[0]]["mp3_location"])
 
     def add_playlist_to_queue(self, playlist_name):
         """Add all songs from playlist to the end of current queue"""
@@ -723,9 +646,11 @@ class VibeFlow(QMainWindow):
             self.current_song_index = 0
             return
 
-        for song_idx in playlist_songs:
-            if song_idx not in self.current_playlist:
-                self.current_playlist.append(song_idx)
+        queued = set(self.current_playlist)
+        for song_id in playlist_songs:
+            if song_id not in queued:
+                queued.add(song_id)
+                self.current_playlist.append(song_id)
 
     def open_delete_playlist_dialog(self, playlist_name):
         """Show confirmation dialog for deleting a playlist"""
@@ -745,70 +670,54 @@ class VibeFlow(QMainWindow):
 
         if reply == QMessageBox.Yes:
             if playlist_name in self.playlists:
-                del self.playlists[playlist_name]
-
-                self.save_playlists_to_json()
+                self.library.delete_playlist(playlist_name)
 
-                self.home_screen_frame.display_playlists()
-
-                self.invalidate_playlist_cache(playlist_name)
-
-    def play_song_next(self, song_index):
+    def play_song_next(self, song_id):
         """Add song to play next in queue (after current song)"""
         if not self.current_playlist or self.current_song_index < 0:
-            self.current_playlist = [song_index]
+            self.current_playlist = [song_id]
             self.current_song_index = 0
-            self.set_media(self.all_songs[song_index]["mp3_location"])
+            self.set_media(self.songs_by_id[song_id]["mp3_location"])
             return
 
-        insert_position = self.current_song_index + 1
-        if song_index not in self.current_playlist:
-            self.current_playlist.insert(insert_position, song_index)
-        else:
-            self.current_playlist.remove(song_index)
-            if self.current_playlist.index(song_index) < self.current_song_index:
+        if song_id in self.current_playlist:
+            position = self.current_playlist.index(song_id)
+            if position == self.current_song_index:
+                return
+            del self.current_playlist[position]
+            if position < self.current_song_index:
                 self.current_song_index -= 1
-            self.current_playlist.insert(insert_position, song_index)
+        self.current_playlist.insert(self.current_song_index + 1, song_id)
+
+    def remove_songs_from_queue(self, song_ids):
+        """Drops deleted songs from the queue, keeping the current song selected if it is still there"""
+        doomed = set(song_ids)
+        current = self.current_playlist[self.current_song_index] \
+            if 0 <= self.current_song_index < len(self.current_playlist) else None
+        self.current_playlist = [song_id for song_id in self.current_playlist if song_id not in doomed]
+        if current in doomed or current is None:
+            self.current_song_index = 0 if self.current_playlist else -1
+        else:
+            self.current_song_index = self.current_playlist.index(current)
 
-    def add_song_to_queue(self, song_index):
+    def add_song_to_queue(self, song_id):
         """Add song to the end of current queue"""
         if not self.current_playlist:
-            self.current_playlist = [song_index]
+            self.current_playlist = [song_id]
             self.current_song_index = 0
-            self.set_media(self.all_songs[song_index]["mp3_location"])
+            self.set_media(self.songs_by_id[song_id]["mp3_location"])
             return
 
-        if song_index not in self.current_playlist:
-            self.current_playlist.append(song_index)
+        if song_id not in self.current_playlist:
+            self.current_playlist.append(song_id)
 
-    def add_song_to_playlist(self, song_index, target_playlist_name):
+    def add_song_to_playlist(self, song_id, target_playlist_name):
         """Add a song to the specified playlist"""
         if target_playlist_name not in self.playlists:
             return
 
-        playlist_songs = self.playlists[target_playlist_name]['songs']
-
-        if song_index not in playlist_songs:
-            playlist_songs.append(song_index)
-
-            self.save_playlists_to_json()
-
-            self.invalidate_playlist_cache(target_playlist_name)
-
-    def save_playlists_to_json(self):
-        """Save the current playlists to JSON file"""
-        data_path = self.get_data_file_path()
-        try:
-            with open(data_path) as f:
-                data = json.load(f)
-
-            data['Playlists'] = self.playlists
-
-            with open(data_path, 'w') as f:
-                json.dump(data, f, indent=4)
-
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Error saving playlists: {e}")
+        if not self.library.playlist_contains(target_playlist_name, song_id):
+            self.library.add_to_playlist(target_playlist_name, [song_id])
 
     def show_shortcut_guide(self):
         """
@@ -847,8 +756,26 @@ class VibeFlow(QMainWindow):
         self.fade_animation.start(QPropertyAnimation.DeleteWhenStopped)
 
     def invalidate_playlist_cache(self, playlist_name):
-        if playlist_name in self.playlist_cover_cache:
-            del self.playlist_cover_cache[playlist_name]
+        for key in [key for key in self.playlist_cover_cache if key[0] == playlist_name]:
+            del self.playlist_cover_cache[key]
+
+    def on_song_changed(self, song_id, fields):
+        if 'cover_location' not in fields:
+            return
+        for playlist_name in self.playlists:
+            if self.library.playlist_contains(playlist_name, song_id):
+                self.invalidate_playlist_cache(playlist_name)
+
+    def on_lyrics_found(self, song_id):
+        if 0 <= self.current_song_index < len(self.current_playlist) \
+                and self.current_playlist[self.current_song_index] == song_id:
+            self.lyrics_view.set_lyrics(self.songs_by_id[song_id]['lyrics_location'])
+
+    def on_palette_ready(self, cover_path, palette):
+        song = self.song_for_source()
+        if song is not None and (song.get('cover_location') or 'icons/default-image.png') == cover_path:
+            self.dominant_colors = palette
+            self.main_stack.update()
 
     def keyPressEvent(self, event):
         """
@@ -870,9 +797,16 @@ class VibeFlow(QMainWindow):
         super().keyPressEvent(event)
 
     def closeEvent(self, event):
-        """Ensure the SMTC is cleaned up when the window closes."""
+        """Ensure the SMTC is cleaned up, downloads are stopped and pending library changes are saved on close."""
         if self.smtc_handler:
             self.smtc_handler.shutdown()
+        if self.playlist_import_progress.get("engine"):
+            self.playlist_import_progress["engine"].flush()
+        self.download_engine.shutdown()
+        self.transcoder.shutdown()
+        self.lyrics_backfill.shutdown()
+        self.stream_server.close()
+        self.library.close()
         super().closeEvent(event)
 
 
@@ -914,4 +848,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Download workers are separate processes; frozen Windows builds need this to start them
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,99 @@
+import json
+import os
+
+import pytest
+from PySide6.QtCore import QCoreApplication
+
+from frames.frame_functions.import_engine import DONE, FAILED, FETCHING, PENDING, ImportEngine
+
+
+@pytest.fixture(scope="module", autouse=True)
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def track(n):
+    return {"id": f"t{n}", "name": f"Track {n}", "artists": [{"name": "Artist", "id": "a1", "href": "x"}],
+            "album": {"images": [{"url": f"https://i.scdn.co/{n}"}, {"url": "small"}]}, "duration_ms": 1000 + n,
+            "popularity": 50}
+
+
+def make_engine(queue_path, count=4):
+    return ImportEngine([track(n) for n in range(count)], "/music", download_engine=None,
+                        find_existing_song_id=lambda track: None, add_song=lambda info: info,
+                        playlist_name="Mix", queue_path=queue_path)
+
+
+def test_load_queue_missing_file(tmp_path):
+    assert ImportEngine.load_queue(str(tmp_path / "import_queue.json")) is None
+
+
+def test_load_queue_discards_corrupt_file(tmp_path):
+    queue_path = tmp_path / "import_queue.json"
+    queue_path.write_text('{"tracks": [', encoding="utf-8")
+    assert ImportEngine.load_queue(str(queue_path)) is None
+    assert not queue_path.exists()
+
+
+def test_load_queue_survives_failed_cleanup(tmp_path, monkeypatch):
+    queue_path = tmp_path / "import_queue.json"
+    queue_path.write_text("not json", encoding="utf-8")
+
+    def locked(path):
+        raise PermissionError(13, "locked", path)
+
+    monkeypatch.setattr(os, "remove", locked)
+    assert ImportEngine.load_queue(str(queue_path)) is None
+
+
+def test_save_round_trips_compact_tracks(tmp_path):
+    queue_path = str(tmp_path / "import_queue.json")
+    engine = make_engine(queue_path)
+    engine.save()
+
+    saved = ImportEngine.load_queue(queue_path)
+    assert saved["playlist_name"] == "Mix"
+    assert saved["download_path"] == "/music"
+    assert saved["states"] == [PENDING] * 4
+    first = saved["tracks"][0]
+    assert "popularity" not in first
+    assert first["album"]["images"] == [{"url": "https://i.scdn.co/0"}]
+    assert first["artists"] == [{"name": "Artist", "id": "a1"}]
+
+
+def test_resume_restores_finished_and_failed_tracks(tmp_path):
+    queue_path = str(tmp_path / "import_queue.json")
+    engine = make_engine(queue_path)
+    engine.states = [DONE, DONE, FAILED, FETCHING]
+    engine.results = ["song0", "song1", None, None]
+    engine.save()
+
+    saved = ImportEngine.load_queue(queue_path)
+    resumed = ImportEngine(saved["tracks"], saved["download_path"], download_engine=None,
+                           find_existing_song_id=lambda track: None, add_song=lambda info: info,
+                           playlist_name=saved["playlist_name"], queue_path=queue_path)
+    # song1 never reached the library, so it is downloaded again
+    resumed.resume(saved, lambda song_id: song_id == "song0")
+
+    assert resumed.states == [DONE, PENDING, FAILED, PENDING]
+    assert resumed.results == ["song0", None, None, None]
+    assert [failed["id"] for failed in resumed.failed] == ["t2"]
+
+
+def test_discard_removes_queue_file(tmp_path):
+    queue_path = tmp_path / "import_queue.json"
+    engine = make_engine(str(queue_path))
+    engine.save()
+    engine.discard()
+    assert not queue_path.exists()
+    engine.discard()
+
+
+def test_schedule_save_coalesces_until_flush(tmp_path):
+    queue_path = tmp_path / "import_queue.json"
+    engine = make_engine(str(queue_path))
+    engine.schedule_save()
+    engine.schedule_save()
+    assert not queue_path.exists()
+    engine.flush()
+    assert json.loads(queue_path.read_text(encoding="utf-8"))["states"] == [PENDING] * 4
@@ -0,0 +1,147 @@
+import os
+import time
+
+import pytest
+
+from frames.frame_functions.library_store import LibraryStore
+
+
+class FastStore(LibraryStore):
+    FLUSH_DELAY = 0.01
+    MAX_FLUSH_DELAY = 0.05
+    RETRY_DELAY = 0.05
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def song(song_id, root):
+    return {"id": song_id, "song_name": f"Song {song_id}", "artist": "Artist",
+            "mp3_location": os.path.join(root, f"{song_id}.mp3"), "cover_location": "", "lyrics_location": ""}
+
+
+def crash(store, entries):
+    """Waits until `entries` journal lines are on disk, then abandons the store without closing it."""
+    wait_for(lambda: not store._pending and store.journal.count >= entries)
+
+
+def state(store):
+    return ([s.to_dict() for s in store.all_songs], store.playlists, store.settings)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "library.db")
+
+
+def test_journal_replays_after_crash(db_path, tmp_path):
+    store = FastStore(db_path)
+    for song_id in ("a", "b", "c"):
+        store.add_song(song(song_id, str(tmp_path)))
+    store.create_playlist("Mix", ["c", "a"])
+    store.update_song("a", {"song_name": "Renamed", "duration": 180})
+    store.move_in_playlist("Mix", 0, 1)
+    store.delete_songs(["b"])
+    store.settings["volume"] = 40
+    store.save_settings()
+    expected = state(store)
+    crash(store, 8)
+
+    assert not os.path.exists(store.snapshot_path)
+    reopened = FastStore(db_path)
+    assert state(reopened) == expected
+    assert reopened.playlists["Mix"]["songs"] == ["a", "c"]
+    assert reopened.find_song("renamed", "ARTIST").id == "a"
+    assert reopened.find_song_by_path(os.path.join(str(tmp_path), "b.mp3")) is None
+    reopened.close()
+
+
+def test_close_compacts_journal_into_database(db_path, tmp_path):
+    store = FastStore(db_path)
+    store.add_song(song("a", str(tmp_path)))
+    store.create_playlist("Mix", ["a"])
+    expected = state(store)
+    store.close()
+
+    assert store.journal.count == 0
+    assert os.path.getsize(store.journal.path) == 0
+    os.remove(store.snapshot_path)
+    cold = FastStore(db_path)
+    assert state(cold) == expected
+    cold.close()
+
+
+def test_compacts_once_journal_passes_threshold(db_path, tmp_path):
+    class SmallJournalStore(FastStore):
+        COMPACT_THRESHOLD = 5
+
+    store = SmallJournalStore(db_path)
+    for n in range(4):
+        store.add_song(song(f"s{n}", str(tmp_path)))
+    crash(store, 4)
+    with open(store.journal.path, encoding="utf-8") as f:
+        compacted_lines = f.read()
+    for n in range(4, 6):
+        store.add_song(song(f"s{n}", str(tmp_path)))
+    wait_for(lambda: store._compacted_seq >= 6)
+    assert store.journal.count == 0
+    assert store.db.get_meta("journal_seq") == "6"
+    expected = state(store)
+    crash(store, 0)
+
+    # As if the crash came after the database commit but before the journal was emptied:
+    # entries at or below journal_seq are in the database already and must not be applied twice
+    with open(store.journal.path, "w", encoding="utf-8") as f:
+        f.write(compacted_lines)
+    reopened = FastStore(db_path)
+    assert state(reopened) == expected
+    assert len(reopened.all_songs) == 6
+    reopened.close()
+
+
+def test_torn_journal_line_is_dropped(db_path, tmp_path):
+    store = FastStore(db_path)
+    store.add_song(song("a", str(tmp_path)))
+    crash(store, 1)
+    with open(store.journal.path, "a", encoding="utf-8") as f:
+        f.write('{"seq": 2, "op": "add_so')
+
+    reopened = FastStore(db_path)
+    assert [s.id for s in reopened.all_songs] == ["a"]
+    assert open(reopened.journal.path, encoding="utf-8").read().endswith("}\n")
+    reopened.close()
+
+
+def test_warm_snapshot_matches_cold_load(db_path, tmp_path):
+    store = FastStore(db_path)
+    store.add_song(song("a", str(tmp_path)))
+    store.update_song("a", {"palette": [[1, 2, 3]], "cover_location": "/elsewhere/a.jpg"})
+    store.close()
+
+    warm = FastStore(db_path)
+    warm_state = state(warm)
+    assert warm.find_song("Song a", "Artist").id == "a"
+    warm.close()
+    os.remove(warm.snapshot_path)
+    cold = FastStore(db_path)
+    assert state(cold) == warm_state
+    cold.close()
+
+
+def test_snapshot_ignored_once_library_changed_since(db_path, tmp_path):
+    store = FastStore(db_path)
+    store.add_song(song("a", str(tmp_path)))
+    store.close()
+
+    # A run that crashed after the snapshot was written leaves newer journal entries behind
+    crashed = FastStore(db_path)
+    crashed.add_song(song("b", str(tmp_path)))
+    crash(crashed, 1)
+
+    reopened = FastStore(db_path)
+    assert [s.id for s in reopened.all_songs] == ["a", "b"]
+    reopened.close()